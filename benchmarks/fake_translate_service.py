@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+
+class FakeRequest(object):
+    def __init__(self, service, q, target, source):
+        self.service = service
+        self.texts = [q] if isinstance(q, str) else list(q)
+        self.target = target
+
+    def execute(self):
+        self.service.record(self.texts)
+        return {
+            'translations': [
+                {'translatedText': '[{}] {}'.format(self.target, text)}
+                for text in self.texts
+            ]
+        }
+
+
+class FakeTranslations(object):
+    def __init__(self, service):
+        self.service = service
+
+    def list(self, q, target, source):
+        return FakeRequest(self.service, q, target, source)
+
+
+class FakeTranslateService(object):
+    """Stands in for the Google translate service in process, with the
+    same translations().list(...).execute() interface. Counts the requests
+    and characters it is sent.
+
+    Pass it as Translator(translate_service=FakeTranslateService()).
+    """
+    def __init__(self):
+        self.requests = 0
+        self.characters = 0
+        self._lock = threading.Lock()
+
+    def record(self, texts):
+        with self._lock:
+            self.requests += 1
+            self.characters += sum(len(text) for text in texts)
+
+    def translations(self):
+        return FakeTranslations(self)
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""Times the file paths of pylocalizer against a synthetic Xcode project,
+and prints the results as JSON so they can be compared between runs.
+
+    $ python benchmarks/run_benchmarks.py --languages 40 --keys 50000
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from unittest import mock
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(
+    0, os.path.join(os.path.dirname(BENCHMARKS_DIR), 'pylocalizer')
+)
+
+import add_localized_string  # NOQA
+import exchange  # NOQA
+import lproj_inspect  # NOQA
+import strings_file  # NOQA
+from translator import Translator  # NOQA
+
+from fake_translate_service import FakeTranslateService  # NOQA
+import synthetic_project  # NOQA
+
+
+LANGUAGES_HELP = "How many languages to generate, including Base."
+KEYS_HELP = "How many keys to put in each language file."
+VALUE_LENGTH_HELP = "How many characters long each value is."
+REPEAT_HELP = "How many times to time each benchmark."
+OUTPUT_HELP = "Write the JSON results to this file instead of STDOUT."
+FILTER_HELP = "Only run the benchmarks whose names contain this string."
+
+
+def build_parser():
+    """Builds an argument parser with the appropriate flags.
+
+    returns:
+        parser - a constructed ArgumentParser object.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-l", "--languages", type=int,
+        default=synthetic_project.DEFAULT_LANGUAGES, help=LANGUAGES_HELP
+    )
+    parser.add_argument(
+        "-k", "--keys", type=int, default=synthetic_project.DEFAULT_KEYS,
+        help=KEYS_HELP
+    )
+    parser.add_argument(
+        "-v", "--value-length", type=int,
+        default=synthetic_project.DEFAULT_VALUE_LENGTH,
+        help=VALUE_LENGTH_HELP
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=5,
+                        help=REPEAT_HELP)
+    parser.add_argument("-o", "--output", type=str, help=OUTPUT_HELP)
+    parser.add_argument("-f", "--filter", type=str, default='',
+                        help=FILTER_HELP)
+
+    return parser
+
+
+def measure(name, func, repeat, setup=None):
+    """Times func(iteration) repeat times, calling setup() untimed before
+    each run."""
+    timings = []
+    for iteration in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func(iteration)
+        timings.append(time.perf_counter() - start)
+
+    return {
+        'name': name,
+        'repeat': repeat,
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.mean(timings),
+        'max': max(timings),
+    }
+
+
+def run_main(module, argv):
+    """Runs a command line entry point in process, throwing away its
+    output."""
+    with mock.patch.object(sys, 'argv', [module.__file__] + argv):
+        with contextlib.redirect_stdout(io.StringIO()):
+            module.main()
+
+
+class Benchmarks(object):
+    """The benchmarks, all sharing one synthetic project."""
+
+    def __init__(self, project_dir, scratch_dir, keys):
+        self.project_dir = project_dir
+        self.scratch_dir = scratch_dir
+        self.service = FakeTranslateService()
+        self.project = add_localized_string.XcodeLocalizationProject(
+            project_dir, scratch_dir,
+            Translator(translate_service=self.service)
+        )
+        self.lproj = self.project.get_lproj('de')
+        self.lookup_key = synthetic_project.key_name(keys // 2)
+
+    def cold(self):
+        strings_file.clear_documents()
+
+    def forget_snapshot(self):
+        if os.path.exists(self.project.snapshot_path):
+            os.remove(self.project.snapshot_path)
+        self.project._key_store = None
+
+    def cold_run(self):
+        """Sets up a command line run with nothing read or saved, as the
+        entry points share the project's snapshot in the scratch dir."""
+        self.cold()
+        self.forget_snapshot()
+
+    def new_key(self, prefix, iteration):
+        return 'bench.{}.{:05d}'.format(prefix, iteration)
+
+    def all(self):
+        lproj = self.lproj
+        project = self.project
+        project_dir = self.project_dir
+
+        def set_one(iteration):
+            lproj.set(self.new_key('lproj', iteration), 'Benchmark value')
+            lproj.discard()
+
+        def set_many(iteration):
+            project.set_many({
+                self.new_key('many{}'.format(iteration), idx): 'Value'
+                for idx in range(100)
+            })
+
+        def export(file_format):
+            def run(_):
+                with open(os.devnull, 'w', encoding='utf-8') as output:
+                    project.export_translations(output, file_format)
+            return run
+
+        def import_unchanged(_):
+            path = os.path.join(self.scratch_dir, 'bench.xliff')
+            if not os.path.exists(path):
+                with open(path, 'w', encoding='utf-8') as output:
+                    project.export_translations(output)
+            with open(path, encoding='utf-8') as source:
+                project.import_translations(source)
+
+        def entry_point_set(iteration):
+            key = self.new_key('cli', iteration)
+            with mock.patch.object(
+                    Translator, 'build_service', return_value=self.service):
+                run_main(add_localized_string, [
+                    project_dir, '--set', '{}=Value'.format(key),
+                    self.scratch_dir, '--no-cache'
+                ])
+
+        return [
+            ('language_project.get.cold',
+             lambda _: lproj.get(self.lookup_key), self.cold),
+            ('language_project.get.warm',
+             lambda _: lproj.get(self.lookup_key), None),
+            ('language_project.get_keys.cold',
+             lambda _: list(lproj.get_keys()), self.cold),
+            ('language_project.set', set_one, None),
+            ('xcode_project.set',
+             lambda iteration: project.set(
+                 self.new_key('set', iteration), 'Benchmark value'
+             ), None),
+            ('xcode_project.set_many.100', set_many, None),
+            ('xcode_project.diff_keys.cold',
+             lambda _: list(project.diff_keys(1)), self.forget_snapshot),
+            ('xcode_project.diff_keys.snapshot',
+             lambda _: list(project.diff_keys(1)), None),
+            ('xcode_project.export.xliff', export(exchange.XLIFF), None),
+            ('xcode_project.export.csv', export(exchange.CSV), None),
+            ('xcode_project.import.unchanged', import_unchanged, None),
+            ('lproj_inspect.key',
+             lambda _: run_main(lproj_inspect, [
+                 '-d', project_dir, '--scratch-dir', self.scratch_dir,
+                 '-k', self.lookup_key
+             ]), self.cold_run),
+            ('lproj_inspect.diff_keys',
+             lambda _: run_main(lproj_inspect, [
+                 '-d', project_dir, '--scratch-dir', self.scratch_dir,
+                 '--diff-keys', 'all'
+             ]), self.cold_run),
+            ('add_localized_string.get',
+             lambda _: run_main(add_localized_string, [
+                 project_dir, '--get', self.lookup_key, self.scratch_dir
+             ]), self.cold_run),
+            ('add_localized_string.set', entry_point_set, None),
+        ]
+
+
+def main():
+    args = build_parser().parse_args()
+    logging.disable(logging.INFO)
+
+    root = tempfile.mkdtemp(prefix='pylocalizer-bench-')
+    try:
+        project_dir = synthetic_project.write_project(
+            root, args.languages, args.keys, args.value_length
+        )
+        scratch_dir = os.path.join(root, 'scratch')
+        benchmarks = Benchmarks(project_dir, scratch_dir, args.keys)
+
+        results = [
+            measure(name, func, args.repeat, setup)
+            for name, func, setup in benchmarks.all()
+            if args.filter in name
+        ]
+    finally:
+        shutil.rmtree(root)
+
+    report = {
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {
+            'languages': args.languages,
+            'keys': args.keys,
+            'value_length': args.value_length,
+            'repeat': args.repeat,
+        },
+        'translate_requests': benchmarks.service.requests,
+        'translate_characters': benchmarks.service.characters,
+        'results': results,
+    }
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
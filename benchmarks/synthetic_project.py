@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import os
+import random
+import string
+
+
+DEFAULT_LANGUAGES = 10
+DEFAULT_KEYS = 2000
+DEFAULT_VALUE_LENGTH = 40
+
+# Real language codes first, then made up ones for larger projects.
+LANGUAGE_CODES = [
+    'de', 'es', 'fr', 'it', 'ja', 'ko', 'nl', 'pt-BR', 'pt-PT', 'ru', 'sv',
+    'zh-Hans', 'zh-Hant', 'ar', 'da', 'fi', 'he', 'hi', 'nb', 'pl', 'tr',
+]
+
+
+def language_codes(count):
+    """Returns Base plus count - 1 other language codes."""
+    codes = ['Base'] + LANGUAGE_CODES[:count - 1]
+    while len(codes) < count:
+        codes.append('x{}'.format(len(codes)))
+    return codes
+
+
+def key_name(idx):
+    return 'key.{:07d}'.format(idx)
+
+
+def random_value(rng, length):
+    alphabet = string.ascii_letters + '     '
+    return ''.join(rng.choice(alphabet) for _ in range(length)).strip() or 'x'
+
+
+def write_project(root, languages=DEFAULT_LANGUAGES, keys=DEFAULT_KEYS,
+                  value_length=DEFAULT_VALUE_LENGTH, missing_ratio=0.01,
+                  seed=0):
+    """Writes a synthetic Xcode project to root, with a
+    Resources/<language>.lproj/Localizable.strings file for each language.
+
+    Every file has the same sorted keys, except that each non-Base file
+    leaves out about missing_ratio of them, so that there is something for
+    diff_keys to find. Returns the project directory, with a trailing
+    slash.
+    """
+    rng = random.Random(seed)
+    base_values = [random_value(rng, value_length) for _ in range(keys)]
+
+    for language in language_codes(languages):
+        lproj_dir = os.path.join(root, 'Resources', language + '.lproj')
+        if not os.path.exists(lproj_dir):
+            os.makedirs(lproj_dir)
+
+        lines = ['/* Generated by benchmarks/synthetic_project.py */', '']
+        for idx, value in enumerate(base_values):
+            if language != 'Base' and rng.random() < missing_ratio:
+                continue
+            if language != 'Base':
+                value = '{} {}'.format(language, value)
+            lines.append('"{}" = "{}";'.format(key_name(idx), value))
+
+        path = os.path.join(lproj_dir, 'Localizable.strings')
+        with open(path, 'w', encoding='utf-8') as strings_file:
+            strings_file.write('\n'.join(lines) + '\n')
+
+    return os.path.join(root, '')
@@ -1,20 +1,79 @@
 # -*- coding: utf-8 -*-
 
+import argparse
+import collections
+import concurrent.futures
 import glob
 import json
 import logging
 import os
-import shutil
 import sys
 
-from googleapiclient import discovery
-
 import constants
-
-
-LOCALIZABLE_FILENAME = 'Localizable.strings'
-PROJECT_EXTENSION = '.lproj'
+import exchange
+import instrumentation
+import strings_file
+import translate_scheduler
+from file_transaction import FileTransaction
+from key_index import KeyIndex, index_filename
+from key_snapshot import KeySnapshot, snapshot_filename
+from key_values import read_key_values
+from lproj_discovery import (
+    PROJECT_EXTENSION,
+    STRINGS_EXTENSION,
+    LprojManifest,
+    manifest_filename,
+)
+from translation_cache import (
+    CachingTranslator,
+    DEFAULT_CACHE_PATH,
+    TranslationCache,
+)
+from translation_plan import (
+    LANGUAGE_MAP_HELP,
+    SharedTranslator,
+    load_language_map,
+)
+from translation_reuse import TranslationReuse
+from translator import Translator
+
+
+LOCALIZABLE_TABLE = 'Localizable'
+LOCALIZABLE_FILENAME = LOCALIZABLE_TABLE + STRINGS_EXTENSION
 RESOURCES_DIR = 'Resources'
+DEFAULT_SCRATCH_DIR = '/tmp/translations/'
+DEFAULT_WORKERS = 1
+
+PROJECT_DIR_HELP = "The Xcode project directory."
+SCRATCH_DIR_HELP = "Directory for intermediate files. Defaults to {}.".format(
+    DEFAULT_SCRATCH_DIR
+)
+GET_HELP = "The key to fetch from every language project."
+SET_HELP = "A key=value pair to translate into every language project."
+SET_MANY_HELP = ("A file of key=value lines, or - for STDIN, to translate"
+                 " into every language project at once.")
+EXPORT_HELP = ("A file, or - for STDOUT, to write every key and its"
+               " translation in every language to, for translators.")
+IMPORT_HELP = ("An exported file, or - for STDIN, whose changed translations"
+               " to write to the language files.")
+FORMAT_HELP = ("The format to export or import, {}. Defaults to csv for .csv"
+               " files and xliff otherwise.").format(' or '.join(
+                   exchange.FORMATS))
+SOURCE_LANGUAGE_HELP = "The language of the Base files. Defaults to {}.".format(  # NOQA
+    exchange.DEFAULT_SOURCE_LANGUAGE
+)
+CACHE_PATH_HELP = "The translation cache database. Defaults to {}.".format(
+    DEFAULT_CACHE_PATH
+)
+NO_CACHE_HELP = "Always call the translate service, bypassing the cache."
+WORKERS_HELP = "How many languages to translate at once. Defaults to {}.".format(  # NOQA
+    DEFAULT_WORKERS
+)
+RECURSIVE_HELP = ("Find .lproj folders anywhere under the project directory,"
+                  " not only in Resources.")
+TABLE_HELP = ("The strings table to work on. Defaults to {}, or to every"
+              " table for the key index queries.").format(LOCALIZABLE_TABLE)
+ALL_TABLES_HELP = "Work on every strings table, not only --table."
 
 logging.basicConfig(level=logging.DEBUG)
 log = logging.getLogger(__name__)
@@ -32,142 +91,188 @@ class InvalidXcodeProject(Exception):
     __repr__ = __str__
 
 
-class Translator(object):
-    """The Translator class wraps all of the functionality from the Google
-    Python API library.
-
-    Attributes:
-        translate_service
-    """
-    def __init__(self):
-        self.translate_service = discovery.build('translate', version='v2')
-
-    def translate(self, text, target_lang):
-        req = self.translate_service.translations().list(
-            q=text, target=target_lang, source='en'
-        )
-        texts = req.execute()
-
-        return texts.get('translations')[0].get('translatedText')
-
-
 class LanguageProject(object):
-    def __init__(self, path, language_code, scratch_dir=None, translator=None):
+    def __init__(self, path, language_code, translator=None):
         self.path = path
         self.language_code = language_code
-        self.scratch_dir = scratch_dir or '/tmp/translations/'
         self.translator = translator or Translator()
-        if not os.path.exists(self.scratch_dir):
-            os.makedirs(self.scratch_dir)
+        self._pending_document = None
 
     @property
-    def scratch_file_path(self):
-        return '{}/{}.{}'.format(
-            self.scratch_dir, self.language_code, LOCALIZABLE_FILENAME
-        )
+    def table(self):
+        """The name of the strings table, e.g. Localizable."""
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+    @property
+    def document(self):
+        """The parsed contents of the language file, read at most once
+        until the file changes on disk."""
+        return strings_file.load_document(self.path)
+
+    def stage(self, transaction):
+        """Stages the pending changes to the file in the transaction."""
+        if self._pending_document is not None:
+            transaction.stage(self.path, self._pending_document.to_bytes())
+
+    def committed(self):
+        """Records the pending changes as the contents of the file, once the
+        transaction they were staged in has been committed. Returns the
+        document written, or None if the file was not changed."""
+        document = self._pending_document
+        if document is not None:
+            strings_file.store_document(self.path, document)
+        self._pending_document = None
+        return document
+
+    def discard(self):
+        """Throws away the pending changes."""
+        self._pending_document = None
 
     def commit(self):
+        """Writes the pending changes to the file on their own."""
         try:
-            shutil.copy(self.scratch_file_path, self.path)
-        except Exception as e:
+            with instrumentation.timed('language_project.commit'), \
+                    FileTransaction() as transaction:
+                self.stage(transaction)
+        except Exception:
             log.error('Error commiting %s', self.path, exc_info=True)
+            self.discard()
+        else:
+            self.committed()
 
     def get_translated_line(self, key, value):
         translated_value = self.translator.translate(value, self.language_code)
-        return '"{}" = "{}";'.format(key, translated_value)
-
-    def _get_key_value(self, line):
-        key, value = line.split('=')
-        key = key.strip().replace('"', '')
-        value = value.strip()[1:-2]
-        return key, value
+        return strings_file.format_line(key, translated_value)
 
     def parse_language_line(self, line, query_key):
         """Parses out the key/value pair from a Localizable.strings file"""
-        try:
-            key, value = self._get_key_value(line)
-            assert query_key == key
-        except ValueError:
+        parsed = strings_file.parse_line(line)
+        if parsed is None:
             return 'Invalid line: {}'.format(line)
-        except AssertionError:
+
+        key, value = parsed
+        if query_key != key:
             return None
 
-        return value.strip()[1:-2]
+        return value
 
     def get_keys(self):
         """Returns every key in the file"""
-        with open(self.path, 'r') as lproj_file:
-            for line in lproj_file.readlines():
-                try:
-                    key, value = self._get_key_value(line)
-                except ValueError:
-                    pass
-                else:
-                    yield key, value
+        return self.document.items()
 
     def get(self, key):
-        """Opens the file, looks for the key, and returns the value"""
-        with open(self.path, 'r') as lproj_file:
-            for line in lproj_file.readlines():
-                if line.find(key) != -1:
-                    value = self.parse_language_line(line, key)
-                    if value is not None:
-                        return value
-
-        return None
+        """Looks up the key in the parsed file and returns the value"""
+        with instrumentation.timed('language_project.get'):
+            return self.document.get(key)
+
+    def set(self, key, value, reused=None):
+        """Prepares the file with the key set to the translated value, ready
+        to be committed. A translation in reused, which maps values to their
+        existing translations, is copied instead of translating the value."""
+        with instrumentation.timed('language_project.set'):
+            translated_line = strings_file.format_line(key, value)
+
+            if self.language_code != 'Base':
+                if reused and value in reused:
+                    translated_line = strings_file.format_line(
+                        key, reused[value]
+                    )
+                else:
+                    translated_line = self.get_translated_line(key, value)
 
-    def set(self, key, value):
-        written = False
-        prev_start_char = None
-        replace_only = False
-
-        existing_value = self.get(key)
-        if existing_value is not None:
-            replace_only = True
-
-        translated_line = '"{}" = "{}";'.format(key, value)
-
-        if self.language_code != 'Base':
-            translated_line = self.get_translated_line(key, value)
-
-        with open(self.scratch_file_path, 'w+') as scratch_file:
-            with open(self.path, 'r') as lproj_file:
-                for line in lproj_file.readlines():
-                    try:
-                        line_key, _ = line.split('=')
-                    except ValueError:
-                        print(line.strip('\n'), file=scratch_file)
-                        continue
-
-                    line_to_write = line
-                    line_key = line_key.strip('\n').replace('"', '')
-
-                    if line_key == key:
-                        if not written:
-                            line_to_write = translated_line
-                            written = True
-                    elif not replace_only and prev_start_char is not None:
-                        if key[0] >= prev_start_char and key[0] <= line_key[0]:
-                            if not written:
-                                print(translated_line, file=scratch_file)
-                                written = True
-
-                    prev_start_char = line_key[0]
-                    print(line_to_write.strip('\n'), file=scratch_file)
-
-            # This happens either when the file is blank to begin with,
-            # or when the key is greater than all the others.
-            if not written:
-                print(translated_line, file=scratch_file)
+            document = self.document.copy()
+            document.set(key, translated_line)
+            self._pending_document = document
 
         return translated_line
 
+    def set_many(self, mapping, reused=None):
+        """Prepares the file with every key in the mapping set to its
+        translated value, translating all of the values which are not in
+        reused together, ready to be committed."""
+        with instrumentation.timed('language_project.set_many'):
+            keys = sorted(mapping)
+            values = [mapping[key] for key in keys]
+
+            if self.language_code != 'Base':
+                reused = reused or {}
+                new_values = [
+                    value for value in values if value not in reused
+                ]
+                translations = dict(reused)
+                if new_values:
+                    translations.update(zip(
+                        new_values, self.translator.translate_many(
+                            new_values, self.language_code
+                        )
+                    ))
+                values = [translations[value] for value in values]
+
+            self.merge(dict(zip(keys, values)))
+
+    def merge(self, mapping):
+        """Prepares the file with every key in the mapping set to its text
+        as it is, without translating, ready to be committed. The texts are
+        escaped as they are written."""
+        document = self.document.copy()
+        document.merge([
+            (key, strings_file.format_line(key, mapping[key]))
+            for key in sorted(mapping)
+        ])
+        self._pending_document = document
+
 
 class XcodeLocalizationProject(object):
-    """Encapsulates all of the data for an Xcode project"""
+    """Encapsulates all of the data for an Xcode project
+
+    Language projects share one translator, which translates each value
+    once per target language in an update. Languages which the
+    language_map sends to the same target, like pt-BR and pt-PT to pt,
+    share their translations. A value which the Base file already has
+    under another key is not translated at all; each language copies its
+    translation of that key instead.
+
+    With recursive set, the language folders are found anywhere under the
+    project directory, and their layout is kept in a manifest in the
+    scratch directory between runs. Only the strings table named table is
+    used, or every table when it is None.
+
+    Attributes:
+        lprojs
+        project_dir
+        scratch_dir
+        translator
+        workers -- How many language projects set updates at once
+        recursive
+        table
+        reused -- How many translations the last update copied from
+            existing keys instead of translating
+    """
 
-    def __init__(self, project_dir, scratch_dir=None):
-        self.lprojs = self.get_localization_projects(project_dir, scratch_dir)
+    def __init__(self, project_dir, scratch_dir=None, translator=None,
+                 workers=DEFAULT_WORKERS, language_map=None, recursive=False,
+                 table=LOCALIZABLE_TABLE):
+        self.workers = workers
+        self.project_dir = project_dir
+        self.scratch_dir = scratch_dir or DEFAULT_SCRATCH_DIR
+        self.recursive = recursive
+        self.table = table
+        self._manifest = None
+        self.translator = SharedTranslator(
+            translator or Translator(), language_map
+        )
+        self.lprojs = self.get_localization_projects(
+            project_dir, self.translator
+        )
+        self.reuse = TranslationReuse()
+        self.reused = 0
+        self._key_store = None
+
+    @property
+    def include_paths(self):
+        """Whether a language can have more than one file, in which case
+        the output says which file each entry came from."""
+        return self.recursive or self.table is None
 
     def get_language_code(self, path):
         """Gets the language code from a given path.
@@ -177,43 +282,141 @@ class XcodeLocalizationProject(object):
         """
         if path[-1] == '/':
             path = path[0:-1]
-        path = str(path.replace('/{}'.format(LOCALIZABLE_FILENAME), ''))
+        if path.endswith(STRINGS_EXTENSION):
+            path = os.path.dirname(path)
         return os.path.basename(path).replace(PROJECT_EXTENSION, '')
 
-    def get_localization_projects(self, project_dir, scratch_dir=None):
+    def find_strings_files(self, project_dir):
+        """Returns the paths of the strings files to work on.
+
+        With recursive set, the manifest of the folders found is kept for
+        the life of the project, and only saved when a folder changed.
+        """
+        if self.recursive:
+            if self._manifest is None:
+                self._manifest = LprojManifest(project_dir, os.path.join(
+                    self.scratch_dir, manifest_filename(project_dir)
+                ))
+
+            strings_files = self._manifest.discover()
+            if self._manifest.rescanned:
+                self._save(self._manifest)
+            return [
+                strings_file.path for strings_file in strings_files
+                if self.table is None or strings_file.table == self.table
+            ]
+
+        glob_str = os.path.join(
+            project_dir, RESOURCES_DIR, '*{}'.format(PROJECT_EXTENSION),
+            '{}{}'.format(self.table or '*', STRINGS_EXTENSION)
+        )
+        return [path for path in glob.glob(glob_str) if os.path.isfile(path)]
+
+    def layout_changed(self):
+        """Whether strings files were added or removed since the language
+        projects were listed."""
+        return sorted(self.find_strings_files(self.project_dir)) != sorted(
+            lproj.path for lproj in self.lprojs
+        )
+
+    def get_localization_projects(self, project_dir, translator=None):
         """Parses the Xcode project and returns all language folders.
 
-        Currently these are stored in the directory Resources under the root
-        project.
+        These are stored in the directory Resources under the root project,
+        or anywhere under it when the project is recursive.
 
         Ref: https://developer.apple.com/library/content/documentation/MacOSX/Conceptual/BPInternational/LocalizingYourApp/LocalizingYourApp.html  # NOQA
         """
-        glob_str = '{}{}/*{}'.format(
-            project_dir, RESOURCES_DIR, PROJECT_EXTENSION
-        )
-        matches = glob.glob(glob_str)
         projects = []
-        translator = Translator()
-
-        for match in matches:
-            full_path = os.path.join(match, LOCALIZABLE_FILENAME)
-            if os.path.exists(full_path):
-                lc = self.get_language_code(full_path)
-                lp = LanguageProject(
-                    path=full_path, language_code=lc, scratch_dir=scratch_dir,
-                    translator=translator
-                )
-                projects.append(lp)
+        translator = translator or Translator()
+
+        for full_path in self.find_strings_files(project_dir):
+            lc = self.get_language_code(full_path)
+            lp = LanguageProject(
+                path=full_path, language_code=lc, translator=translator
+            )
+            projects.append(lp)
 
         if len(projects) == 0:
             raise InvalidXcodeProject(project_dir)
 
         return projects
 
-    def diff_keys(self):
+    def lproj_groups(self):
+        """Groups the language projects of the same table in the same
+        target, i.e. in .lproj folders side by side."""
+        groups = collections.OrderedDict()
+        for lproj in self.lprojs:
+            target_dir = os.path.dirname(os.path.dirname(lproj.path))
+            groups.setdefault((target_dir, lproj.table), []).append(lproj)
+
+        return groups
+
+    def base_groups(self):
+        """Returns (Base language project, language projects) for each
+        group of language projects which has a Base file."""
+        bases = []
+        for lprojs in self.lproj_groups().values():
+            for lproj in lprojs:
+                if lproj.language_code == 'Base':
+                    bases.append((lproj, lprojs))
+                    break
+
+        return bases
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(
+            self.scratch_dir, snapshot_filename(self.project_dir)
+        )
+
+    @property
+    def key_index_path(self):
+        return os.path.join(self.scratch_dir, index_filename(self.project_dir))
+
+    def key_index(self):
+        """Returns the index of every entry in the project's strings files,
+        after reading the files which changed since it was last used."""
+        with instrumentation.timed('xcode_project.key_index.refresh'):
+            index = KeyIndex(self.key_index_path, self.project_dir)
+            index.refresh(self.lprojs)
+
+        return index
+
+    def _save(self, store):
+        """Saves the key store or discovery manifest for later runs. As a
+        scratch directory which cannot be written only makes those runs
+        slower, a failure is logged rather than raised."""
+        try:
+            store.save()
+        except OSError as error:
+            log.warning('Could not save %s: %s', store.path, error)
+
+    def key_store(self, workers=None):
+        """Returns the KeySnapshot holding the entries of every language
+        file, after reading the files which changed since it was last used.
+
+        The snapshot is loaded from the scratch directory the first time,
+        and then kept for the life of the project. Changed files are parsed
+        on a pool of worker processes.
+        """
+        if self._key_store is None:
+            self._key_store = KeySnapshot(self.snapshot_path)
+        self._key_store.refresh(
+            [lproj.path for lproj in self.lprojs], workers
+        )
+
+        return self._key_store
+
+    def diff_keys(self, workers=None):
         """Returns all of the keys that were not found in non-Base localization
         files.
 
+        The keys of each file are kept in a snapshot in the scratch
+        directory between runs, so only the files which changed since the
+        last run are parsed. Each file is compared with the Base file of the
+        same table in the same target.
+
         The output will look like the following, assuming we have one missing
         key and one language:
 
@@ -226,23 +429,91 @@ class XcodeLocalizationProject(object):
             }
         ]
         """
-        base_project_values = {
-            key: value
-            for (key, value) in self.get_keys('Base')
-        }
-        base_keys = set(base_project_values.keys())
+        for lproj, key, text in self.missing_entries(workers):
+            yield self.output_dict(lproj, key, text)
+
+    def missing_entries(self, workers=None):
+        """Yields (language project, key, Base text) for every key which a
+        language file is missing compared to its Base file, as found by
+        diff_keys."""
+        bases = self.base_groups()
+        if not bases:
+            return
+
+        with instrumentation.timed('xcode_project.diff_keys.refresh'):
+            snapshot = self.key_store(workers)
+
+        with instrumentation.timed('xcode_project.diff_keys.compare'):
+            missing_by_lproj = [
+                (base_lproj, lproj,
+                 snapshot.missing_keys(base_lproj.path, lproj.path))
+                for base_lproj, lprojs in bases
+                for lproj in lprojs
+            ]
+            self._save(snapshot)
+
+        for base_lproj, lproj, missing_keys in missing_by_lproj:
+            for key in missing_keys:
+                yield lproj, key, snapshot.get(base_lproj.path, key)
 
-        for lproj in self.lprojs:
-            lproj_keys = {key for (key, value) in lproj.get_keys()}
-            missing_keys = base_keys - lproj_keys
+    def coverage(self, workers=None):
+        """Returns how many of the keys of its Base file each language file
+        has.
 
-            for key in missing_keys:
-                yield {
-                    constants.KEY: key,
-                    constants.TEXT: base_project_values[key],
+        >>> list(xcode_project.coverage())
+        [
+            {
+                "language": "es",
+                "translated": 120,
+                "total": 125,
+                "coverage": 0.96
+            }
+        ]
+        """
+        with instrumentation.timed('xcode_project.coverage'):
+            snapshot = self.key_store(workers)
+            self._save(snapshot)
+
+        for base_lproj, lprojs in self.base_groups():
+            for lproj in lprojs:
+                if lproj is base_lproj:
+                    continue
+
+                translated, total = snapshot.coverage(
+                    base_lproj.path, lproj.path
+                )
+                output = {
                     constants.LANGUAGE: lproj.language_code,
-                    constants.FORMAT: constants.JSON,
+                    constants.TRANSLATED: translated,
+                    constants.TOTAL: total,
+                    constants.COVERAGE: (
+                        round(float(translated) / total, 4) if total else 1.0
+                    ),
                 }
+                if self.include_paths:
+                    output[constants.PATH] = lproj.path
+                yield output
+
+    def output_dict(self, lproj, key, text):
+        """Builds the output for a key of a language project."""
+        output = {
+            constants.KEY: key,
+            constants.TEXT: text,
+            constants.LANGUAGE: lproj.language_code,
+            constants.FORMAT: constants.JSON,
+        }
+        if self.include_paths:
+            output[constants.PATH] = lproj.path
+
+        return output
+
+    def get_lproj(self, language):
+        """Returns the language project for the language, if there is one"""
+        for lproj in self.lprojs:
+            if lproj.language_code == language:
+                return lproj
+
+        return None
 
     def get_keys(self, language):
         """Fetches the keys from the specified language project"""
@@ -251,29 +522,307 @@ class XcodeLocalizationProject(object):
                 return lproj.get_keys()
 
     def get(self, key, languages=None):
-        """Fetches the key from all the language projects"""
+        """Fetches the key from all the language projects, or only from
+        those whose language code is in languages."""
+        with instrumentation.timed('xcode_project.get'):
+            snapshot = self.key_store()
+            self._save(snapshot)
+
         for lproj in self.lprojs:
             if languages is not None and lproj.language_code not in languages:
-                pass
+                continue
+
+            yield self.output_dict(lproj, key, snapshot.get(lproj.path, key))
+
+    def reusable_translations(self, mappings):
+        """Returns, for each language project's path, the translations it
+        already has under other keys of its Base file of the values of its
+        mapping in mappings, which maps language project paths to the keys
+        and values to set in them."""
+        reused = {}
+        wanted = 0
+        for base_lproj, lprojs in self.base_groups():
+            for lproj in lprojs:
+                mapping = mappings.get(lproj.path)
+                if lproj is base_lproj or not mapping:
+                    continue
+
+                translations = self.reuse.translations(
+                    base_lproj, lproj, mapping.values(), mapping
+                )
+                reused[lproj.path] = translations
+                wanted += len(mapping)
+                self.reused += sum(
+                    1 for value in mapping.values() if value in translations
+                )
 
-            yield {
-                constants.KEY: key,
-                constants.TEXT: lproj.get(key),
-                constants.LANGUAGE: lproj.language_code,
-                constants.FORMAT: constants.JSON
-            }
+        instrumentation.increment('reuse.hits', self.reused)
+        instrumentation.increment('reuse.misses', wanted - self.reused)
+        if self.reused:
+            log.info(
+                'Reused %d existing translations instead of translating them',
+                self.reused
+            )
+
+        return reused
+
+    def set(self, key, value, workers=None):
+        """Sets the key for all language projects.
+
+        Either every language file is written, or, if any language fails,
+        none of them are. With more than one worker, the languages are
+        translated on a thread pool. Returns whether the files were written.
+        """
+        self.reused = 0
+        reused = self.reusable_translations(
+            {lproj.path: {key: value} for lproj in self.lprojs}
+        )
+        return self._update(
+            lambda lproj: lproj.set(key, value, reused.get(lproj.path)),
+            '{}={}'.format(key, value), workers
+        )
+
+    def set_many(self, mapping, workers=None):
+        """Sets every key in the mapping for all language projects, writing
+        each language file once. Failures are handled the same way as in
+        set."""
+        self.reused = 0
+        reused = self.reusable_translations(
+            {lproj.path: mapping for lproj in self.lprojs}
+        )
+        return self._update(
+            lambda lproj: lproj.set_many(mapping, reused.get(lproj.path)),
+            '{} keys'.format(len(mapping)), workers
+        )
+
+    def sync(self, workers=None, parse_workers=None):
+        """Fills in every key which diff_keys finds missing from a language
+        file with the translation of its Base text.
+
+        The missing texts of each language are translated together, in as
+        few requests as the translator can pack them into, and languages
+        which translate to the same target share their translations. Each
+        language file is then written once, merging the new keys in sorted
+        order, and failures are handled the same way as in set.
+
+        parse_workers is how many processes diff_keys parses changed files
+        with. Returns the keys and Base texts filled in for each language
+        project's path, or None if nothing was written.
+        """
+        self.reused = 0
+        with instrumentation.timed('xcode_project.sync.diff'):
+            mappings = collections.OrderedDict()
+            for lproj, key, text in self.missing_entries(parse_workers):
+                mappings.setdefault(lproj.path, {})[key] = (
+                    strings_file.unescape(text)
+                )
+
+        if not mappings:
+            return mappings
+
+        reused = self.reusable_translations(mappings)
+
+        def update(lproj):
+            if lproj.path in mappings:
+                lproj.set_many(mappings[lproj.path], reused.get(lproj.path))
+
+        missing = sum(len(mapping) for mapping in mappings.values())
+        written = self._update(
+            update, '{} missing keys'.format(missing), workers
+        )
+        return mappings if written else None
+
+    def relative_path(self, path):
+        """The path of a language file relative to the project directory,
+        which names it in exported files."""
+        return os.path.relpath(path, self.project_dir)
+
+    def export_translations(self, output, file_format=exchange.XLIFF,
+                            source_language=exchange.DEFAULT_SOURCE_LANGUAGE,
+                            workers=None):
+        """Writes every key of each Base file, with its text and its
+        translation in every other language file of the group, to the text
+        stream output as XLIFF 1.2 or CSV.
+
+        The units are streamed out of the key store as they are written, in
+        a single pass, so the export is never held in memory. workers is
+        how many processes changed files are parsed with. Returns the number
+        of units written.
+        """
+        with instrumentation.timed('xcode_project.export'):
+            store = self.key_store(workers)
+            self._save(store)
+
+            def units(base_lproj, lproj):
+                for key, text in store.items(base_lproj.path):
+                    translation = store.get(lproj.path, key)
+                    if translation is not None:
+                        translation = strings_file.unescape(translation)
+                    yield key, strings_file.unescape(text), translation
+
+            count = exchange.write(output, (
+                exchange.ExportFile(
+                    self.relative_path(lproj.path), lproj.language_code,
+                    units(base_lproj, lproj)
+                )
+                for base_lproj, lprojs in self.base_groups()
+                for lproj in lprojs
+                if lproj is not base_lproj
+            ), file_format, source_language)
+
+        instrumentation.increment('export.units', count)
+        log.info('Exported %d units', count)
+        return count
+
+    def import_translations(self, source, file_format=exchange.XLIFF,
+                            workers=None):
+        """Reads the translations in the text stream source, as written by
+        export_translations, and writes the ones which changed to their
+        language files.
+
+        The file is parsed incrementally, and only the changed translations
+        are kept, so memory grows with the number of changes rather than
+        the size of the file. Each language file is then rewritten once,
+        and failures are handled the same way as in set. Units of files or
+        keys the project does not have, or without a translation, are
+        skipped.
+
+        Returns the keys and texts set for each language project's path, or
+        None if nothing was written.
+        """
+        store = self.key_store(workers)
+        lprojs = {}
+        for base_lproj, group in self.base_groups():
+            for lproj in group:
+                if lproj is not base_lproj:
+                    lprojs[self.relative_path(lproj.path)] = (
+                        base_lproj, lproj
+                    )
+
+        changes = collections.OrderedDict()
+        units = skipped = 0
+        with instrumentation.timed('xcode_project.import.read'):
+            for original, key, translation in exchange.read(
+                    source, file_format):
+                units += 1
+                found = lprojs.get(os.path.normpath(original or ''))
+                if (translation is None or found is None or
+                        store.get(found[0].path, key) is None):
+                    skipped += 1
+                    continue
+
+                lproj = found[1]
+                current = store.get(lproj.path, key)
+                if (current is not None and
+                        strings_file.unescape(current) == translation):
+                    continue
+                changes.setdefault(lproj.path, {})[key] = translation
+
+        instrumentation.increment('import.units', units)
+        if skipped:
+            log.warning(
+                'Skipped %d of %d units which were untranslated or not in '
+                'the project', skipped, units
+            )
+        if not changes:
+            return changes
+
+        def update(lproj):
+            if lproj.path in changes:
+                lproj.merge(changes[lproj.path])
+
+        changed = sum(len(mapping) for mapping in changes.values())
+        written = self._update(
+            update, '{} imported translations'.format(changed), 1
+        )
+        return changes if written else None
+
+    def _update(self, update, description, workers=None):
+        """Calls update on each language project, then writes all of them in
+        a single transaction. If any language fails, none of them are
+        written. Returns whether the files were written."""
+        workers = workers or self.workers
+        try:
+            with instrumentation.timed('xcode_project.update'):
+                if workers > 1:
+                    updated = self._update_concurrently(
+                        update, description, workers
+                    )
+                else:
+                    updated = self._update_serially(update, description)
+        finally:
+            self.translator.clear()
+
+        if not updated:
+            for lproj in self.lprojs:
+                lproj.discard()
+            return False
+
+        try:
+            with instrumentation.timed('xcode_project.commit'), \
+                    FileTransaction() as transaction:
+                for lproj in self.lprojs:
+                    lproj.stage(transaction)
+        except Exception:
+            log.error('Error commiting %s', description, exc_info=True)
+            for lproj in self.lprojs:
+                lproj.discard()
+            return False
+
+        for lproj in self.lprojs:
+            document = lproj.committed()
+            if document is not None and self._key_store is not None:
+                self._key_store.update(lproj.path, document)
+            log.info('Set %s in file %s', description, lproj.path)
+
+        if self._key_store is not None:
+            self._save(self._key_store)
+
+        return True
 
-    def set(self, key, value):
-        """Sets the key for all language projects"""
+    def _update_serially(self, update, description):
         for lproj in self.lprojs:
             try:
-                lproj.set(key, value)
-            except Exception as e:
-                log.error('Error setting %s to %s', key, value, exc_info=True)
-                return
-            else:
-                log.info('Set %s=%s in file %s', key, value, lproj.path)
-                lproj.commit()
+                update(lproj)
+            except Exception:
+                log.error(
+                    'Error setting %s in file %s', description, lproj.path,
+                    exc_info=True
+                )
+                return False
+
+        return True
+
+    def _update_concurrently(self, update, description, workers):
+        """Updates the language projects with a pool of workers. Once a
+        language fails, the languages which have not started yet are
+        cancelled."""
+        failed = False
+
+        with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+            futures = {
+                executor.submit(update, lproj): lproj
+                for lproj in self.lprojs
+            }
+
+            for future in concurrent.futures.as_completed(futures):
+                if future.cancelled():
+                    continue
+
+                lproj = futures[future]
+                try:
+                    future.result()
+                except Exception:
+                    log.error(
+                        'Error setting %s in file %s', description,
+                        lproj.path, exc_info=True
+                    )
+                    if not failed:
+                        failed = True
+                        for pending in futures:
+                            pending.cancel()
+
+        return not failed
 
 
 def print_success(message):
@@ -287,6 +836,9 @@ def print_fail(message):
 def print_and_quit():
     print("Usage: ./add_localized_string [project_dir] --set key=value")
     print("Usage: ./add_localized_string [project_dir] --get key")
+    print("Usage: ./add_localized_string [project_dir] --set-many file")
+    print("Usage: ./add_localized_string [project_dir] --export file")
+    print("Usage: ./add_localized_string [project_dir] --import file")
     sys.exit()
 
 
@@ -295,33 +847,183 @@ def print_key(key, xcodeproject):
     print(json.dumps(list(xcodeproject.get(key)), sort_keys=True, indent=4))
 
 
+def build_parser():
+    """Builds an argument parser with the appropriate flags.
+
+    returns:
+        parser - a constructed ArgumentParser object.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("project_dir", type=str, help=PROJECT_DIR_HELP)
+    parser.add_argument(
+        "scratch_dir", type=str, nargs="?", default=DEFAULT_SCRATCH_DIR,
+        help=SCRATCH_DIR_HELP
+    )
+    command = parser.add_mutually_exclusive_group(required=True)
+    command.add_argument("--get", type=str, metavar="KEY", help=GET_HELP)
+    command.add_argument(
+        "--set", type=str, metavar="KEY=VALUE", help=SET_HELP
+    )
+    command.add_argument(
+        "--set-many", type=str, metavar="FILE", help=SET_MANY_HELP
+    )
+    command.add_argument(
+        "--export", type=str, metavar="FILE", help=EXPORT_HELP
+    )
+    command.add_argument(
+        "--import", type=str, metavar="FILE", dest="import_path",
+        help=IMPORT_HELP
+    )
+    parser.add_argument(
+        "--format", type=str, choices=exchange.FORMATS, help=FORMAT_HELP
+    )
+    parser.add_argument(
+        "--source-language", type=str,
+        default=exchange.DEFAULT_SOURCE_LANGUAGE, help=SOURCE_LANGUAGE_HELP
+    )
+    add_translator_arguments(parser)
+    add_layout_arguments(parser)
+    instrumentation.add_arguments(parser)
+
+    return parser
+
+
+def add_translator_arguments(parser, workers=True):
+    """Adds the flags which build_translator reads, the language map and,
+    unless workers is False, how many languages to translate at once."""
+    parser.add_argument(
+        "--cache-path", type=str, default=DEFAULT_CACHE_PATH,
+        help=CACHE_PATH_HELP
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", default=False, help=NO_CACHE_HELP
+    )
+    if workers:
+        parser.add_argument(
+            "-w", "--workers", type=int, default=DEFAULT_WORKERS,
+            help=WORKERS_HELP
+        )
+    parser.add_argument(
+        "--language-map", type=str, metavar="FILE", help=LANGUAGE_MAP_HELP
+    )
+    translate_scheduler.add_arguments(parser)
+
+
+def add_layout_arguments(parser):
+    """Adds the flags which say where to find the strings files."""
+    parser.add_argument(
+        "-r", "--recursive", action="store_true", default=False,
+        help=RECURSIVE_HELP
+    )
+    parser.add_argument("-t", "--table", type=str, help=TABLE_HELP)
+    parser.add_argument(
+        "--all-tables", action="store_true", default=False,
+        help=ALL_TABLES_HELP
+    )
+
+
+def layout_kwargs(args, default_table=LOCALIZABLE_TABLE):
+    """The XcodeLocalizationProject arguments for the layout flags."""
+    table = args.table or default_table
+    return {
+        'recursive': args.recursive,
+        'table': None if args.all_tables else table,
+    }
+
+
+def build_translator(args, source_lang='en'):
+    """Builds the translator for the flags added by add_translator_arguments,
+    wrapped in the translation cache unless it was disabled."""
+    translator = Translator(
+        source_lang=source_lang,
+        scheduler=translate_scheduler.scheduler_from_args(args)
+    )
+    if args.no_cache:
+        return translator
+
+    return CachingTranslator(translator, TranslationCache(args.cache_path))
+
+
 def main():
-    if len(sys.argv) < 4:
-        print_and_quit()
+    parser = build_parser()
+    args = parser.parse_intermixed_args()
 
-    project_path = sys.argv[1]
+    with instrumentation.instrumented(args):
+        run(args)
+
+
+def run(args):
+    """Runs the command the parsed arguments ask for."""
+    project_path = args.project_dir
     if project_path[-1] != '/':
         project_path += '/'
 
-    scratch_dir = '/tmp/translations/'
-    if len(sys.argv) > 4:
-        scratch_dir = sys.argv[4]
+    scratch_dir = args.scratch_dir
     if not os.path.exists(scratch_dir):
         os.makedirs(scratch_dir)
 
-    xcodeproject = XcodeLocalizationProject(project_path, scratch_dir)
+    xcodeproject = XcodeLocalizationProject(
+        project_path, scratch_dir, build_translator(args), args.workers,
+        load_language_map(args.language_map), **layout_kwargs(args)
+    )
 
-    if sys.argv[2] == '--get':
-        key = sys.argv[3]
-        print_key(key, xcodeproject)
+    if args.get is not None:
+        print_key(args.get, xcodeproject)
 
-    if sys.argv[2] == '--set':
+    if args.set is not None:
         try:
-            kv_pair = sys.argv[3].split('=')
-            xcodeproject.set(key=kv_pair[0], value=kv_pair[1])
-        except IndexError:
+            key, value = args.set.split('=', 1)
+        except ValueError:
             print("Key/value pair must be in the form key=value")
             print_and_quit()
+        xcodeproject.set(key=key, value=value)
+
+    if args.set_many is not None:
+        if args.set_many == '-':
+            mapping = read_key_values(sys.stdin)
+        else:
+            with open(args.set_many, 'r') as key_values_file:
+                mapping = read_key_values(key_values_file)
+        xcodeproject.set_many(mapping)
+
+    if args.export is not None:
+        export_file(args, xcodeproject)
+
+    if args.import_path is not None:
+        import_file(args, xcodeproject)
+
+
+def export_file(args, xcodeproject):
+    """Exports the project to the file given by --export."""
+    file_format = args.format or exchange.format_for_path(args.export)
+    if args.export == '-':
+        xcodeproject.export_translations(
+            sys.stdout, file_format, args.source_language
+        )
+        return
+
+    with open(args.export, 'w', encoding='utf-8', newline='') as output:
+        xcodeproject.export_translations(
+            output, file_format, args.source_language
+        )
+
+
+def import_file(args, xcodeproject):
+    """Imports the file given by --import into the project."""
+    file_format = args.format or exchange.format_for_path(args.import_path)
+    if args.import_path == '-':
+        changes = xcodeproject.import_translations(sys.stdin, file_format)
+    else:
+        with open(args.import_path, 'r', encoding='utf-8',
+                  newline='') as source:
+            changes = xcodeproject.import_translations(source, file_format)
+
+    if changes is None:
+        print_fail('Nothing was imported')
+    else:
+        print_success('Imported {} translations into {} files'.format(
+            sum(len(mapping) for mapping in changes.values()), len(changes)
+        ))
 
 
 if __name__ == '__main__':
@@ -4,8 +4,19 @@
 LANGUAGE = 'language'
 KEY = 'key'
 TEXT = 'text'
+# The strings file an entry came from, when a language has several
+PATH = 'path'
+# How much of the Base file a language file translates
+TRANSLATED = 'translated'
+TOTAL = 'total'
+COVERAGE = 'coverage'
+# How many missing keys a sync filled in
+FILLED = 'filled'
 
 # Output formats
 FORMAT = 'format'
 JSON = 'JSON'
 YAML = 'YAML'
+
+# The Unix socket the localization daemon listens on by default
+DAEMON_SOCKET_PATH = '/tmp/translations/lproj_daemon.sock'
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import tempfile
+import time
+
+
+DISCOVERY_URI = (
+    'https://www.googleapis.com/discovery/v1/apis/{api}/{version}/rest'
+)
+# Bump this whenever the layout of the cache directory changes.
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser('~'), '.cache', 'pylocalizer', 'discovery',
+    'v{}'.format(CACHE_VERSION)
+)
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60
+# Seconds to wait on the network, so that a fetch on a network which drops
+# packets fails over to the stale copy instead of hanging.
+DEFAULT_TIMEOUT = 10
+
+logging.basicConfig(level=logging.DEBUG)
+log = logging.getLogger(__name__)
+
+
+class DiscoveryDocumentError(Exception):
+    def __init__(self, api, version, reason):
+        self.api = api
+        self.version = version
+        self.reason = reason
+
+    def __str__(self):
+        return "Unable to load the discovery document for {} {}: {}".format(
+            self.api, self.version, self.reason
+        )
+
+    __repr__ = __str__
+
+
+class DiscoveryCache(object):
+    """Keeps Google API discovery documents on disk, so that building a
+    service client does not have to fetch one over the network.
+
+    A document is only fetched when there is none in the cache, or when
+    the cached one is older than max_age, in which case the stale copy is
+    still used if the fetch fails. To work without any network access,
+    copy a document to document_path(api, version).
+
+    Attributes:
+        cache_dir
+        max_age
+        timeout -- Seconds to wait on the network when fetching
+    """
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_age=DEFAULT_MAX_AGE,
+                 timeout=DEFAULT_TIMEOUT):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.timeout = timeout
+
+    def document_path(self, api, version):
+        return os.path.join(self.cache_dir, '{}.{}.json'.format(api, version))
+
+    def fetch(self, api, version):
+        """Downloads the discovery document."""
+        import httplib2
+
+        uri = DISCOVERY_URI.format(api=api, version=version)
+        response, content = httplib2.Http(timeout=self.timeout).request(uri)
+        if response.status >= 400:
+            raise DiscoveryDocumentError(
+                api, version, 'HTTP {} from {}'.format(response.status, uri)
+            )
+
+        return content.decode('utf-8')
+
+    def _store(self, path, document):
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir)
+        with os.fdopen(fd, 'w', encoding='utf-8') as temp_file:
+            temp_file.write(document)
+        os.replace(temp_path, path)
+
+    def get(self, api, version):
+        """Returns the text of the discovery document, from the cache when
+        possible."""
+        path = self.document_path(api, version)
+        cached = None
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as document_file:
+                cached = document_file.read()
+            age = time.time() - os.path.getmtime(path)
+            if self.max_age is None or age < self.max_age:
+                return cached
+
+        try:
+            document = self.fetch(api, version)
+        except Exception as e:
+            if cached is None:
+                raise DiscoveryDocumentError(api, version, e)
+            log.warning(
+                'Using stale discovery document %s: %s', path, e
+            )
+            return cached
+
+        self._store(path, document)
+        return document
+
+    def build(self, api, version):
+        """Builds a service client from the cached discovery document."""
+        from googleapiclient import discovery
+
+        return discovery.build_from_document(self.get(api, version))
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import csv
+import xml.etree.ElementTree as ElementTree
+from xml.sax.saxutils import XMLGenerator
+
+
+XLIFF = 'xliff'
+CSV = 'csv'
+FORMATS = (XLIFF, CSV)
+XLIFF_VERSION = '1.2'
+XLIFF_NAMESPACE = 'urn:oasis:names:tc:xliff:document:1.2'
+DEFAULT_SOURCE_LANGUAGE = 'en'
+CSV_COLUMNS = ('path', 'language', 'key', 'source', 'target')
+
+# One language file to export. units is an iterable of
+# (key, source text, target text or None), so that it can be a generator.
+ExportFile = collections.namedtuple(
+    'ExportFile', ['original', 'language', 'units']
+)
+
+
+def format_for_path(path):
+    """Guesses the format of a file from its extension, XLIFF unless it is
+    .csv."""
+    return CSV if path.lower().endswith('.csv') else XLIFF
+
+
+def write(output, files, file_format=XLIFF,
+          source_language=DEFAULT_SOURCE_LANGUAGE):
+    """Writes the units of each ExportFile to the text stream output as
+    they are produced. Returns how many units were written."""
+    if file_format == XLIFF:
+        return write_xliff(output, files, source_language)
+    if file_format == CSV:
+        return write_csv(output, files)
+    raise ValueError('Unknown format: {}'.format(file_format))
+
+
+def read(source, file_format=XLIFF):
+    """Yields (original, key, target text) for each unit in the text stream
+    source. The target is None when the unit has not been translated."""
+    if file_format == XLIFF:
+        return read_xliff(source)
+    if file_format == CSV:
+        return read_csv(source)
+    raise ValueError('Unknown format: {}'.format(file_format))
+
+
+def write_xliff(output, files, source_language=DEFAULT_SOURCE_LANGUAGE):
+    """Writes an XLIFF 1.2 document with a <file> for each ExportFile."""
+    writer = XMLGenerator(output, encoding='utf-8', short_empty_elements=True)
+    writer.startDocument()
+    writer.startElement('xliff', {
+        'version': XLIFF_VERSION,
+        'xmlns': XLIFF_NAMESPACE,
+    })
+    count = 0
+
+    for export_file in files:
+        writer.ignorableWhitespace('\n  ')
+        writer.startElement('file', {
+            'original': export_file.original,
+            'source-language': source_language,
+            'target-language': export_file.language,
+            'datatype': 'plaintext',
+        })
+        writer.ignorableWhitespace('\n    ')
+        writer.startElement('body', {})
+
+        for key, source, target in export_file.units:
+            writer.ignorableWhitespace('\n      ')
+            writer.startElement('trans-unit', {
+                'id': key,
+                'xml:space': 'preserve',
+            })
+            writer.ignorableWhitespace('\n        ')
+            _text_element(writer, 'source', source)
+            if target is not None:
+                writer.ignorableWhitespace('\n        ')
+                _text_element(writer, 'target', target)
+            writer.ignorableWhitespace('\n      ')
+            writer.endElement('trans-unit')
+            count += 1
+
+        writer.ignorableWhitespace('\n    ')
+        writer.endElement('body')
+        writer.ignorableWhitespace('\n  ')
+        writer.endElement('file')
+
+    writer.ignorableWhitespace('\n')
+    writer.endElement('xliff')
+    writer.ignorableWhitespace('\n')
+    writer.endDocument()
+
+    return count
+
+
+def _text_element(writer, name, text):
+    writer.startElement(name, {})
+    writer.characters(text)
+    writer.endElement(name)
+
+
+def _local_name(tag):
+    return tag.rpartition('}')[2]
+
+
+def read_xliff(source):
+    """Parses an XLIFF 1.2 document incrementally. Each <trans-unit> is
+    dropped from the tree once it has been read, so however many units
+    the document has, only a parse buffer's worth is held at a time."""
+    original = None
+    parents = []
+
+    for event, element in ElementTree.iterparse(
+            source, events=('start', 'end')):
+        name = _local_name(element.tag)
+        if event == 'start':
+            if name == 'file':
+                original = element.get('original')
+            parents.append(element)
+            continue
+
+        parents.pop()
+        if name != 'trans-unit':
+            continue
+
+        target = None
+        for child in element:
+            if _local_name(child.tag) == 'target':
+                target = ''.join(child.itertext())
+        yield original, element.get('resname') or element.get('id'), target
+
+        # Units after this one may already be parsed; clearing the parent
+        # only detaches them, their own events still hold on to them.
+        element.clear()
+        if parents:
+            parents[-1].clear()
+
+
+def write_csv(output, files):
+    """Writes a CSV file with a header and a row for each unit."""
+    writer = csv.writer(output)
+    writer.writerow(CSV_COLUMNS)
+    count = 0
+
+    for export_file in files:
+        for key, source, target in export_file.units:
+            writer.writerow([
+                export_file.original, export_file.language, key, source,
+                target if target is not None else '',
+            ])
+            count += 1
+
+    return count
+
+
+def read_csv(source):
+    """Reads the rows of a CSV file written by write_csv, one at a time.
+    Only the path, key and target columns are used."""
+    reader = csv.DictReader(source)
+    missing = set(['path', 'key', 'target']) - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError('Missing CSV columns: {}'.format(
+            ', '.join(sorted(missing))
+        ))
+
+    for row in reader:
+        yield row['path'], row['key'], row['target'] or None
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import shutil
+import tempfile
+
+import instrumentation
+
+
+logging.basicConfig(level=logging.DEBUG)
+log = logging.getLogger(__name__)
+
+
+def _fsync_dir(path):
+    """Flushes a directory entry, so that a rename inside it is durable.
+    Not every platform allows opening a directory, so failures are
+    ignored."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class FileTransaction(object):
+    """Replaces the contents of several files together, or not at all.
+
+    New contents are staged in temporary files next to their targets, so
+    that moving them into place is a rename on the same filesystem rather
+    than a copy. On commit the staged files are flushed to disk together,
+    then each target is swapped for its staged file. If any swap fails, the
+    targets which were already swapped are restored from hard links to
+    their original contents.
+
+    Can be used as a context manager, which commits on success and throws
+    away the staged files on an exception.
+    """
+    def __init__(self):
+        self._staged = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def __len__(self):
+        return len(self._staged)
+
+    def stage(self, path, data):
+        """Writes data to a temporary file in the same directory as path."""
+        directory, filename = os.path.split(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(
+            prefix='.{}.'.format(filename), suffix='.tmp', dir=directory
+        )
+
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                temp_file.write(data)
+            if os.path.exists(path):
+                shutil.copymode(path, temp_path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+        self._staged.append((path, temp_path))
+        instrumentation.record_written(path, len(data))
+
+    def rollback(self):
+        """Throws away the staged files without touching the targets."""
+        for _, temp_path in self._staged:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+        self._staged = []
+
+    def _backup(self, path):
+        """Keeps the current contents of path reachable under a temporary
+        name, without copying them where the filesystem allows it."""
+        if not os.path.exists(path):
+            return None
+
+        directory, filename = os.path.split(os.path.abspath(path))
+        fd, backup_path = tempfile.mkstemp(
+            prefix='.{}.'.format(filename), suffix='.bak', dir=directory
+        )
+        os.close(fd)
+        os.remove(backup_path)
+
+        try:
+            os.link(path, backup_path)
+        except OSError:
+            shutil.copy2(path, backup_path)
+
+        return backup_path
+
+    def _restore(self, replaced):
+        """Puts back the original contents of the replaced targets."""
+        for path, backup_path in reversed(replaced):
+            if backup_path is None:
+                os.remove(path)
+            else:
+                os.replace(backup_path, path)
+
+    def commit(self):
+        """Moves every staged file into place."""
+        with instrumentation.timed('transaction.commit'):
+            self._commit()
+
+    def _commit(self):
+        staged = self._staged
+
+        try:
+            for _, temp_path in staged:
+                with open(temp_path, 'rb') as temp_file:
+                    os.fsync(temp_file.fileno())
+        except Exception:
+            self.rollback()
+            raise
+
+        replaced = []
+        try:
+            for path, temp_path in staged:
+                backup_path = self._backup(path)
+                try:
+                    os.replace(temp_path, path)
+                except Exception:
+                    if backup_path is not None:
+                        os.remove(backup_path)
+                    raise
+                replaced.append((path, backup_path))
+        except Exception:
+            log.error('Rolling back %d files', len(replaced))
+            self._restore(replaced)
+            self.rollback()
+            raise
+
+        for directory in {os.path.dirname(os.path.abspath(path))
+                          for path, _ in staged}:
+            _fsync_dir(directory)
+
+        for _, backup_path in replaced:
+            if backup_path is not None:
+                os.remove(backup_path)
+
+        self._staged = []
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import contextlib
+import cProfile
+import json
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+
+STATS_HELP = ("Write a JSON summary of translate calls, bytes read and"
+              " written, time spent in each stage and cache hit rates to"
+              " STDERR.")
+STATS_FILE_HELP = "Write the --stats summary to this file instead."
+PROFILE_HELP = ("Profile the run, writing cProfile output to PREFIX.prof and"
+                " the largest memory allocations to PREFIX.tracemalloc.txt.")
+
+HITS_SUFFIX = '.hits'
+MISSES_SUFFIX = '.misses'
+TRACEMALLOC_FRAMES = 10
+TRACEMALLOC_TOP = 30
+
+
+class Stats(object):
+    """Counters, stage timers and per-file byte counts, shared by every
+    thread in the process.
+
+    Counters named <name>.hits and <name>.misses are reported together as
+    the hit rate of <name>.
+
+    Attributes:
+        counters
+        timers -- Maps each stage to [calls, seconds]
+        files -- Maps each path to its bytes read and written
+        started_at
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = collections.Counter()
+            self.timers = {}
+            self.files = {}
+            self.started_at = time.perf_counter()
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            timer = self.timers.setdefault(name, [0, 0.0])
+            timer[0] += 1
+            timer[1] += seconds
+
+    @contextlib.contextmanager
+    def timed(self, name):
+        """Adds the time spent in the block to the stage called name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def _record_file(self, path, direction, nbytes):
+        with self._lock:
+            record = self.files.setdefault(path, {'read': 0, 'written': 0})
+            record[direction] += nbytes
+
+    def record_read(self, path, nbytes):
+        self._record_file(path, 'read', nbytes)
+
+    def record_written(self, path, nbytes):
+        self._record_file(path, 'written', nbytes)
+
+    def hit_rates(self, counters):
+        prefixes = set()
+        for name in counters:
+            for suffix in (HITS_SUFFIX, MISSES_SUFFIX):
+                if name.endswith(suffix):
+                    prefixes.add(name[:-len(suffix)])
+
+        rates = {}
+        for prefix in prefixes:
+            hits = counters.get(prefix + HITS_SUFFIX, 0)
+            total = hits + counters.get(prefix + MISSES_SUFFIX, 0)
+            rates[prefix] = float(hits) / total if total else None
+
+        return rates
+
+    def summary(self):
+        """Returns everything recorded so far as a JSON serializable
+        dict."""
+        with self._lock:
+            counters = dict(self.counters)
+            timers = {
+                name: {'calls': calls, 'seconds': seconds}
+                for name, (calls, seconds) in self.timers.items()
+            }
+            files = {path: dict(record) for path, record in self.files.items()}
+            wall_seconds = time.perf_counter() - self.started_at
+
+        return {
+            'wall_seconds': wall_seconds,
+            'counters': counters,
+            'stages': timers,
+            'hit_rates': self.hit_rates(counters),
+            'files': files,
+            'bytes_read': sum(record['read'] for record in files.values()),
+            'bytes_written': sum(
+                record['written'] for record in files.values()
+            ),
+        }
+
+
+_stats = Stats()
+
+increment = _stats.increment
+timed = _stats.timed
+add_time = _stats.add_time
+record_read = _stats.record_read
+record_written = _stats.record_written
+summary = _stats.summary
+reset = _stats.reset
+
+# The profilers of the blocks other threads ran under profiled, while the
+# run is being profiled, or None.
+_thread_profilers = None
+_thread_profilers_lock = threading.Lock()
+
+
+def add_arguments(parser):
+    """Adds the --stats, --stats-file and --profile flags to a command's
+    argument parser."""
+    parser.add_argument(
+        "--stats", action="store_true", default=False, help=STATS_HELP
+    )
+    parser.add_argument(
+        "--stats-file", type=str, metavar="FILE", help=STATS_FILE_HELP
+    )
+    parser.add_argument(
+        "--profile", type=str, metavar="PREFIX", help=PROFILE_HELP
+    )
+
+
+def write_summary(stats_file=None):
+    """Writes the summary as JSON to stats_file, or to STDERR."""
+    output = json.dumps(summary(), indent=2, sort_keys=True) + '\n'
+
+    if stats_file is None:
+        sys.stderr.write(output)
+    else:
+        with open(stats_file, 'w', encoding='utf-8') as summary_file:
+            summary_file.write(output)
+
+
+def write_profile(prefix, profilers, snapshot):
+    """Writes the cProfile stats of every profiler, combined, which python
+    -m pstats can read, and the largest allocations traced by
+    tracemalloc."""
+    pstats.Stats(*profilers).dump_stats('{}.prof'.format(prefix))
+
+    current, peak = tracemalloc.get_traced_memory()
+    top_stats = snapshot.statistics('lineno')
+    with open('{}.tracemalloc.txt'.format(prefix), 'w') as memory_file:
+        memory_file.write(
+            'current {} bytes, peak {} bytes\n'.format(current, peak)
+        )
+        for stat in top_stats[:TRACEMALLOC_TOP]:
+            memory_file.write('{}\n'.format(stat))
+
+
+@contextlib.contextmanager
+def profiled():
+    """Adds the block to the profile of the run, if it is being profiled.
+
+    cProfile only profiles the thread which enabled it, so instrumented
+    only sees the thread it runs in. This is for the work done in other
+    threads, like the requests a daemon serves.
+    """
+    if _thread_profilers is None:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        with _thread_profilers_lock:
+            if _thread_profilers is not None:
+                _thread_profilers.append(profiler)
+
+
+@contextlib.contextmanager
+def instrumented(args):
+    """Runs the block of a command with the instrumentation its flags asked
+    for."""
+    global _thread_profilers
+
+    reset()
+    profiler = None
+    if args.profile:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        _thread_profilers = []
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            with _thread_profilers_lock:
+                profilers = [profiler] + _thread_profilers
+                _thread_profilers = None
+            write_profile(
+                args.profile, profilers, tracemalloc.take_snapshot()
+            )
+            tracemalloc.stop()
+
+        if args.stats or args.stats_file:
+            write_summary(args.stats_file)
@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import logging
+import math
+import os
+import sqlite3
+import threading
+
+import instrumentation
+import strings_file
+from lproj_discovery import project_filename
+from translation_cache import normalize_text
+
+
+# Bump this whenever the schema changes, so that old indexes are rebuilt.
+INDEX_VERSION = 2
+BASE_LANGUAGE = 'Base'
+DEFAULT_SEARCH_LIMIT = 10
+DEFAULT_MIN_SCORE = 0.3
+# The most entries sharing trigrams with a search to score in Python.
+MAX_SEARCH_CANDIDATES = 5000
+
+CREATE_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS files (
+        id INTEGER PRIMARY KEY,
+        path TEXT NOT NULL UNIQUE,
+        target TEXT NOT NULL,
+        strings_table TEXT NOT NULL,
+        language TEXT NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        size INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS entries (
+        key TEXT NOT NULL,
+        file_id INTEGER NOT NULL,
+        value TEXT NOT NULL,
+        line INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS entries_key ON entries (key, file_id)",
+    "CREATE INDEX IF NOT EXISTS entries_file ON entries (file_id)",
+    """
+    CREATE TABLE IF NOT EXISTS duplicate_keys (
+        key TEXT PRIMARY KEY,
+        tables INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS base_trigrams (
+        trigram TEXT NOT NULL,
+        entry_id INTEGER NOT NULL,
+        PRIMARY KEY (trigram, entry_id)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS base_trigrams_entry
+    ON base_trigrams (entry_id)
+    """,
+]
+DROP_SQL = [
+    "DROP TABLE IF EXISTS files",
+    "DROP TABLE IF EXISTS entries",
+    "DROP TABLE IF EXISTS duplicate_keys",
+    "DROP TABLE IF EXISTS base_trigrams",
+]
+# A key is a duplicate when it is defined in more than one table, counting
+# the same table name in two targets as two tables.
+REBUILD_DUPLICATES_SQL = """
+INSERT INTO duplicate_keys (key, tables)
+SELECT entries.key, COUNT(DISTINCT files.target || '/' || files.strings_table)
+FROM entries JOIN files ON files.id = entries.file_id
+GROUP BY entries.key
+HAVING COUNT(DISTINCT files.target || '/' || files.strings_table) > 1
+"""
+SELECT_ENTRIES_SQL = """
+SELECT entries.key, files.target, files.strings_table, files.language,
+       entries.value, files.path, entries.line
+FROM entries JOIN files ON files.id = entries.file_id
+"""
+ENTRY_FIELDS = [
+    'key', 'target', 'table', 'language', 'value', 'path', 'line',
+]
+
+logging.basicConfig(level=logging.DEBUG)
+log = logging.getLogger(__name__)
+
+
+def index_filename(project_dir):
+    return project_filename(project_dir, 'key_index', '.sqlite3')
+
+
+def prefix_upper_bound(prefix):
+    """Returns the smallest string greater than every string starting with
+    prefix, so that a prefix search is a range scan of the key index.
+
+    >>> prefix_upper_bound('menu.')
+    'menu/'
+    """
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def folded(text):
+    """Normalizes text for comparison, ignoring case and spacing."""
+    return ' '.join(normalize_text(text).casefold().split())
+
+
+def trigrams(text):
+    """Returns the set of three character sequences in the case folded
+    text, with words separated by single spaces and a space at either end,
+    so that short texts and word boundaries have trigrams too.
+
+    >>> sorted(trigrams('OK'))
+    [' ok', 'ok ']
+    """
+    padded = ' {} '.format(folded(text))
+    return set(padded[idx:idx + 3] for idx in range(len(padded) - 2))
+
+
+def similarity(query_trigrams, text_trigrams):
+    """The share of trigrams the two sets have in common."""
+    union = len(query_trigrams | text_trigrams)
+    if not union:
+        return 0.0
+    return float(len(query_trigrams & text_trigrams)) / union
+
+
+def scan_entries(path):
+    """Yields (key, value, line) for every entry of a .strings file, with
+    the line each entry starts on."""
+    data, _, _ = strings_file.read_source(path)
+    newline = '\n' if isinstance(data, str) else b'\n'
+    line = 1
+    pos = 0
+
+    for key, value, (start, _) in strings_file.tokenize(data):
+        line += data.count(newline, pos, start)
+        pos = start
+        yield key, value, line
+
+
+class KeyIndex(object):
+    """A SQLite index of every entry in every strings file of a project,
+    from key to (target, table, language, value, path, line), along with a
+    trigram index of the Base values for finding similar texts.
+
+    A target is the directory holding a group of .lproj folders, relative
+    to the project directory. The index is kept up to date by refresh,
+    which only reads the files whose modification time or size changed.
+
+    Attributes:
+        path
+        project_dir
+        reindexed -- The files which were read by the last refresh
+    """
+    def __init__(self, path, project_dir):
+        self.path = path
+        self.project_dir = os.path.abspath(project_dir)
+        self.reindexed = []
+        self._lock = threading.RLock()
+        self._connection = None
+
+    @property
+    def _conn(self):
+        """Opens the database the first time it is needed, rebuilding it if
+        it was made by another version."""
+        with self._lock:
+            if self._connection is None:
+                index_dir = os.path.dirname(self.path)
+                if index_dir and not os.path.exists(index_dir):
+                    os.makedirs(index_dir)
+
+                connection = sqlite3.connect(
+                    self.path, check_same_thread=False
+                )
+                version = connection.execute(
+                    'PRAGMA user_version'
+                ).fetchone()[0]
+                with connection:
+                    if version != INDEX_VERSION:
+                        for statement in DROP_SQL:
+                            connection.execute(statement)
+                    for statement in CREATE_SQL:
+                        connection.execute(statement)
+                connection.execute(
+                    'PRAGMA user_version = {:d}'.format(INDEX_VERSION)
+                )
+
+                self._connection = connection
+
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def target(self, path):
+        """The directory holding the .lproj folder of path, relative to the
+        project directory."""
+        return os.path.relpath(
+            os.path.dirname(os.path.dirname(os.path.abspath(path))),
+            self.project_dir
+        )
+
+    def refresh(self, lprojs):
+        """Brings the index up to date with the files of the language
+        projects, reading only the files which changed and dropping the
+        ones which are gone."""
+        current = {}
+        for lproj in lprojs:
+            path = os.path.abspath(lproj.path)
+            stat = os.stat(path)
+            current[path] = (lproj, stat.st_mtime_ns, stat.st_size)
+
+        with self._lock, self._conn:
+            known = {
+                path: (file_id, mtime_ns, size)
+                for file_id, path, mtime_ns, size in self._conn.execute(
+                    'SELECT id, path, mtime_ns, size FROM files'
+                )
+            }
+
+            removed = [
+                known[path][0] for path in known if path not in current
+            ]
+            changed = [
+                (path, lproj, mtime_ns, size)
+                for path, (lproj, mtime_ns, size) in sorted(current.items())
+                if known.get(path, (None,))[1:] != (mtime_ns, size)
+            ]
+            stale = removed + [
+                known[path][0] for path, _, _, _ in changed if path in known
+            ]
+
+            self._conn.executemany(
+                'DELETE FROM base_trigrams WHERE entry_id IN ('
+                'SELECT rowid FROM entries WHERE file_id = ?)',
+                [(file_id,) for file_id in stale]
+            )
+            self._conn.executemany(
+                'DELETE FROM entries WHERE file_id = ?',
+                [(file_id,) for file_id in stale]
+            )
+            self._conn.executemany(
+                'DELETE FROM files WHERE id = ?',
+                [(file_id,) for file_id in removed]
+            )
+
+            for path, lproj, mtime_ns, size in changed:
+                self._index_file(path, lproj, mtime_ns, size)
+
+            if removed or changed:
+                self._conn.execute('DELETE FROM duplicate_keys')
+                self._conn.execute(REBUILD_DUPLICATES_SQL)
+
+        self.reindexed = [path for path, _, _, _ in changed]
+        instrumentation.increment(
+            'key_index.hits', len(current) - len(changed)
+        )
+        instrumentation.increment('key_index.misses', len(changed))
+        log.debug(
+            'Indexed %d of %d language files', len(changed), len(current)
+        )
+
+    def _index_file(self, path, lproj, mtime_ns, size):
+        file_id = self._conn.execute(
+            'INSERT OR REPLACE INTO files '
+            '(path, target, strings_table, language, mtime_ns, size) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (path, self.target(path), lproj.table, lproj.language_code,
+             mtime_ns, size)
+        ).lastrowid
+
+        self._conn.executemany(
+            'INSERT INTO entries (key, file_id, value, line) '
+            'VALUES (?, ?, ?, ?)',
+            [(key, file_id, value, line)
+             for key, value, line in scan_entries(path)]
+        )
+
+        if lproj.language_code == BASE_LANGUAGE:
+            base_entries = self._conn.execute(
+                'SELECT rowid, value FROM entries WHERE file_id = ?',
+                (file_id,)
+            ).fetchall()
+            self._conn.executemany(
+                'INSERT INTO base_trigrams (trigram, entry_id) VALUES (?, ?)',
+                [(trigram, entry_id)
+                 for entry_id, value in base_entries
+                 for trigram in trigrams(value)]
+            )
+
+    def _select(self, where, arguments, limit=None):
+        sql = (
+            SELECT_ENTRIES_SQL + where +
+            ' ORDER BY entries.key, files.target, files.strings_table,'
+            ' files.language'
+        )
+        if limit is not None:
+            sql += ' LIMIT {:d}'.format(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, arguments).fetchall()
+
+        return [dict(zip(ENTRY_FIELDS, row)) for row in rows]
+
+    def lookup(self, key):
+        """Returns every definition of key."""
+        return self._select('WHERE entries.key = ?', (key,))
+
+    def prefix(self, prefix, limit=None):
+        """Returns every definition of the keys starting with prefix, in
+        key order."""
+        if not prefix:
+            return self._select('', (), limit)
+
+        return self._select(
+            'WHERE entries.key >= ? AND entries.key < ?',
+            (prefix, prefix_upper_bound(prefix)), limit
+        )
+
+    def duplicates(self, limit=None):
+        """Returns the keys defined in more than one table, each with all
+        of its definitions."""
+        sql = 'SELECT key FROM duplicate_keys ORDER BY key'
+        if limit is not None:
+            sql += ' LIMIT {:d}'.format(limit)
+
+        with self._lock:
+            keys = [row[0] for row in self._conn.execute(sql)]
+
+        duplicates = collections.OrderedDict()
+        for key in keys:
+            duplicates[key] = self.lookup(key)
+
+        return duplicates
+
+    def search(self, text, limit=DEFAULT_SEARCH_LIMIT,
+               min_score=DEFAULT_MIN_SCORE):
+        """Finds the Base values most similar to text, best first.
+
+        Returns a dict for each match with its key, target, table, Base
+        value, score between 0 and 1, whether it is an exact match once
+        case and spacing are ignored, and the key's value in every language
+        of the same table.
+        """
+        query = trigrams(text)
+        # No entry sharing fewer trigrams could reach min_score.
+        min_shared = max(1, int(math.ceil(min_score * len(query))))
+        placeholders = ', '.join('?' * len(query))
+
+        with self._lock:
+            rows = self._conn.execute(
+                SELECT_ENTRIES_SQL +
+                'WHERE entries.rowid IN ('
+                'SELECT entry_id FROM base_trigrams '
+                'WHERE trigram IN ({}) GROUP BY entry_id '
+                'HAVING COUNT(*) >= ? ORDER BY COUNT(*) DESC '
+                'LIMIT ?)'.format(placeholders),
+                list(query) + [min_shared, MAX_SEARCH_CANDIDATES]
+            ).fetchall()
+
+        matches = []
+        normalized = folded(text)
+        for row in rows:
+            entry = dict(zip(ENTRY_FIELDS, row))
+            score = similarity(query, trigrams(entry['value']))
+            if score < min_score:
+                continue
+
+            matches.append({
+                'key': entry['key'],
+                'target': entry['target'],
+                'table': entry['table'],
+                'value': entry['value'],
+                'score': score,
+                'exact': normalized == folded(entry['value']),
+            })
+
+        matches.sort(key=lambda match: (-match['score'], match['key']))
+        matches = matches[:limit]
+
+        for match in matches:
+            match['translations'] = {
+                entry['language']: entry['value']
+                for entry in self._select(
+                    'WHERE entries.key = ? AND files.target = ? '
+                    'AND files.strings_table = ?',
+                    (match['key'], match['target'], match['table'])
+                )
+            }
+
+        return matches
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM entries'
+            ).fetchone()[0]
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+import array
+import bisect
+
+
+# Unsigned 32 bit ids and offsets, plenty for any one project or file.
+ID_TYPECODE = 'I'
+ENCODING = 'utf-8'
+
+
+class Column(object):
+    """The entries of one language file. key_ids is sorted, so that a key
+    is found by binary search, and the value of key_ids[i] is
+    data[offsets[i]:offsets[i + 1]], UTF-8 encoded, as one blob of bytes
+    takes far less memory than a string object for every value."""
+    __slots__ = ('key_ids', 'offsets', 'data')
+
+    def __init__(self, key_ids, values):
+        encoded = [value.encode(ENCODING) for value in values]
+        offsets = [0]
+        for value in encoded:
+            offsets.append(offsets[-1] + len(value))
+
+        self.key_ids = array.array(ID_TYPECODE, key_ids)
+        self.offsets = array.array(ID_TYPECODE, offsets)
+        self.data = b''.join(encoded)
+
+    @classmethod
+    def packed(cls, key_ids, offsets, data):
+        """Builds a column from the lists and bytes it holds, as saved by
+        KeyMatrix.to_json."""
+        column = cls.__new__(cls)
+        column.key_ids = array.array(ID_TYPECODE, key_ids)
+        column.offsets = array.array(ID_TYPECODE, offsets)
+        column.data = data
+        return column
+
+    def __len__(self):
+        return len(self.key_ids)
+
+    def position(self, key_id):
+        idx = bisect.bisect_left(self.key_ids, key_id)
+        if idx < len(self.key_ids) and self.key_ids[idx] == key_id:
+            return idx
+        return None
+
+    def value(self, idx):
+        return self.data[self.offsets[idx]:self.offsets[idx + 1]].decode(
+            ENCODING
+        )
+
+    def values(self):
+        return [self.value(idx) for idx in range(len(self.key_ids))]
+
+
+class KeyMatrix(object):
+    """Every key and value of a project's language files, with each
+    distinct key kept once however many files share it.
+
+    Each file is a Column of integer key ids and packed values, rather
+    than a dict of its own key and value strings, so a project with tens of
+    thousands of keys in dozens of languages takes a fraction of the
+    memory.
+
+    Attributes:
+        keys -- Every key, indexed by id
+        columns -- Maps each file's path to its Column
+    """
+    def __init__(self):
+        self.keys = []
+        self.columns = {}
+        self._key_ids = {}
+        self._entries = 0
+        self._dropped = 0
+
+    def key_id(self, key):
+        """Returns the id of the key, adding it if it is new."""
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            key_id = self._key_ids[key] = len(self.keys)
+            self.keys.append(key)
+        return key_id
+
+    def intern(self, key):
+        """Returns the matrix's own copy of the key."""
+        return self.keys[self.key_id(key)]
+
+    def set_column(self, path, entries):
+        """Replaces the column of path with the (key, value) pairs. When a
+        key appears more than once, its first value is kept."""
+        by_key = {}
+        for key, value in entries:
+            by_key.setdefault(self.key_id(key), value)
+
+        key_ids = sorted(by_key)
+        self.drop_column(path)
+        self.columns[path] = Column(
+            key_ids, [by_key[key_id] for key_id in key_ids]
+        )
+        self._entries += len(key_ids)
+
+        # Once replaced files have left behind as many keys as there are
+        # entries, they are worth dropping.
+        if self._dropped > self._entries:
+            self.compact()
+
+    def drop_column(self, path):
+        column = self.columns.pop(path, None)
+        if column is not None:
+            self._entries -= len(column)
+            self._dropped += len(column)
+
+    def __contains__(self, path):
+        return path in self.columns
+
+    def get(self, path, key):
+        """Returns the value of the key in the file, or None."""
+        column = self.columns.get(path)
+        key_id = self._key_ids.get(key)
+        if column is None or key_id is None:
+            return None
+
+        idx = column.position(key_id)
+        if idx is None:
+            return None
+        return column.value(idx)
+
+    def items(self, path):
+        """Yields the (key, value) pairs of the file, in key id order."""
+        column = self.columns[path]
+        for idx, key_id in enumerate(column.key_ids):
+            yield self.keys[key_id], column.value(idx)
+
+    def missing_keys(self, base_path, path):
+        """Returns the sorted keys of base_path which are not in path."""
+        present = set(self.columns[path].key_ids)
+        return sorted(
+            self.keys[key_id] for key_id in self.columns[base_path].key_ids
+            if key_id not in present
+        )
+
+    def coverage(self, base_path, path):
+        """Returns how many of the keys of base_path are in path, and how
+        many keys base_path has."""
+        base_key_ids = self.columns[base_path].key_ids
+        present = set(self.columns[path].key_ids)
+        translated = sum(1 for key_id in base_key_ids if key_id in present)
+        return translated, len(base_key_ids)
+
+    def compact(self):
+        """Drops the keys which no file has any more. The rest are
+        renumbered in order, so each column stays sorted."""
+        columns = self.columns.values()
+        key_ids = sorted(set().union(*(col.key_ids for col in columns)))
+        new_key_ids = {key_id: idx for idx, key_id in enumerate(key_ids)}
+
+        self.keys = [self.keys[key_id] for key_id in key_ids]
+        self._key_ids = {key: idx for idx, key in enumerate(self.keys)}
+        for column in columns:
+            column.key_ids = array.array(
+                ID_TYPECODE, [new_key_ids[key_id] for key_id in column.key_ids]
+            )
+        self._dropped = 0
+
+    def to_json(self):
+        """Returns the matrix as JSON-able lists, after compacting it. Each
+        column's values are kept packed, as one string and the byte offsets
+        of the values in it, which is much quicker to save and load than a
+        string for every value."""
+        self.compact()
+        return {
+            'keys': self.keys,
+            'columns': {
+                path: [
+                    column.key_ids.tolist(), column.offsets.tolist(),
+                    column.data.decode(ENCODING),
+                ]
+                for path, column in self.columns.items()
+            },
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        matrix = cls()
+        for key in data['keys']:
+            matrix.key_id(key)
+        for path, (key_ids, offsets, text) in data['columns'].items():
+            matrix.columns[path] = Column.packed(
+                key_ids, offsets, text.encode(ENCODING)
+            )
+            matrix._entries += len(key_ids)
+
+        return matrix
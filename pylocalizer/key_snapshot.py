@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import instrumentation
+import strings_file
+from key_matrix import KeyMatrix
+from lproj_discovery import project_filename
+
+
+SNAPSHOT_VERSION = 4
+# Fewer stale files than this are parsed in process, as starting a pool of
+# worker processes costs more than parsing a handful of files.
+MIN_POOL_FILES = 8
+
+logging.basicConfig(level=logging.DEBUG)
+log = logging.getLogger(__name__)
+
+
+def snapshot_filename(project_dir):
+    return project_filename(project_dir, 'diff_keys_snapshot', '.json')
+
+
+def fingerprint(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def scan_strings_file(path, known_digest=None):
+    """Reads the entries of a .strings file.
+
+    Returns (path, fingerprint, digest, entries), where entries is a list
+    of (key, value) pairs. entries is None when the content hash of the
+    file matches known_digest, as the file has not really changed. Runs in
+    a worker process.
+    """
+    file_fingerprint = fingerprint(path)
+    with open(path, 'rb') as lproj_file:
+        raw = lproj_file.read()
+
+    digest = hashlib.sha1(raw).hexdigest()
+    if digest == known_digest:
+        return path, file_fingerprint, digest, None
+
+    data, _, _ = strings_file.decode_source(raw)
+    entries = [(key, value) for key, value, _ in strings_file.tokenize(data)]
+
+    return path, file_fingerprint, digest, entries
+
+
+class KeySnapshot(object):
+    """The entries of every language file as of the last run, saved to disk
+    so that the next run only has to read the files which have changed.
+
+    The entries are held in a KeyMatrix. Files are recorded by their
+    absolute path, however the project directory was given. Each file is
+    also recorded with
+    its modification time, size and content hash, and the keys it was
+    missing compared to the base file along with the content hash of the
+    base file at the time.
+
+    Attributes:
+        path
+        files
+        matrix
+        rescanned -- The files which were parsed by the last refresh
+        changed -- Whether there is anything new to save
+    """
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        self.matrix = KeyMatrix()
+        self.rescanned = []
+        self.changed = False
+
+        try:
+            with open(path, 'r', encoding='utf-8') as snapshot_file:
+                snapshot = json.load(snapshot_file)
+        except (IOError, ValueError):
+            return
+
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            return
+
+        try:
+            self.matrix = KeyMatrix.from_json(snapshot['matrix'])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            log.warning('Ignoring the malformed snapshot %s', path)
+            return
+        self.files = snapshot.get('files', {})
+        for record in self.files.values():
+            missing = record.get('missing')
+            if missing is not None:
+                missing['keys'] = [
+                    self.matrix.intern(key) for key in missing['keys']
+                ]
+
+    def _is_stale(self, path):
+        record = self.files.get(path)
+        return record is None or record['fingerprint'] != fingerprint(path)
+
+    def update(self, path, document):
+        """Records the entries of a file which was just written with the
+        contents of document, without reading it back."""
+        path = os.path.abspath(path)
+        self.matrix.set_column(path, document.items())
+        self.files[path] = {
+            'fingerprint': fingerprint(path),
+            'digest': hashlib.sha1(document.to_bytes()).hexdigest(),
+        }
+        self.changed = True
+
+    def refresh(self, paths, workers=None):
+        """Re-reads every file whose modification time or size changed since
+        the snapshot was taken, on a pool of worker processes when there
+        are at least MIN_POOL_FILES of them."""
+        paths = [os.path.abspath(path) for path in paths]
+        stale = [path for path in paths if self._is_stale(path)]
+        instrumentation.increment('key_snapshot.hits', len(paths) - len(stale))
+        instrumentation.increment('key_snapshot.misses', len(stale))
+        jobs = [
+            (path, self.files.get(path, {}).get('digest')) for path in stale
+        ]
+
+        if workers == 1 or len(jobs) < MIN_POOL_FILES:
+            results = [scan_strings_file(*job) for job in jobs]
+        else:
+            with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+                results = list(executor.map(scan_strings_file, *zip(*jobs)))
+
+        self.rescanned = []
+        for path, file_fingerprint, digest, entries in results:
+            # The files were read in the worker processes, whose counters
+            # are lost, so they are counted here.
+            instrumentation.record_read(path, file_fingerprint[1])
+            self.changed = True
+            if entries is None:
+                self.files[path]['fingerprint'] = file_fingerprint
+                continue
+
+            self.rescanned.append(path)
+            self.matrix.set_column(path, entries)
+            self.files[path] = {
+                'fingerprint': file_fingerprint,
+                'digest': digest,
+            }
+
+        log.debug(
+            'Parsed %d of %d language files', len(self.rescanned), len(paths)
+        )
+
+    def get(self, path, key):
+        return self.matrix.get(os.path.abspath(path), key)
+
+    def items(self, path):
+        return self.matrix.items(os.path.abspath(path))
+
+    def missing_keys(self, base_path, path):
+        """Returns the sorted keys of base_path which are not in path,
+        reusing the previous answer if neither file has changed."""
+        base_path = os.path.abspath(base_path)
+        path = os.path.abspath(path)
+        base_digest = self.files[base_path]['digest']
+        record = self.files[path]
+        missing = record.get('missing')
+
+        if missing is None or missing['base_digest'] != base_digest:
+            missing = {
+                'base_digest': base_digest,
+                'keys': self.matrix.missing_keys(base_path, path),
+            }
+            record['missing'] = missing
+            self.changed = True
+
+        return missing['keys']
+
+    def coverage(self, base_path, path):
+        return self.matrix.coverage(
+            os.path.abspath(base_path), os.path.abspath(path)
+        )
+
+    def save(self):
+        """Writes the snapshot to a temporary file next to its final path,
+        then moves it into place so that a reader never sees half of it.
+        Does nothing if nothing changed since it was loaded or last saved."""
+        if not self.changed:
+            return
+
+        snapshot_dir = os.path.dirname(os.path.abspath(self.path))
+        if not os.path.exists(snapshot_dir):
+            os.makedirs(snapshot_dir, exist_ok=True)
+
+        # json.dumps encodes in C, where json.dump does not.
+        data = json.dumps({
+            'version': SNAPSHOT_VERSION,
+            'files': self.files,
+            'matrix': self.matrix.to_json(),
+        })
+        # Each process stages its own file, as another may be saving the
+        # same snapshot.
+        fd, temp_path = tempfile.mkstemp(dir=snapshot_dir)
+        with os.fdopen(fd, 'w', encoding='utf-8') as snapshot_file:
+            snapshot_file.write(data)
+        os.replace(temp_path, self.path)
+        self.changed = False
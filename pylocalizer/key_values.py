@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+
+import collections
+
+
+def read_key_values(lines):
+    """Reads a mapping from key=value lines, skipping blank lines and lines
+    starting with #."""
+    mapping = collections.OrderedDict()
+
+    for line in lines:
+        line = line.strip('\n')
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+
+        key, sep, value = line.partition('=')
+        if not sep:
+            raise ValueError("Invalid key/value pair: {}".format(line))
+        mapping[key] = value
+
+    return mapping
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""A thin client for lproj_daemon. It imports nothing which is slow to load,
+so that starting it costs far less than running add_localized_string."""
+
+import argparse
+import json
+import socket
+import sys
+
+import constants
+from key_values import read_key_values
+
+
+SOCKET_HELP = "The daemon's Unix socket. Defaults to {}.".format(
+    constants.DAEMON_SOCKET_PATH
+)
+GET_HELP = "Fetches a key from every language project."
+KEY_HELP = "The key to fetch."
+LANGUAGES_HELP = "A comma separated list of languages to fetch."
+SET_HELP = "Translates a key=value pair into every language project."
+SET_MANY_HELP = ("Translates a file of key=value lines, or - for STDIN,"
+                 " into every language project at once.")
+DIFF_KEYS_HELP = "Lists the keys missing from each non-Base language."
+COVERAGE_HELP = "Lists how many of the Base keys each language has."
+PING_HELP = "Checks that the daemon is running."
+STATS_HELP = "Prints the daemon's instrumentation summary."
+SHUTDOWN_HELP = "Stops the daemon."
+
+
+class DaemonError(Exception):
+    def __init__(self, message):
+        self.message = message
+
+    def __str__(self):
+        return "The daemon failed the request: {}".format(self.message)
+
+    __repr__ = __str__
+
+
+class LocalizationClient(object):
+    """Sends requests to lproj_daemon over one connection.
+
+    Attributes:
+        socket_path
+    """
+    def __init__(self, socket_path=constants.DAEMON_SOCKET_PATH):
+        self.socket_path = socket_path
+        self._socket = None
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def connect(self):
+        if self._socket is None:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.connect(self.socket_path)
+            self._file = self._socket.makefile('rwb')
+
+    def close(self):
+        if self._socket is not None:
+            self._file.close()
+            self._socket.close()
+            self._socket = None
+            self._file = None
+
+    def request(self, command, **arguments):
+        """Sends a request and returns its result, raising DaemonError if
+        the daemon could not carry it out."""
+        self.connect()
+        arguments['command'] = command
+        self._file.write(json.dumps(arguments).encode('utf-8') + b'\n')
+        self._file.flush()
+
+        line = self._file.readline()
+        if not line:
+            raise DaemonError('connection closed')
+
+        response = json.loads(line.decode('utf-8'))
+        if not response.get('ok'):
+            raise DaemonError(response.get('error'))
+
+        return response.get('result')
+
+
+def build_parser():
+    """Builds an argument parser with the appropriate flags.
+
+    returns:
+        parser - a constructed ArgumentParser object.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--socket", type=str, default=constants.DAEMON_SOCKET_PATH,
+        help=SOCKET_HELP
+    )
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    get = commands.add_parser("get", help=GET_HELP)
+    get.add_argument("key", type=str, help=KEY_HELP)
+    get.add_argument("-l", "--languages", type=str, help=LANGUAGES_HELP)
+
+    set_ = commands.add_parser("set", help=SET_HELP)
+    set_.add_argument("key_value", type=str, metavar="KEY=VALUE")
+
+    set_many = commands.add_parser("set-many", help=SET_MANY_HELP)
+    set_many.add_argument("file", type=str, metavar="FILE")
+
+    commands.add_parser("diff-keys", help=DIFF_KEYS_HELP)
+    commands.add_parser("coverage", help=COVERAGE_HELP)
+    commands.add_parser("ping", help=PING_HELP)
+    commands.add_parser("stats", help=STATS_HELP)
+    commands.add_parser("shutdown", help=SHUTDOWN_HELP)
+
+    return parser
+
+
+def build_request(args):
+    """Returns the command and arguments to send for the parsed command
+    line."""
+    if args.command == 'get':
+        languages = args.languages.split(',') if args.languages else None
+        return 'get', {'key': args.key, 'languages': languages}
+
+    if args.command == 'set':
+        key, sep, value = args.key_value.partition('=')
+        if not sep:
+            raise ValueError("Key/value pair must be in the form key=value")
+        return 'set', {'key': key, 'value': value}
+
+    if args.command == 'set-many':
+        if args.file == '-':
+            mapping = read_key_values(sys.stdin)
+        else:
+            with open(args.file, 'r') as key_values_file:
+                mapping = read_key_values(key_values_file)
+        return 'set_many', {'mapping': mapping}
+
+    return args.command.replace('-', '_'), {}
+
+
+def main():
+    args = build_parser().parse_args()
+
+    try:
+        command, arguments = build_request(args)
+        with LocalizationClient(args.socket) as client:
+            result = client.request(command, **arguments)
+    except (DaemonError, OSError, ValueError) as e:
+        sys.stderr.write('{}\n'.format(e))
+        sys.exit(1)
+
+    print(json.dumps(result, sort_keys=True, indent=4))
+
+
+if __name__ == '__main__':
+    main()
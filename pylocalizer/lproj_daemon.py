@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+
+import constants
+import instrumentation
+from add_localized_string import (
+    DEFAULT_SCRATCH_DIR,
+    DEFAULT_WORKERS,
+    LOCALIZABLE_TABLE,
+    PROJECT_DIR_HELP,
+    SCRATCH_DIR_HELP,
+    XcodeLocalizationProject,
+    add_layout_arguments,
+    add_translator_arguments,
+    build_translator,
+    layout_kwargs,
+)
+from translation_plan import load_language_map
+
+
+SOCKET_HELP = "The Unix socket to listen on. Defaults to {}.".format(
+    constants.DAEMON_SOCKET_PATH
+)
+
+logging.basicConfig(level=logging.DEBUG)
+log = logging.getLogger(__name__)
+
+
+class DaemonAlreadyRunning(Exception):
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+
+    def __str__(self):
+        return "A daemon is already listening on {}".format(self.socket_path)
+
+    __repr__ = __str__
+
+
+class LocalizationService(object):
+    """Answers get, set and diff requests against an Xcode project which is
+    kept in memory between requests, along with its translator.
+
+    Language files are only parsed again once they change on disk. Before
+    each request the project's strings files are listed again, with the
+    discovery manifest when recursive, and the project is rebuilt if any
+    were added or removed.
+
+    Attributes:
+        project_dir
+        scratch_dir
+        translator
+        workers
+        language_map
+        recursive
+        table
+    """
+    def __init__(self, project_dir, scratch_dir=None, translator=None,
+                 workers=DEFAULT_WORKERS, language_map=None, recursive=False,
+                 table=LOCALIZABLE_TABLE):
+        self.project_dir = project_dir
+        self.scratch_dir = scratch_dir or DEFAULT_SCRATCH_DIR
+        self.translator = translator
+        self.workers = workers
+        self.language_map = language_map
+        self.recursive = recursive
+        self.table = table
+        self._project = None
+        self._lock = threading.Lock()
+        self.commands = {
+            'ping': self.ping,
+            'get': self.get,
+            'set': self.set,
+            'set_many': self.set_many,
+            'diff_keys': self.diff_keys,
+            'coverage': self.coverage,
+            'stats': self.stats,
+        }
+
+    @property
+    def project(self):
+        """The XcodeLocalizationProject, built again if a strings file was
+        added or removed since the last request."""
+        if self._project is None or self._project.layout_changed():
+            self._project = XcodeLocalizationProject(
+                self.project_dir, self.scratch_dir, self.translator,
+                self.workers, self.language_map, self.recursive, self.table
+            )
+
+        return self._project
+
+    def ping(self):
+        return {'pid': os.getpid(), 'project_dir': self.project_dir}
+
+    def get(self, key, languages=None):
+        return list(self.project.get(key, languages))
+
+    def set(self, key, value):
+        return {'written': self.project.set(key, value)}
+
+    def set_many(self, mapping):
+        return {'written': self.project.set_many(mapping)}
+
+    def diff_keys(self):
+        return list(self.project.diff_keys())
+
+    def coverage(self):
+        return list(self.project.coverage())
+
+    def stats(self):
+        return instrumentation.summary()
+
+    def handle(self, request):
+        """Runs a request of the form {"command": name, ...arguments} and
+        returns the response to send back. Requests from every connection
+        run one at a time, so that writes to the project never overlap."""
+        with self._lock, instrumentation.profiled():
+            return self._handle(request)
+
+    def _handle(self, request):
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("Expected a JSON object")
+
+            arguments = dict(request)
+            command = self.commands.get(arguments.pop('command', None))
+            if command is None:
+                raise ValueError(
+                    "Unknown command {}".format(request.get('command'))
+                )
+
+            return {'ok': True, 'result': command(**arguments)}
+        except Exception as e:
+            log.error('Error handling %s', request, exc_info=True)
+            return {'ok': False, 'error': str(e)}
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """Reads one JSON request per line and writes one JSON response per
+    line, until the client closes the connection."""
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+
+            try:
+                request = json.loads(line.decode('utf-8'))
+            except ValueError as e:
+                response = {'ok': False, 'error': str(e)}
+            else:
+                if isinstance(request, dict) and \
+                        request.get('command') == 'shutdown':
+                    self.respond({'ok': True, 'result': None})
+                    threading.Thread(target=self.server.shutdown).start()
+                    return
+                response = self.server.service.handle(request)
+
+            self.respond(response)
+
+    def respond(self, response):
+        self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+        self.wfile.flush()
+
+
+class LocalizationDaemon(socketserver.ThreadingMixIn,
+                         socketserver.UnixStreamServer):
+    """Serves a LocalizationService on a Unix socket.
+
+    Each connection gets a thread of its own, so that a client which keeps
+    its connection open, like an editor, does not hold up the others. The
+    service still runs their requests one at a time.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path, service):
+        self.service = service
+        self.socket_path = socket_path
+        remove_stale_socket(socket_path)
+        socketserver.UnixStreamServer.__init__(
+            self, socket_path, DaemonRequestHandler
+        )
+        os.chmod(socket_path, 0o600)
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        try:
+            os.remove(self.socket_path)
+        except OSError:
+            pass
+
+
+def remove_stale_socket(socket_path):
+    """Removes a socket left behind by a daemon which is no longer
+    running."""
+    if not os.path.exists(socket_path):
+        return
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.remove(socket_path)
+    else:
+        raise DaemonAlreadyRunning(socket_path)
+    finally:
+        probe.close()
+
+
+def build_parser():
+    """Builds an argument parser with the appropriate flags.
+
+    returns:
+        parser - a constructed ArgumentParser object.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("project_dir", type=str, help=PROJECT_DIR_HELP)
+    parser.add_argument(
+        "scratch_dir", type=str, nargs="?", default=DEFAULT_SCRATCH_DIR,
+        help=SCRATCH_DIR_HELP
+    )
+    parser.add_argument(
+        "--socket", type=str, default=constants.DAEMON_SOCKET_PATH,
+        help=SOCKET_HELP
+    )
+    add_translator_arguments(parser)
+    add_layout_arguments(parser)
+    instrumentation.add_arguments(parser)
+
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+
+    project_path = os.path.join(args.project_dir, '')
+    for directory in (args.scratch_dir, os.path.dirname(args.socket)):
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+    # The summary and profile cover the daemon's whole life, and are
+    # written once it shuts down.
+    with instrumentation.instrumented(args):
+        serve(args, project_path)
+
+
+def serve(args, project_path):
+    """Serves the project until the daemon is shut down."""
+    service = LocalizationService(
+        project_path, args.scratch_dir, build_translator(args), args.workers,
+        load_language_map(args.language_map), **layout_kwargs(args)
+    )
+    # Fail before listening if the project is invalid.
+    service.project
+
+    try:
+        daemon = LocalizationDaemon(args.socket, service)
+    except DaemonAlreadyRunning as dar:
+        log.error(dar)
+        return
+
+    log.info('Serving %s on %s', project_path, args.socket)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.server_close()
+
+
+if __name__ == '__main__':
+    main()
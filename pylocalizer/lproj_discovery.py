@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+import instrumentation
+
+
+PROJECT_EXTENSION = '.lproj'
+STRINGS_EXTENSION = '.strings'
+# Directories which never hold a target's own localizations, or which are
+# too large to walk for nothing.
+PRUNED_DIRS = frozenset([
+    '.build', '.git', '.hg', '.svn', 'build', 'Build', 'Carthage',
+    'DerivedData', 'node_modules', 'Pods', 'xcuserdata',
+])
+MANIFEST_VERSION = 1
+# A directory modified this recently may change again within the same
+# timestamp, so its listing is not trusted on the next run.
+RACY_WINDOW_NS = 2 * 10 ** 9
+
+logging.basicConfig(level=logging.DEBUG)
+log = logging.getLogger(__name__)
+
+
+StringsFile = collections.namedtuple(
+    'StringsFile', ['path', 'language_code', 'table']
+)
+
+
+def project_filename(root, name, extension):
+    """The name of a file kept in the scratch directory for a root
+    directory, so that several projects can share a scratch directory."""
+    digest = hashlib.sha1(os.path.abspath(root).encode('utf-8')).hexdigest()
+    return '{}_{}{}'.format(name, digest[:12], extension)
+
+
+def manifest_filename(root):
+    return project_filename(root, 'lproj_manifest', '.json')
+
+
+def scan_directory(path):
+    """Lists a directory, returning the names of the subdirectories to walk
+    into and, for an .lproj folder, of the .strings files in it."""
+    is_lproj = path.rstrip(os.sep).endswith(PROJECT_EXTENSION)
+    subdirs = []
+    strings_files = []
+
+    for entry in os.scandir(path):
+        name = entry.name
+        if entry.is_dir(follow_symlinks=False):
+            if not is_lproj and name not in PRUNED_DIRS:
+                subdirs.append(name)
+        elif is_lproj and name.endswith(STRINGS_EXTENSION):
+            strings_files.append(name)
+
+    return sorted(subdirs), sorted(strings_files)
+
+
+class LprojManifest(object):
+    """The .strings files of every .lproj folder under a root directory.
+
+    The listing of each directory is saved along with its modification
+    time, which changes whenever an entry is added to or removed from it,
+    so later runs only list the directories which changed and stat the
+    rest.
+
+    Attributes:
+        root
+        path -- Where the manifest is saved, or None to keep it in memory
+        dirs -- Maps each directory, relative to root, to its listing
+        rescanned -- How many directories the last discover listed
+    """
+    def __init__(self, root, path=None):
+        self.root = os.path.abspath(root)
+        self.path = path
+        self.dirs = {}
+        self.rescanned = 0
+
+        if path is None:
+            return
+
+        try:
+            with open(path, 'r', encoding='utf-8') as manifest_file:
+                manifest = json.load(manifest_file)
+        except (IOError, ValueError):
+            return
+
+        if manifest.get('version') == MANIFEST_VERSION and \
+                manifest.get('root') == self.root:
+            self.dirs = manifest.get('dirs', {})
+
+    def discover(self):
+        """Returns a StringsFile for every .strings file in an .lproj
+        folder under root, sorted by path."""
+        found = []
+        dirs = {}
+        self.rescanned = 0
+        now = int(time.time() * 10 ** 9)
+        pending = ['']
+
+        while pending:
+            relative = pending.pop()
+            path = os.path.join(self.root, relative)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+
+            record = self.dirs.get(relative)
+            if record is None or record['mtime'] != mtime:
+                try:
+                    subdirs, strings_files = scan_directory(path)
+                except OSError:
+                    continue
+                self.rescanned += 1
+                record = {
+                    'mtime': mtime if now - mtime > RACY_WINDOW_NS else None,
+                    'dirs': subdirs,
+                    'strings': strings_files,
+                }
+
+            dirs[relative] = record
+            pending.extend(
+                os.path.join(relative, name) for name in record['dirs']
+            )
+            for name in record['strings']:
+                found.append(StringsFile(
+                    os.path.join(path, name),
+                    os.path.basename(path)[:-len(PROJECT_EXTENSION)],
+                    name[:-len(STRINGS_EXTENSION)]
+                ))
+
+        instrumentation.increment(
+            'lproj_manifest.hits', len(dirs) - self.rescanned
+        )
+        instrumentation.increment('lproj_manifest.misses', self.rescanned)
+        log.debug(
+            'Listed %d of %d directories under %s', self.rescanned,
+            len(dirs), self.root
+        )
+
+        self.dirs = dirs
+        return sorted(found)
+
+    def save(self):
+        """Writes the manifest to a temporary file next to its final path,
+        then moves it into place so that a reader never sees half of it."""
+        if self.path is None:
+            return
+
+        manifest_dir = os.path.dirname(os.path.abspath(self.path))
+        if not os.path.exists(manifest_dir):
+            os.makedirs(manifest_dir, exist_ok=True)
+
+        # Each process stages its own file, as another may be saving the
+        # same manifest.
+        fd, temp_path = tempfile.mkstemp(dir=manifest_dir)
+        with os.fdopen(fd, 'w', encoding='utf-8') as manifest_file:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'root': self.root,
+                'dirs': self.dirs,
+            }, manifest_file)
+        os.replace(temp_path, self.path)
+
+
+def discover_strings_files(root, manifest_path=None):
+    """Finds every .strings file in an .lproj folder under root, reusing
+    and then updating the manifest at manifest_path if there is one."""
+    manifest = LprojManifest(root, manifest_path)
+    strings_files = manifest.discover()
+    manifest.save()
+    return strings_files
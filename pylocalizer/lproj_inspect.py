@@ -1,18 +1,34 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import json
 import logging
 
+import instrumentation
 from add_localized_string import (
     XcodeLocalizationProject,
     InvalidXcodeProject,
+    DEFAULT_SCRATCH_DIR,
+    LOCALIZABLE_TABLE,
+    SCRATCH_DIR_HELP,
+    add_layout_arguments,
+    layout_kwargs,
 )
+from key_index import DEFAULT_MIN_SCORE, DEFAULT_SEARCH_LIMIT
 
 
 KEY_HELP = "The key to fetch from the language project."
 LANGUAGES_HELP = "The list of languages to fetch. Defaults to Base."
 DIFF_KEY_HELP = "Identifies all missing keys from the non-base project in the specified languages."  # NOQA
+COVERAGE_HELP = "Lists how many of the Base keys each language has translated."  # NOQA
 PROJECT_DIR_HELP = "The Xcode project directory. Defaults to the current directory."  # NOQA
+WORKERS_HELP = "How many processes to parse changed language files with. Defaults to one per CPU."  # NOQA
+LOCATE_HELP = "Lists every target, table and language which defines the key."
+PREFIX_HELP = "Lists every definition of the keys starting with the prefix."
+DUPLICATES_HELP = "Lists the keys defined in more than one table or target."
+SEARCH_HELP = "Lists the keys whose Base text is the same as or similar to the text, with their translations."  # NOQA
+MIN_SCORE_HELP = "How similar, from 0 to 1, a Base text must be to the searched text to be listed. Defaults to {}."  # NOQA
+LIMIT_HELP = "The most keys or definitions to list."
 
 
 logging.basicConfig(level=logging.DEBUG)
@@ -28,12 +44,36 @@ def build_parser():
     parser = argparse.ArgumentParser()
     parser.add_argument("-k", "--key", type=str, help=KEY_HELP)
     parser.add_argument("-dk", "--diff-keys", type=str, help=DIFF_KEY_HELP)
+    parser.add_argument(
+        "--coverage", action="store_true", default=False, help=COVERAGE_HELP
+    )
     parser.add_argument(
         "-l", "--languages", type=str, default="Base", help=LANGUAGES_HELP
     )
     parser.add_argument(
         "-d", "--project-dir", type=str, default=".", help=PROJECT_DIR_HELP
     )
+    parser.add_argument(
+        "--scratch-dir", type=str, default=DEFAULT_SCRATCH_DIR,
+        help=SCRATCH_DIR_HELP
+    )
+    parser.add_argument("-w", "--workers", type=int, help=WORKERS_HELP)
+    parser.add_argument(
+        "--locate", type=str, metavar="KEY", help=LOCATE_HELP
+    )
+    parser.add_argument("--prefix", type=str, help=PREFIX_HELP)
+    parser.add_argument(
+        "--duplicates", action="store_true", default=False,
+        help=DUPLICATES_HELP
+    )
+    parser.add_argument("--search", type=str, metavar="TEXT", help=SEARCH_HELP)
+    parser.add_argument(
+        "--min-score", type=float, default=DEFAULT_MIN_SCORE,
+        help=MIN_SCORE_HELP.format(DEFAULT_MIN_SCORE)
+    )
+    parser.add_argument("--limit", type=int, help=LIMIT_HELP)
+    add_layout_arguments(parser)
+    instrumentation.add_arguments(parser)
 
     return parser
 
@@ -42,16 +82,57 @@ def main():
     parser = build_parser()
     args = parser.parse_args()
 
+    with instrumentation.instrumented(args):
+        run(args)
+
+
+def is_index_query(args):
+    return (args.locate is not None or args.prefix is not None or
+            args.search is not None or args.duplicates)
+
+
+def query_index(key_index, args):
+    """Answers the key index query the arguments ask for."""
+    if args.locate is not None:
+        return key_index.lookup(args.locate)
+    if args.prefix is not None:
+        return key_index.prefix(args.prefix, args.limit)
+    if args.search is not None:
+        limit = DEFAULT_SEARCH_LIMIT if args.limit is None else args.limit
+        return key_index.search(args.search, limit, args.min_score)
+    return key_index.duplicates(args.limit)
+
+
+def run(args):
+    """Runs the command the parsed arguments ask for."""
+    # The key index covers every table unless one was asked for.
+    default_table = None if is_index_query(args) else LOCALIZABLE_TABLE
     try:
-        xcode_project = XcodeLocalizationProject(args.project_dir)
+        xcode_project = XcodeLocalizationProject(
+            args.project_dir, args.scratch_dir,
+            **layout_kwargs(args, default_table)
+        )
     except InvalidXcodeProject as ixe:
         log.error(ixe)
         return
 
-    if args.diff_keys:
-        print(list(xcode_project.diff_keys()))
+    if is_index_query(args):
+        key_index = xcode_project.key_index()
+        try:
+            print(json.dumps(
+                query_index(key_index, args), sort_keys=True, indent=4
+            ))
+        finally:
+            key_index.close()
+    elif args.diff_keys:
+        print(list(xcode_project.diff_keys(args.workers)))
+    elif args.coverage:
+        print(json.dumps(
+            list(xcode_project.coverage(args.workers)), sort_keys=True,
+            indent=4
+        ))
     elif args.key is not None:
-        print(xcode_project.get(args.key, args.languages.split(',')))
+        print(list(xcode_project.get(args.key, args.languages.split(','))))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+import constants
+import instrumentation
+from add_localized_string import (
+    DEFAULT_SCRATCH_DIR,
+    PROJECT_DIR_HELP,
+    SCRATCH_DIR_HELP,
+    InvalidXcodeProject,
+    XcodeLocalizationProject,
+    add_layout_arguments,
+    add_translator_arguments,
+    build_translator,
+    layout_kwargs,
+)
+from translation_plan import load_language_map
+
+
+PARSE_WORKERS_HELP = "How many processes to parse changed language files with. Defaults to one per CPU."  # NOQA
+DRY_RUN_HELP = "Only list how many keys each language is missing, without translating or writing anything."  # NOQA
+
+logging.basicConfig(level=logging.DEBUG)
+log = logging.getLogger(__name__)
+
+
+def build_parser():
+    """Builds an argument parser with the appropriate flags.
+
+    returns:
+        parser - a constructed ArgumentParser object.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("project_dir", type=str, help=PROJECT_DIR_HELP)
+    parser.add_argument(
+        "scratch_dir", type=str, nargs="?", default=DEFAULT_SCRATCH_DIR,
+        help=SCRATCH_DIR_HELP
+    )
+    parser.add_argument(
+        "--parse-workers", type=int, help=PARSE_WORKERS_HELP
+    )
+    parser.add_argument(
+        "-n", "--dry-run", action="store_true", default=False,
+        help=DRY_RUN_HELP
+    )
+    add_translator_arguments(parser)
+    add_layout_arguments(parser)
+    instrumentation.add_arguments(parser)
+
+    return parser
+
+
+def summarize(xcode_project, mappings):
+    """Lists how many keys were, or would be, filled in for each language
+    file."""
+    lprojs = {lproj.path: lproj for lproj in xcode_project.lprojs}
+    summary = []
+    for path, mapping in mappings.items():
+        output = {
+            constants.LANGUAGE: lprojs[path].language_code,
+            constants.FILLED: len(mapping),
+        }
+        if xcode_project.include_paths:
+            output[constants.PATH] = path
+        summary.append(output)
+
+    return summary
+
+
+def main():
+    args = build_parser().parse_args()
+
+    with instrumentation.instrumented(args):
+        succeeded = run(args)
+
+    if not succeeded:
+        sys.exit(1)
+
+
+def run(args):
+    """Runs the sync the parsed arguments ask for. Returns whether it
+    succeeded."""
+    scratch_dir = args.scratch_dir
+    if not os.path.exists(scratch_dir):
+        os.makedirs(scratch_dir)
+
+    try:
+        xcode_project = XcodeLocalizationProject(
+            os.path.join(args.project_dir, ''), scratch_dir,
+            build_translator(args), args.workers,
+            load_language_map(args.language_map), **layout_kwargs(args)
+        )
+    except InvalidXcodeProject as ixe:
+        log.error(ixe)
+        return False
+
+    if args.dry_run:
+        mappings = {}
+        for lproj, key, text in xcode_project.missing_entries(
+                args.parse_workers):
+            mappings.setdefault(lproj.path, {})[key] = text
+        print(json.dumps(
+            summarize(xcode_project, mappings), sort_keys=True, indent=4
+        ))
+        return True
+
+    mappings = xcode_project.sync(parse_workers=args.parse_workers)
+    if mappings is None:
+        log.error('Nothing was written, as a language failed to sync')
+        return False
+
+    print(json.dumps(
+        summarize(xcode_project, mappings), sort_keys=True, indent=4
+    ))
+    return True
+
+
+if __name__ == '__main__':
+    main()
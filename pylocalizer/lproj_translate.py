@@ -1,13 +1,23 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import asyncio
+import collections
+import concurrent.futures
 import json
 import sys
 
 import yaml
 
 import constants
-from translator import Translator
+import instrumentation
+from add_localized_string import add_translator_arguments, build_translator
+from translation_plan import (
+    TranslationPlan,
+    load_language_map,
+    target_language,
+)
+from translator import batch_texts
 
 
 KEY_HELP = "An identifier for the word to be translated."
@@ -18,6 +28,14 @@ SRC_LANG_HELP = ("The ISO-693 two letter language code for the "
                  " destination language of the word to translate.")
 FORMAT_HELP = ("The format of the outputted translation. Can be JSON or"
                " YAML.")
+MAX_IN_FLIGHT_HELP = ("How many translation requests to keep in flight at"
+                      " once. Defaults to 1.")
+STREAM_HELP = ("Read one command per line of JSON (or per YAML document)"
+               " from STDIN, and write each translation as soon as it is"
+               " done.")
+
+YAML_DOCUMENT_START = '---'
+YAML_DOCUMENT_END = '...'
 
 
 class TranslateCommand(object):
@@ -70,6 +88,68 @@ def parse_input_text(input_text, output_format):
     )
 
 
+def iter_yaml_documents(lines):
+    """Splits a multi-document YAML stream into the text of each document,
+    without reading ahead of the current document.
+
+    A document starts at a line beginning with --- followed by whitespace
+    or the end of the line, and the rest of that line, as in
+    "--- {key: a}", is part of the document.
+    """
+    document = []
+
+    for line in lines:
+        marker = line[:len(YAML_DOCUMENT_START)]
+        rest = line[len(YAML_DOCUMENT_START):]
+        start = (marker == YAML_DOCUMENT_START and
+                 (not rest or rest[0].isspace()))
+        if start or line.rstrip() == YAML_DOCUMENT_END:
+            if document:
+                yield ''.join(document)
+            document = []
+            if start and rest.strip():
+                document.append(rest.lstrip(' \t'))
+            continue
+
+        document.append(line)
+
+    if any(line.strip() for line in document):
+        yield ''.join(document)
+
+
+def iter_input_commands(lines, input_format):
+    """Lazily parses TranslateCommands from the lines of STDIN, which hold
+    either one JSON object per line or a stream of YAML documents."""
+    if input_format == constants.JSON:
+        for line in lines:
+            if line.strip():
+                yield TranslateCommand(**json.loads(line))
+    elif input_format == constants.YAML:
+        for document in iter_yaml_documents(lines):
+            command = yaml.safe_load(document)
+            if command is not None:
+                yield TranslateCommand(**command)
+    else:
+        raise ValueError(
+            "Unexpected input format {}.".format(input_format)
+        )
+
+
+def format_record(output, output_format):
+    """Formats a single output dict as a line of JSON, or a YAML
+    document."""
+    if output_format == constants.JSON:
+        return json.dumps(output, sort_keys=True) + '\n'
+    if output_format == constants.YAML:
+        return yaml.safe_dump(
+            output, explicit_start=True, default_flow_style=False
+        )
+
+    raise ValueError(
+        "Unexpected output format {}.".format(output_format)
+    )
+
+
 def build_parser():
     """Builds an argument parser with the appropriate flags.
 
@@ -88,6 +168,15 @@ def build_parser():
     parser.add_argument(
         "-f", "--format", default="JSON", help=FORMAT_HELP
     )
+    parser.add_argument(
+        "-j", "--max-in-flight", type=int, default=1, help=MAX_IN_FLIGHT_HELP
+    )
+    parser.add_argument(
+        "-s", "--stream", action="store_true", default=False,
+        help=STREAM_HELP
+    )
+    add_translator_arguments(parser, workers=False)
+    instrumentation.add_arguments(parser)
 
     return parser
 
@@ -101,11 +190,12 @@ def valid_command_args(args):
     )
 
 
-def get_cmd_args():
+def get_cmd_args(args=None):
     """Builds the command arguments, either from STDIN or from the
     provided command line arguments"""
-    parser = build_parser()
-    args = parser.parse_args()
+    if args is None:
+        parser = build_parser()
+        args = parser.parse_args()
 
     if valid_command_args(args):
         return [TranslateCommand(cmd_args=args)]
@@ -121,26 +211,188 @@ def get_cmd_args():
     return commands
 
 
-def get_final_output(commands, translate_func):
+def get_final_output(commands, translate_func, translate_many_func=None,
+                     max_in_flight=1, language_map=None):
     """Gets the output for the function using the provided arguments
-    and a function to translate the text."""
-    cmd_output = []
-    for command in commands:
-        text = translate_func(command.text, command.language)
-        cmd_output.append(
-            output_dict(
-                command.key, text, command.language
-            )
+    and a function to translate the text.
+
+    Each distinct text is translated once per target language, where the
+    language_map can send several languages to the same target. If
+    translate_many_func is given, the commands are grouped by language
+    and each group is translated with a single call to it instead. With
+    max_in_flight above 1, the requests run concurrently."""
+    if max_in_flight > 1:
+        return get_concurrent_output(
+            commands, translate_func, translate_many_func, max_in_flight,
+            language_map
+        )
+    if translate_many_func is not None:
+        return get_batched_output(commands, translate_many_func, language_map)
+
+    commands = list(commands)
+    plan = plan_commands(commands, language_map)
+    translated = collections.OrderedDict(
+        (language, [translate_func(text, language) for text in texts])
+        for language, texts in plan.texts_by_target.items()
+    )
+
+    return planned_output(commands, plan, translated)
+
+
+def plan_commands(commands, language_map=None):
+    """Plans the distinct (text, target language) pairs the commands
+    need."""
+    return TranslationPlan(
+        [(command.text, command.language) for command in commands],
+        language_map
+    )
+
+
+def planned_output(commands, plan, translated):
+    """Fans the translations of a plan back out to an output dict for each
+    command, in the same order as commands."""
+    return [
+        output_dict(command.key, text, command.language)
+        for command, text in zip(commands, plan.fan_out(translated))
+    ]
+
+
+def get_batched_output(commands, translate_many_func, language_map=None):
+    """Translates the distinct texts of the commands one target language at
+    a time with translate_many_func(texts, language), and returns the
+    output in the same order as commands."""
+    commands = list(commands)
+    plan = plan_commands(commands, language_map)
+    translated = collections.OrderedDict(
+        (language, translate_many_func(texts, language))
+        for language, texts in plan.texts_by_target.items()
+    )
+
+    return planned_output(commands, plan, translated)
+
+
+def plan_requests(plan, batched):
+    """Splits the distinct texts of the plan into (language, texts) pairs,
+    one for each request to the translate service."""
+    requests = []
+    for language, texts in plan.texts_by_target.items():
+        if batched:
+            batches = batch_texts(texts)
+        else:
+            batches = ([text] for text in texts)
+        requests.extend((language, batch) for batch in batches)
+
+    return requests
+
+
+async def run_requests(requests, send_request, max_in_flight):
+    """Runs send_request for every request on a pool of max_in_flight
+    threads, each of which keeps its own connection to the translate
+    service. Returns the results in the same order as requests.
+
+    The pool is what limits how many requests run at once; the event loop
+    only gathers their results in order."""
+    loop = asyncio.get_running_loop()
+
+    with concurrent.futures.ThreadPoolExecutor(max_in_flight) as executor:
+        return await asyncio.gather(*[
+            loop.run_in_executor(executor, send_request, request)
+            for request in requests
+        ])
+
+
+def get_concurrent_output(commands, translate_func, translate_many_func,
+                          max_in_flight, language_map=None):
+    """Like get_final_output, but keeps up to max_in_flight requests
+    running at once, so the run takes about as long as the slowest request
+    rather than all of them added up."""
+    commands = list(commands)
+    plan = plan_commands(commands, language_map)
+    requests = plan_requests(plan, translate_many_func is not None)
+
+    def send_request(request):
+        language, texts = request
+        if translate_many_func is None:
+            return [translate_func(texts[0], language)]
+        return translate_many_func(texts, language)
+
+    loop = asyncio.new_event_loop()
+    try:
+        results = loop.run_until_complete(
+            run_requests(requests, send_request, max_in_flight)
         )
+    finally:
+        loop.close()
+
+    # The requests for each language are consecutive and in order.
+    translated = collections.OrderedDict()
+    for (language, _), texts in zip(requests, results):
+        translated.setdefault(language, []).extend(texts)
+
+    return planned_output(commands, plan, translated)
 
-    return cmd_output
+
+def stream_output(commands, translate_func, max_in_flight=1):
+    """Yields the output for each command, in order, as soon as it has been
+    translated. At most max_in_flight commands are held at once, so memory
+    use stays flat however many commands there are."""
+    if max_in_flight <= 1:
+        for command in commands:
+            text = translate_func(command.text, command.language)
+            yield output_dict(command.key, text, command.language)
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(max_in_flight) as executor:
+        in_flight = collections.deque()
+
+        for command in commands:
+            in_flight.append((command, executor.submit(
+                translate_func, command.text, command.language
+            )))
+            if len(in_flight) >= max_in_flight:
+                command, future = in_flight.popleft()
+                yield output_dict(
+                    command.key, future.result(), command.language
+                )
+
+        while in_flight:
+            command, future = in_flight.popleft()
+            yield output_dict(command.key, future.result(), command.language)
 
 
 def main():
-    commands = get_cmd_args()
-    translator = Translator()
+    args = build_parser().parse_args()
+
+    with instrumentation.instrumented(args):
+        run(args)
+
+
+def run(args):
+    """Runs the command the parsed arguments ask for."""
+    translator = build_translator(args, args.src_lang)
+    language_map = load_language_map(args.language_map)
+
+    if args.stream:
+        # Streaming holds too few commands at once to plan them, but the
+        # language map still applies.
+        def translate(text, language):
+            return translator.translate(
+                text, target_language(language, language_map)
+            )
+
+        commands = iter_input_commands(sys.stdin, args.format)
+        outputs = stream_output(commands, translate, args.max_in_flight)
+        for output in outputs:
+            sys.stdout.write(format_record(output, args.format))
+            sys.stdout.flush()
+        return
+
+    commands = get_cmd_args(args)
 
-    print(get_final_output(commands, translator.translate))
+    print(get_final_output(
+        commands, translator.translate, translator.translate_many,
+        args.max_in_flight, language_map
+    ))
 
 
 if __name__ == '__main__':
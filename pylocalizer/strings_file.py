@@ -0,0 +1,492 @@
+# -*- coding: utf-8 -*-
+
+import bisect
+import codecs
+import os
+import re
+import threading
+
+import instrumentation
+
+
+ENCODING = 'utf-8'
+
+# A string in a .strings file is either quoted, in which case it may span
+# lines and contain escaped quotes, or a bare word.
+_STRING = r'"(?P<q{0}>(?:[^"\\]|\\.)*)"|(?P<b{0}>[\w.$:/-]+)'
+_TOKEN_PATTERN = (
+    r'(?P<space>\s+)'
+    r'|(?P<comment>/\*.*?\*/|//[^\n]*)'
+    r'|(?P<entry>(?:' + _STRING.format('key') + r')\s*=\s*'
+    r'(?:' + _STRING.format('value') + r')\s*;)'
+    r'|(?P<invalid>[^\n]*\n?)'
+)
+TOKEN_RE = re.compile(_TOKEN_PATTERN, re.DOTALL)
+BYTES_TOKEN_RE = re.compile(_TOKEN_PATTERN.encode('ascii'), re.DOTALL)
+
+ESCAPE_RE = re.compile(r'\\(.)', re.DOTALL)
+UNESCAPES = {'\\': '\\', '"': '"', 'n': '\n', 'r': '\r', 't': '\t'}
+ESCAPES = str.maketrans({'\\': '\\\\', '"': '\\"', '\n': '\\n', '\r': '\\r'})
+
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+
+
+def _group(match, name):
+    quoted = match.group('q' + name)
+    return quoted if quoted is not None else match.group('b' + name)
+
+
+def tokenize(data, pos=0):
+    """Scans a .strings file in a single pass, yielding a
+    (key, value, (start, end)) token for every entry.
+
+    data is either text, or UTF-8 encoded bytes, in which case keys and
+    values are decoded as they are found and the spans are byte offsets.
+    Comments, whitespace and anything which is not an entry are skipped, so
+    they are the gaps between the spans.
+    Values are returned as written, with any escape sequences left in.
+
+    >>> list(tokenize('/* Greeting */ "hi" = "Hello";'))
+    [('hi', 'Hello', (15, 30))]
+    """
+    is_text = isinstance(data, str)
+    match = (TOKEN_RE if is_text else BYTES_TOKEN_RE).match
+    end = len(data)
+
+    while pos < end:
+        token = match(data, pos)
+        pos = token.end()
+        if token.lastgroup != 'entry':
+            continue
+
+        key = _group(token, 'key')
+        value = _group(token, 'value')
+        if not is_text:
+            key = key.decode(ENCODING)
+            value = value.decode(ENCODING)
+
+        yield key, value, token.span()
+
+
+def detect_encoding(head):
+    """Returns the (encoding, byte order mark) of a file starting with the
+    bytes head. Files without a BOM are read as UTF-8."""
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding, bom
+
+    return ENCODING, b''
+
+
+def read_source(path):
+    """Reads a .strings file, returning (data, encoding, bom).
+
+    For UTF-8 files data holds the bytes after the BOM, so they can be
+    scanned without decoding the whole file. For UTF-16 files it holds the
+    decoded text."""
+    with open(path, 'rb') as strings_file:
+        raw = strings_file.read()
+
+    instrumentation.record_read(path, len(raw))
+    return decode_source(raw)
+
+
+def decode_source(raw):
+    """Splits the raw bytes of a .strings file into (data, encoding, bom),
+    as returned by read_source."""
+    encoding, bom = detect_encoding(raw[:len(codecs.BOM_UTF8)])
+    data = raw[len(bom):]
+    if encoding != ENCODING:
+        data = data.decode(encoding)
+
+    return data, encoding, bom
+
+
+def parse_line(line):
+    """Parses a key/value pair out of a line of a .strings file.
+
+    Returns a (key, value) tuple, or None for comments, blank lines and
+    anything else which is not an entry.
+
+    >>> parse_line('"greeting" = "Hello";')
+    ('greeting', 'Hello')
+    """
+    for key, value, _ in tokenize(line):
+        return key, value
+
+    return None
+
+
+def format_line(key, text):
+    """Formats an entry for a .strings file, escaping text, which is the
+    value as it reads rather than as it is written.
+
+    >>> format_line('greeting', 'Say "hi"')
+    '"greeting" = "Say \\\\"hi\\\\"";'
+    """
+    return '"{}" = "{}";'.format(key, escape(text))
+
+
+def unescape(value):
+    """Turns a value as written in a .strings file into the text it stands
+    for. Escape sequences other than those for backslashes, quotes,
+    newlines, returns and tabs are left as they are.
+
+    >>> unescape('Say \\\\"hi\\\\"')
+    'Say "hi"'
+    """
+    return ESCAPE_RE.sub(
+        lambda match: UNESCAPES.get(match.group(1), match.group(0)), value
+    )
+
+
+def escape(text):
+    """Turns text into a value to write in a .strings file, the reverse of
+    unescape."""
+    return text.translate(ESCAPES)
+
+
+_UNKNOWN = object()
+
+
+class StringsEntry(object):
+    """A key/value pair, and the span of the document it was read from."""
+    __slots__ = ('key', 'value', 'start', 'end')
+
+    def __init__(self, key, value, start, end):
+        self.key = key
+        self.value = value
+        self.start = start
+        self.end = end
+
+
+def _moved(entry, shift):
+    if not shift:
+        return entry
+    return StringsEntry(entry.key, entry.value,
+                        entry.start + shift, entry.end + shift)
+
+
+class StringsDocument(object):
+    """An in-memory model of a .strings file.
+
+    Keeps the file's contents as they were read, so that comments and
+    whitespace are written back out unchanged, along with every entry in
+    order and an index from each key to its entry.
+
+    Attributes:
+        data
+        encoding
+        bom
+        entries
+        index
+    """
+    def __init__(self, data, encoding=ENCODING, bom=b''):
+        self.encoding = encoding
+        self.bom = bom
+        self._load(data)
+
+    @classmethod
+    def parse(cls, text):
+        return cls(text.encode(ENCODING))
+
+    @classmethod
+    def read(cls, path):
+        return cls(*read_source(path))
+
+    def _load(self, data):
+        self.data = data
+        self.entries = [
+            StringsEntry(key, value, start, end)
+            for key, value, (start, end) in tokenize(data)
+        ]
+        self._reindex()
+
+    def _reindex(self):
+        self.index = {}
+        for entry in self.entries:
+            self.index.setdefault(entry.key, entry)
+        self._sorted_keys = _UNKNOWN
+
+    def sorted_keys(self):
+        """Returns the list of keys in file order if the entries are sorted
+        by key, or None if they are not. Worked out once per document."""
+        if self._sorted_keys is _UNKNOWN:
+            keys = [entry.key for entry in self.entries]
+            in_order = all(
+                keys[idx] <= keys[idx + 1] for idx in range(len(keys) - 1)
+            )
+            self._sorted_keys = keys if in_order else None
+
+        return self._sorted_keys
+
+    def sorted_position(self, key):
+        """Binary searches for the entry to insert the key before, if the
+        document is sorted by key. Returns None otherwise."""
+        keys = self.sorted_keys()
+        if keys is None:
+            return None
+
+        return bisect.bisect_left(keys, key)
+
+    def _encode(self, text):
+        """Converts text to the same type as data."""
+        if isinstance(self.data, str):
+            return text
+        return text.encode(ENCODING)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def get(self, key):
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+
+        return entry.value
+
+    def items(self):
+        """Yields every (key, value) pair in file order."""
+        for entry in self.entries:
+            yield entry.key, entry.value
+
+    def copy(self):
+        document = StringsDocument.__new__(StringsDocument)
+        document.encoding = self.encoding
+        document.bom = self.bom
+        document.data = self.data
+        document.entries = list(self.entries)
+        document.index = dict(self.index)
+        document._sorted_keys = self._sorted_keys
+        return document
+
+    def insertion_point(self, key):
+        """Picks the entry to insert a new key before: the first entry whose
+        first character is not less than the key's, once an entry starting
+        with a character not greater than the key's was seen. Returns
+        len(entries) to append the key."""
+        prev_start_char = None
+        if not key:
+            return len(self.entries)
+
+        for position, entry in enumerate(self.entries):
+            if not entry.key:
+                continue
+
+            if (prev_start_char is not None and
+                    prev_start_char <= key[0] <= entry.key[0]):
+                return position
+
+            prev_start_char = entry.key[0]
+
+        return len(self.entries)
+
+    def insertion_offset(self, position):
+        """The offset in data to insert new lines at so that they come
+        after the line of the entry before position, and ahead of any
+        comments leading up to the entry at position."""
+        newline = self._encode('\n')
+
+        if position == 0:
+            if not self.entries:
+                return len(self.data)
+            first_start = self.entries[0].start
+            paragraph = self.data.rfind(newline * 2, 0, first_start)
+            if paragraph != -1:
+                return paragraph + 2
+            return self.data.rfind(newline, 0, first_start) + 1
+
+        line_end = self.data.find(newline, self.entries[position - 1].end)
+        # The next entry may be on the same line, even when that line is the
+        # last one and has no newline.
+        if (position < len(self.entries) and
+                (line_end == -1 or line_end >= self.entries[position].start)):
+            return self.entries[position].start
+        if line_end == -1:
+            return len(self.data)
+        return line_end + 1
+
+    def _insert_text(self, offset, texts):
+        """Formats the texts as new lines to insert at offset."""
+        newline = self._encode('\n')
+        inserted = self._encode(''.join(text + '\n' for text in texts))
+
+        if offset > 0 and self.data[offset - 1:offset] != newline:
+            inserted = newline + inserted
+        return inserted
+
+    def _splice(self, edits):
+        """Rebuilds data with each (start, end, replacement) edit applied.
+
+        The ranges between the edits are copied over as they are, and only
+        the replacements are tokenized; the entries after each edit are
+        moved along by the change in length. edits must be sorted, must not
+        overlap, and must each cover whole entries.
+        """
+        chunks = []
+        entries = []
+        pos = 0
+        shift = 0
+        remaining = iter(self.entries)
+        entry = next(remaining, None)
+
+        for start, end, replacement in edits:
+            while entry is not None and entry.end <= start:
+                entries.append(_moved(entry, shift))
+                entry = next(remaining, None)
+            while entry is not None and entry.start < end:
+                entry = next(remaining, None)
+
+            new_start = start + shift
+            entries.extend(
+                StringsEntry(key, value, new_start + s, new_start + e)
+                for key, value, (s, e) in tokenize(replacement)
+            )
+
+            chunks.append(self.data[pos:start])
+            chunks.append(replacement)
+            shift += len(replacement) - (end - start)
+            pos = end
+
+        while entry is not None:
+            entries.append(_moved(entry, shift))
+            entry = next(remaining, None)
+        chunks.append(self.data[pos:])
+
+        self.data = self.data[:0].join(chunks)
+        self.entries = entries
+        self._reindex()
+
+    def set(self, key, text):
+        """Replaces the entry for the key with text, or inserts it on a line
+        of its own if the key is new.
+
+        New keys are put in their sorted place, found by binary search, when
+        the document is sorted by key, and otherwise next to the keys with
+        the same first character.
+        """
+        entry = self.index.get(key)
+
+        if entry is not None:
+            self._splice([(entry.start, entry.end, self._encode(text))])
+            return
+
+        keys = self.sorted_keys()
+        position = self.sorted_position(key)
+        if position is None:
+            position = self.insertion_point(key)
+
+        offset = self.insertion_offset(position)
+        self._splice([(offset, offset, self._insert_text(offset, [text]))])
+
+        if keys is not None:
+            self._sorted_keys = keys[:position] + [key] + keys[position:]
+
+    def merge(self, entries):
+        """Applies many (key, text) pairs in a single pass over the
+        document. entries must be sorted by key.
+
+        Existing keys are replaced in place. Each new key is inserted after
+        the last entry whose key sorts before it.
+        """
+        edits = []
+        new_texts = []
+        for key, text in entries:
+            entry = self.index.get(key)
+            if entry is not None:
+                edits.append((entry.start, entry.end, self._encode(text)))
+            else:
+                new_texts.append((key, text))
+
+        pending = 0
+        for position, entry in enumerate(self.entries):
+            texts = []
+            while (pending < len(new_texts) and
+                    new_texts[pending][0] < entry.key):
+                texts.append(new_texts[pending][1])
+                pending += 1
+
+            if texts:
+                offset = self.insertion_offset(position)
+                edits.append(
+                    (offset, offset, self._insert_text(offset, texts))
+                )
+
+        if pending < len(new_texts):
+            offset = self.insertion_offset(len(self.entries))
+            texts = [text for _, text in new_texts[pending:]]
+            edits.append((offset, offset, self._insert_text(offset, texts)))
+
+        edits.sort(key=lambda edit: (edit[0], edit[1]))
+        self._splice(edits)
+
+    def render(self):
+        if isinstance(self.data, str):
+            return self.data
+        return self.data.decode(self.encoding)
+
+    def to_bytes(self):
+        data = self.data
+        if isinstance(data, str):
+            data = data.encode(self.encoding)
+        return self.bom + data
+
+    def write(self, path):
+        data = self.to_bytes()
+        with open(path, 'wb') as strings_file:
+            strings_file.write(data)
+        instrumentation.record_written(path, len(data))
+
+
+_documents = {}
+_documents_lock = threading.Lock()
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_document(path):
+    """Returns the StringsDocument for the file at path.
+
+    Documents are cached for the life of the process and only parsed again
+    once the file's modification time or size changes.
+    """
+    path = os.path.abspath(path)
+    fingerprint = _fingerprint(path)
+
+    with _documents_lock:
+        cached = _documents.get(path)
+    if cached is not None and cached[0] == fingerprint:
+        instrumentation.increment('documents.hits')
+        return cached[1]
+
+    instrumentation.increment('documents.misses')
+    with instrumentation.timed('documents.parse'):
+        document = StringsDocument.read(path)
+    with _documents_lock:
+        _documents[path] = (fingerprint, document)
+
+    return document
+
+
+def store_document(path, document):
+    """Records document as the current contents of the file at path, after
+    it has been written there."""
+    path = os.path.abspath(path)
+    with _documents_lock:
+        _documents[path] = (_fingerprint(path), document)
+
+
+def clear_documents():
+    """Forgets every cached document."""
+    with _documents_lock:
+        _documents.clear()
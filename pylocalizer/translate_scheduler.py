@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import json
+import logging
+import random
+import socket
+import threading
+import time
+
+import instrumentation
+
+
+# The v2 API allows 6M characters per minute per project by default.
+DEFAULT_CHARACTERS_PER_SECOND = 100000
+DEFAULT_REQUESTS_PER_SECOND = None
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_MAX_RETRIES = 6
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 60.0
+
+# Responses which a later attempt may not get, and of those, the ones
+# which mean the service wants fewer requests.
+RETRYABLE_STATUSES = frozenset([429, 500, 502, 503, 504])
+THROTTLED_STATUSES = frozenset([429, 503])
+# A 403 is only retryable when it is about the request rate; the daily
+# limit and bad credentials do not go away by waiting.
+RATE_LIMIT_REASONS = frozenset(['rateLimitExceeded', 'userRateLimitExceeded'])
+RETRYABLE_ERRORS = (ConnectionError, TimeoutError, socket.timeout)
+
+REQUESTS_PER_SECOND_HELP = "The most translate requests to send per second. Unlimited by default."  # NOQA
+CHARACTERS_PER_SECOND_HELP = "The most characters to send for translation per second. Defaults to {}.".format(  # NOQA
+    DEFAULT_CHARACTERS_PER_SECOND
+)
+MAX_CONCURRENCY_HELP = "The most translate requests in flight at once, lowered while the service is throttling. Defaults to {}.".format(  # NOQA
+    DEFAULT_MAX_CONCURRENCY
+)
+MAX_RETRIES_HELP = "How many times to retry a request after a rate limit or server error. Defaults to {}.".format(  # NOQA
+    DEFAULT_MAX_RETRIES
+)
+
+logging.basicConfig(level=logging.DEBUG)
+log = logging.getLogger(__name__)
+
+
+def error_status(error):
+    """The HTTP status of an HttpError from the Google API client, or
+    None for any other error."""
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    try:
+        return int(status)
+    except (TypeError, ValueError):
+        return None
+
+
+def error_reasons(error):
+    """The reasons given in the JSON body of an HttpError, e.g.
+    rateLimitExceeded."""
+    content = getattr(error, 'content', None)
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', 'replace')
+
+    try:
+        errors = json.loads(content)['error'].get('errors', [])
+    except (TypeError, ValueError, KeyError, AttributeError):
+        return set()
+
+    return set(
+        error.get('reason') for error in errors if isinstance(error, dict)
+    )
+
+
+def retry_after(error):
+    """The seconds the Retry-After header of an HttpError asks to wait,
+    if it has one."""
+    resp = getattr(error, 'resp', None)
+    if not hasattr(resp, 'get'):
+        return None
+
+    try:
+        return max(0.0, float(resp.get('retry-after')))
+    except (TypeError, ValueError):
+        return None
+
+
+def classify(error):
+    """Returns (retryable, throttled) for an error from a request."""
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True, False
+
+    status = error_status(error)
+    if status == 403:
+        throttled = bool(error_reasons(error) & RATE_LIMIT_REASONS)
+        return throttled, throttled
+
+    return status in RETRYABLE_STATUSES, status in THROTTLED_STATUSES
+
+
+class TokenBucket(object):
+    """Limits how much of something is used per second, allowing bursts of
+    up to capacity.
+
+    Taking more than is left puts the bucket into debt, which the caller
+    waits out, so a single request larger than the capacity still goes
+    through once the bucket has refilled. A rate of None or 0 never waits.
+
+    Attributes:
+        rate -- How many tokens are added per second
+        capacity
+    """
+    def __init__(self, rate, capacity=None, clock=time.monotonic,
+                 sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        """Takes amount tokens, sleeping until they have been added.
+        Returns how long it slept."""
+        if not self.rate:
+            return 0.0
+
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.capacity,
+                self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= amount
+            wait = max(0.0, -self._tokens / self.rate)
+
+        if wait:
+            self._sleep(wait)
+
+        return wait
+
+
+class AdaptiveLimit(object):
+    """Limits how many requests are in flight at once.
+
+    The limit is halved whenever the service throttles a request, and
+    grows back by about one for every limit requests which succeed, so
+    that it settles just under what the service sustains.
+
+    Attributes:
+        limit
+        minimum
+        maximum
+    """
+    def __init__(self, maximum, minimum=1):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = float(maximum)
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Waits until there is room under the limit for a request."""
+        with self._condition:
+            while self._in_flight >= max(self.minimum, int(self.limit)):
+                self._condition.wait()
+            self._in_flight += 1
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def throttled(self):
+        with self._condition:
+            self.limit = max(float(self.minimum), self.limit / 2)
+        instrumentation.increment('translate.throttled')
+        log.debug('Lowered the translate concurrency to %d', self.limit)
+
+    def succeeded(self):
+        with self._condition:
+            if self.limit < self.maximum:
+                self.limit = min(
+                    float(self.maximum), self.limit + 1 / self.limit
+                )
+                self._condition.notify_all()
+
+
+class TranslateScheduler(object):
+    """Sends requests to the translate service no faster than its quotas
+    allow, retrying the ones which fail because of rate limits or server
+    errors after a jittered exponential backoff.
+
+    Attributes:
+        requests -- A TokenBucket of requests per second
+        characters -- A TokenBucket of characters per second
+        concurrency -- The AdaptiveLimit of requests in flight
+        max_retries
+        base_delay
+        max_delay
+    """
+    def __init__(self, requests_per_second=DEFAULT_REQUESTS_PER_SECOND,
+                 characters_per_second=DEFAULT_CHARACTERS_PER_SECOND,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 max_retries=DEFAULT_MAX_RETRIES,
+                 base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY,
+                 clock=time.monotonic, sleep=time.sleep, rng=None):
+        self.requests = TokenBucket(
+            requests_per_second, clock=clock, sleep=sleep
+        )
+        self.characters = TokenBucket(
+            characters_per_second, clock=clock, sleep=sleep
+        )
+        self.concurrency = AdaptiveLimit(max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._random = rng or random.Random()
+
+    def backoff(self, attempt, error):
+        """How long to wait before retrying a request for the attempt'th
+        time: as long as the service asked for, or else a random time up
+        to an exponentially growing cap ("full jitter")."""
+        delay = retry_after(error)
+        if delay is not None:
+            return min(delay, self.max_delay)
+
+        cap = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return self._random.uniform(0, cap)
+
+    def call(self, request, characters=0):
+        """Calls request, a function sending one request with characters
+        of text to translate, and returns what it returns."""
+        attempt = 0
+        while True:
+            waited = self.requests.acquire(1)
+            waited += self.characters.acquire(characters)
+            if waited:
+                instrumentation.add_time('translate.rate_limit', waited)
+
+            with self.concurrency.slot():
+                try:
+                    result = request()
+                except Exception as error:
+                    retryable, throttled = classify(error)
+                    if throttled:
+                        self.concurrency.throttled()
+                    if not retryable or attempt >= self.max_retries:
+                        raise
+                    failure = error
+                else:
+                    self.concurrency.succeeded()
+                    return result
+
+            delay = self.backoff(attempt, failure)
+            attempt += 1
+            instrumentation.increment('translate.retries')
+            log.warning(
+                'Translate request failed with %s, retrying in %.1fs (%d/%d)',
+                failure, delay, attempt, self.max_retries
+            )
+            self._sleep(delay)
+
+
+def add_arguments(parser):
+    """Adds the flags which tune the translate scheduler."""
+    parser.add_argument(
+        "--requests-per-second", type=float,
+        default=DEFAULT_REQUESTS_PER_SECOND, help=REQUESTS_PER_SECOND_HELP
+    )
+    parser.add_argument(
+        "--characters-per-second", type=float,
+        default=DEFAULT_CHARACTERS_PER_SECOND,
+        help=CHARACTERS_PER_SECOND_HELP
+    )
+    parser.add_argument(
+        "--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+        help=MAX_CONCURRENCY_HELP
+    )
+    parser.add_argument(
+        "--max-retries", type=int, default=DEFAULT_MAX_RETRIES,
+        help=MAX_RETRIES_HELP
+    )
+
+
+def scheduler_from_args(args):
+    """Builds the scheduler for the flags added by add_arguments."""
+    return TranslateScheduler(
+        requests_per_second=args.requests_per_second,
+        characters_per_second=args.characters_per_second,
+        max_concurrency=args.max_concurrency,
+        max_retries=args.max_retries,
+    )
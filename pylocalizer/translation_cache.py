@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import instrumentation
+
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser('~'), '.cache', 'pylocalizer', 'translations.sqlite3'
+)
+DEFAULT_MAX_ENTRIES = 500000
+DEFAULT_MAX_AGE = 180 * 24 * 60 * 60
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS translations (
+    source_lang TEXT NOT NULL,
+    target_lang TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    translated_text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    PRIMARY KEY (source_lang, target_lang, text_hash)
+)
+"""
+CREATE_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS translations_last_used_at
+ON translations (last_used_at)
+"""
+
+logging.basicConfig(level=logging.DEBUG)
+log = logging.getLogger(__name__)
+
+
+def normalize_text(text):
+    """Normalizes the text so that equivalent unicode strings share an
+    entry in the cache."""
+    return unicodedata.normalize('NFC', text)
+
+
+def text_hash(text):
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+class TranslationCache(object):
+    """A SQLite backed store of previous translations, keyed by source
+    language, target language and a hash of the normalized source text.
+
+    Entries older than max_age seconds are dropped when the cache is opened,
+    and the least recently used entries are dropped whenever the cache grows
+    past max_entries.
+
+    Attributes:
+        path
+        hits
+        misses
+    """
+    def __init__(self, path=DEFAULT_CACHE_PATH,
+                 max_entries=DEFAULT_MAX_ENTRIES, max_age=DEFAULT_MAX_AGE):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._connection = None
+
+    @property
+    def _conn(self):
+        """Opens the database the first time it is needed, so that commands
+        which never translate anything do not touch it."""
+        with self._lock:
+            if self._connection is None:
+                cache_dir = os.path.dirname(self.path)
+                if cache_dir and not os.path.exists(cache_dir):
+                    os.makedirs(cache_dir)
+
+                connection = sqlite3.connect(
+                    self.path, check_same_thread=False
+                )
+                with connection:
+                    connection.execute(CREATE_TABLE_SQL)
+                    connection.execute(CREATE_INDEX_SQL)
+
+                self._connection = connection
+                self.evict()
+
+        return self._connection
+
+    def __len__(self):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT COUNT(*) FROM translations'
+            ).fetchone()
+        return row[0]
+
+    def get_many(self, source_lang, target_lang, texts):
+        """Looks up every text, returning a list with the cached translation
+        or None for each one."""
+        hashes = [text_hash(text) for text in texts]
+        found = {}
+        now = time.time()
+
+        with self._lock, self._conn:
+            for text_hash_value in set(hashes):
+                row = self._conn.execute(
+                    'SELECT translated_text FROM translations '
+                    'WHERE source_lang = ? AND target_lang = ? '
+                    'AND text_hash = ?',
+                    (source_lang, target_lang, text_hash_value)
+                ).fetchone()
+                if row is not None:
+                    found[text_hash_value] = row[0]
+
+            self._conn.executemany(
+                'UPDATE translations SET last_used_at = ? '
+                'WHERE source_lang = ? AND target_lang = ? AND text_hash = ?',
+                [(now, source_lang, target_lang, text_hash_value)
+                 for text_hash_value in found]
+            )
+
+        results = [found.get(text_hash_value) for text_hash_value in hashes]
+        hits = sum(1 for result in results if result is not None)
+        self.hits += hits
+        self.misses += len(results) - hits
+        instrumentation.increment('translation_cache.hits', hits)
+        instrumentation.increment(
+            'translation_cache.misses', len(results) - hits
+        )
+
+        return results
+
+    def put_many(self, source_lang, target_lang, texts, translations):
+        """Stores the translation of every text."""
+        now = time.time()
+        rows = [
+            (source_lang, target_lang, text_hash(text), translation, now, now)
+            for text, translation in zip(texts, translations)
+        ]
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO translations '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+
+        self._evict_overflow()
+
+    def evict(self):
+        """Drops expired entries, then trims the cache down to
+        max_entries."""
+        if self.max_age is not None:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    'DELETE FROM translations WHERE created_at < ?',
+                    (time.time() - self.max_age,)
+                )
+
+        self._evict_overflow()
+
+    def _evict_overflow(self):
+        if self.max_entries is None:
+            return
+
+        overflow = len(self) - self.max_entries
+        if overflow <= 0:
+            return
+
+        log.debug('Evicting %d entries from %s', overflow, self.path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                'DELETE FROM translations WHERE rowid IN ('
+                'SELECT rowid FROM translations '
+                'ORDER BY last_used_at LIMIT ?)',
+                (overflow,)
+            )
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self),
+        }
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class CachingTranslator(object):
+    """Wraps a Translator so that only texts which are missing from the
+    TranslationCache are sent to the translate service.
+
+    Attributes:
+        translator
+        cache
+    """
+    def __init__(self, translator, cache):
+        self.translator = translator
+        self.cache = cache
+
+    @property
+    def source_lang(self):
+        return self.translator.source_lang
+
+    def translate(self, text, target_lang):
+        return self.translate_many([text], target_lang)[0]
+
+    def translate_many(self, texts, target_lang):
+        texts = list(texts)
+        results = self.cache.get_many(self.source_lang, target_lang, texts)
+
+        missing = []
+        seen = set()
+        for text, result in zip(texts, results):
+            if result is None and text not in seen:
+                seen.add(text)
+                missing.append(text)
+
+        if missing:
+            translated = self.translator.translate_many(missing, target_lang)
+            self.cache.put_many(
+                self.source_lang, target_lang, missing, translated
+            )
+            translated_by_text = dict(zip(missing, translated))
+            results = [
+                translated_by_text[text] if result is None else result
+                for text, result in zip(texts, results)
+            ]
+
+        return results
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import json
+import threading
+
+import instrumentation
+
+
+LANGUAGE_MAP_HELP = ("A JSON file mapping language codes to the language"
+                     " they are translated as, e.g. {\"pt-BR\": \"pt\","
+                     " \"pt-PT\": \"pt\"}. Languages mapped to the same code"
+                     " share one translation.")
+
+
+def load_language_map(path):
+    """Reads a language map from a JSON object of language codes."""
+    if path is None:
+        return {}
+
+    with open(path, 'r', encoding='utf-8') as map_file:
+        language_map = json.load(map_file)
+
+    if not isinstance(language_map, dict):
+        raise ValueError(
+            "Expected a JSON object in {}, got {}".format(
+                path, type(language_map).__name__
+            )
+        )
+
+    return language_map
+
+
+def target_language(language, language_map=None):
+    """Returns the language code to send to the translate service for a
+    language.
+
+    >>> target_language('pt-BR', {'pt-BR': 'pt'})
+    'pt'
+    """
+    if not language_map:
+        return language
+    return language_map.get(language, language)
+
+
+class TranslationPlan(object):
+    """Collapses a list of (text, language) requests into the distinct
+    texts each target language needs, before anything is sent, and fans
+    the translations back out to every request.
+
+    Attributes:
+        texts_by_target -- Maps each target language to its distinct
+            texts, in the order they were first requested
+        slots -- The (target language, position) of the translation for
+            each request
+    """
+    def __init__(self, pairs, language_map=None):
+        self.texts_by_target = collections.OrderedDict()
+        self.slots = []
+        positions = {}
+
+        for text, language in pairs:
+            target = target_language(language, language_map)
+            slot = positions.get((target, text))
+            if slot is None:
+                texts = self.texts_by_target.setdefault(target, [])
+                slot = positions[(target, text)] = (target, len(texts))
+                texts.append(text)
+            self.slots.append(slot)
+
+        instrumentation.increment(
+            'plan.hits', len(self.slots) - len(positions)
+        )
+        instrumentation.increment('plan.misses', len(positions))
+
+    def __len__(self):
+        return sum(len(texts) for texts in self.texts_by_target.values())
+
+    def fan_out(self, translations_by_target):
+        """Returns the translation for each request, in order, from the
+        translations of each target language's distinct texts."""
+        return [
+            translations_by_target[target][position]
+            for target, position in self.slots
+        ]
+
+
+class SharedTranslator(object):
+    """Wraps a translator so that each distinct text is only translated
+    once per target language, however many language projects ask for it,
+    until clear is called.
+
+    Language projects translating to the same target language take turns,
+    so the later ones wait for and reuse the first one's translations,
+    while other target languages carry on in parallel.
+
+    Attributes:
+        translator
+        language_map
+    """
+    def __init__(self, translator, language_map=None):
+        self.translator = translator
+        self.language_map = language_map or {}
+        self._translations = {}
+        self._locks = collections.defaultdict(threading.Lock)
+        self._locks_lock = threading.Lock()
+
+    @property
+    def source_lang(self):
+        return self.translator.source_lang
+
+    def _lock(self, target):
+        with self._locks_lock:
+            return self._locks[target]
+
+    def clear(self):
+        """Forgets every translation made so far."""
+        with self._locks_lock:
+            self._translations = {}
+
+    def translate(self, text, target_lang):
+        return self.translate_many([text], target_lang)[0]
+
+    def translate_many(self, texts, target_lang):
+        texts = list(texts)
+        target = target_language(target_lang, self.language_map)
+
+        with self._lock(target):
+            with self._locks_lock:
+                translations = self._translations.setdefault(target, {})
+
+            missing = list(collections.OrderedDict.fromkeys(
+                text for text in texts if text not in translations
+            ))
+            instrumentation.increment(
+                'plan.hits', len(texts) - len(missing)
+            )
+            instrumentation.increment('plan.misses', len(missing))
+
+            if missing:
+                translations.update(zip(
+                    missing, self.translator.translate_many(missing, target)
+                ))
+
+        return [translations[text] for text in texts]
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import threading
+
+import instrumentation
+import strings_file
+
+
+def value_index(document):
+    """Maps each value of a parsed strings file to its keys, in file order.
+    The values are unescaped, as they read rather than as they are written.
+
+    >>> value_index(StringsDocument.parse('"a" = "Hi"; "b" = "Hi";'))
+    {'Hi': ['a', 'b']}
+    """
+    index = collections.OrderedDict()
+    for key, value in document.items():
+        index.setdefault(strings_file.unescape(value), []).append(key)
+
+    return index
+
+
+class TranslationReuse(object):
+    """Finds the translations a project already has for a text, so that a
+    key whose Base value is the same as another key's copies that key's
+    translations instead of translating the text again.
+
+    The value index of each Base file is kept until the file changes.
+    """
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _value_index(self, base_lproj):
+        base_document = base_lproj.document
+        with self._lock:
+            document, index = self._indexes.get(base_lproj.path, (None, None))
+            if document is base_document:
+                instrumentation.increment('reuse.value_index.hits')
+            else:
+                instrumentation.increment('reuse.value_index.misses')
+                index = value_index(base_document)
+                self._indexes[base_lproj.path] = (base_document, index)
+
+        return index
+
+    def translations(self, base_lproj, lproj, values, exclude_keys=()):
+        """Returns {value: translation} for each value which the Base
+        language project has under a key, other than those in exclude_keys,
+        which lproj has translated. Values and translations are unescaped
+        text."""
+        index = self._value_index(base_lproj)
+        document = lproj.document
+        exclude_keys = set(exclude_keys)
+        found = {}
+
+        for value in set(values):
+            for key in index.get(value, ()):
+                if key in exclude_keys:
+                    continue
+
+                translation = document.get(key)
+                if translation is not None:
+                    found[value] = strings_file.unescape(translation)
+                    break
+
+        return found
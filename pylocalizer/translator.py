@@ -1,26 +1,90 @@
 # -*- coding: utf-8 -*-
 
 import logging
+import threading
 
-from googleapiclient import discovery
+import instrumentation
+from discovery_cache import DiscoveryCache
+from translate_scheduler import TranslateScheduler
 
 
 logging.basicConfig(level=logging.DEBUG)
 log = logging.getLogger(__name__)
 
+# Per-request limits of the v2 translations().list call: at most 128 text
+# segments, and Google recommends keeping the request under 5K characters.
+MAX_BATCH_ITEMS = 128
+MAX_BATCH_CHARS = 5000
+
+
+def batch_texts(texts, max_items=MAX_BATCH_ITEMS, max_chars=MAX_BATCH_CHARS):
+    """Splits texts into consecutive batches which fit in a single request.
+
+    A text longer than max_chars is sent in a batch of its own.
+
+    >>> list(batch_texts(['a', 'b', 'c'], max_items=2))
+    [['a', 'b'], ['c']]
+    """
+    batch = []
+    batch_chars = 0
+
+    for text in texts:
+        if batch and (len(batch) >= max_items or
+                      batch_chars + len(text) > max_chars):
+            yield batch
+            batch = []
+            batch_chars = 0
+
+        batch.append(text)
+        batch_chars += len(text)
+
+    if batch:
+        yield batch
+
 
 class Translator(object):
     """The Translator class wraps all of the functionality from the Google
     Python API library.
 
+    Requests go through a TranslateScheduler, which keeps them within the
+    service's quotas and retries the ones which are throttled or hit a
+    server error.
+
     Attributes:
         translate_service
+        source_lang
+        discovery_cache
+        scheduler
     """
-    def __init__(self, translate_service=None):
-        self.translate_service = (
-            translate_service or
-            discovery.build('translate', version='v2')
-        )
+    def __init__(self, translate_service=None, source_lang='en',
+                 discovery_cache=None, scheduler=None):
+        self.source_lang = source_lang
+        self.discovery_cache = discovery_cache or DiscoveryCache()
+        self.scheduler = scheduler or TranslateScheduler()
+        self._translate_service = translate_service
+        self._local = threading.local()
+
+    @property
+    def translate_service(self):
+        """The translate service passed to the constructor, or else one
+        built for the calling thread, as the underlying httplib2 connection
+        must not be shared between threads."""
+        if self._translate_service is not None:
+            return self._translate_service
+
+        service = getattr(self._local, 'translate_service', None)
+        if service is None:
+            service = self.build_service()
+            self._local.translate_service = service
+
+        return service
+
+    def build_service(self):
+        """Builds a client for the translate service from the locally
+        cached discovery document. The Google API client is only imported
+        here, so that commands which never translate anything neither pay
+        for the import nor need credentials."""
+        return self.discovery_cache.build('translate', 'v2')
 
     def translate(self, text, target_lang):
         """Translates the given text.
@@ -35,10 +99,43 @@ class Translator(object):
 
         Returns the translated text.
         """
+        return self.translate_many([text], target_lang)[0]
+
+    def translate_many(self, texts, target_lang):
+        """Translates a list of texts, packing as many of them as the API
+        allows into each request.
+
+        Arguments:
+        texts -- The list of texts to translate
+        target_lang -- The ISO-639 language code to translate to
+
+        Returns the translated texts, in the same order as texts.
+        """
+        translated = []
+
+        for batch in batch_texts(texts):
+            characters = sum(len(text) for text in batch)
+            instrumentation.increment('translate.requests')
+            instrumentation.increment('translate.texts', len(batch))
+            instrumentation.increment('translate.characters', characters)
+
+            with instrumentation.timed('translate.request'):
+                req = self.translate_service.translations().list(
+                    q=batch, target=target_lang, source=self.source_lang
+                )
+                response = self.scheduler.call(req.execute, characters)
+            translations = response.get('translations')
+
+            if len(translations) != len(batch):
+                raise ValueError(
+                    "Expected {} translations, got {}".format(
+                        len(batch), len(translations)
+                    )
+                )
 
-        req = self.translate_service.translations().list(
-            q=text, target=target_lang, source='en'
-        )
-        texts = req.execute()
+            translated.extend(
+                translation.get('translatedText')
+                for translation in translations
+            )
 
-        return texts.get('translations')[0].get('translatedText')
+        return translated
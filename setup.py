@@ -50,17 +50,22 @@ setup(
         # Specify the Python versions you support here. In particular, ensure
         # that you indicate whether you support Python 2, Python 3 or both.
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
     ],
 
+    # argparse's parse_intermixed_args needs 3.7.
+    python_requires='>=3.7',
+
     # What does your project relate to?
     keywords='localization development',
 
     # You can just specify the packages manually here if your project is
     # simple. Or you can use find_packages().
-    packages=find_packages(exclude=['contrib', 'docs', 'tests']),
+    packages=find_packages(exclude=['benchmarks', 'contrib', 'docs', 'tests']),
 
     # Alternatively, if you want to distribute just a my_module.py, uncomment
     # this:
@@ -101,7 +106,10 @@ setup(
         'console_scripts': [
             'sample=sample:main',
             'lproj_translate=pylocalizer.lproj_translate:main',
-            'lproj_inspect=pylocalizer.lproj_inspect:main'
+            'lproj_inspect=pylocalizer.lproj_inspect:main',
+            'lproj_daemon=pylocalizer.lproj_daemon:main',
+            'lproj_client=pylocalizer.lproj_client:main',
+            'lproj_sync=pylocalizer.lproj_sync:main'
         ],
     },
 )
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from .helpers import BASE_STRINGS, FILES, LANGUAGES, age_directories
+
+
+@pytest.fixture
+def project_dir(tmpdir):
+    for language in LANGUAGES:
+        lproj = tmpdir.join('Resources', '{}.lproj'.format(language))
+        lproj.ensure(dir=True)
+        lproj.join('Localizable.strings').write(BASE_STRINGS)
+    return str(tmpdir) + '/'
+
+
+@pytest.fixture
+def root(tmpdir):
+    repo = tmpdir.join('repo')
+    for path, content in FILES.items():
+        repo.join(path).write(content, ensure=True)
+    age_directories(str(repo))
+    return str(repo)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import os
+from unittest import mock
+
+from pylocalizer import add_localized_string
+
+
+LANGUAGES = ['Base', 'de', 'es', 'fr', 'ja']
+BASE_STRINGS = '"apple" = "Apple";\n"cherry" = "Cherry";\n'
+
+
+def fake_translator(fail_language=None):
+    def translate_many(texts, target_lang):
+        if target_lang == fail_language:
+            raise ValueError('Quota exceeded')
+        return ['{}:{}'.format(target_lang, text) for text in texts]
+
+    translator = mock.MagicMock(source_lang='en')
+    translator.translate_many.side_effect = translate_many
+    translator.translate.side_effect = (
+        lambda text, target_lang: translate_many([text], target_lang)[0]
+    )
+    return translator
+
+
+def make_project(project_dir, tmpdir, translator=None, **kwargs):
+    return add_localized_string.XcodeLocalizationProject(
+        project_dir, str(tmpdir.join('scratch')),
+        translator or fake_translator(), **kwargs
+    )
+
+
+def values(project, key):
+    return {
+        lproj.language_code: dict(lproj.get_keys()).get(key)
+        for lproj in project.lprojs
+    }
+
+
+FILES = {
+    'App/Resources/Base.lproj/Localizable.strings':
+        '"apple" = "Apple";\n"cherry" = "Cherry";\n',
+    'App/Resources/Base.lproj/InfoPlist.strings': '"name" = "App";\n',
+    'App/Resources/de.lproj/Localizable.strings': '"apple" = "Apfel";\n',
+    'App/Resources/de.lproj/InfoPlist.strings': '"name" = "App";\n',
+    'Widget/Sources/UI/Base.lproj/Localizable.strings':
+        '"banana" = "Banana";\n',
+    'Widget/Sources/UI/fr.lproj/Localizable.strings': '',
+    'Pods/Library/Base.lproj/Localizable.strings': '"pod" = "Pod";\n',
+    'build/App.app/Base.lproj/Localizable.strings': '"built" = "Built";\n',
+    'App/Resources/Base.lproj/notes.txt': 'Not a strings file\n',
+}
+OLD_MTIME_NS = 10 ** 18
+
+
+def age_directories(root):
+    """Moves every directory's mtime out of the racy window."""
+    for dirpath, _, _ in os.walk(root):
+        os.utime(dirpath, ns=(OLD_MTIME_NS, OLD_MTIME_NS))
+
+
+def fake_translate_service():
+    """Builds a translate service mock which upper-cases every text."""
+    def list_translations(q, target, source):
+        request = mock.MagicMock()
+        request.execute.return_value = {
+            'translations': [
+                {'translatedText': '{}:{}'.format(target, text.upper())}
+                for text in q
+            ]
+        }
+        return request
+
+    service = mock.MagicMock()
+    service.translations.return_value.list.side_effect = list_translations
+    return service
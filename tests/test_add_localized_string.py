@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+import os
+from unittest import mock
+
+import pytest
+
+from pylocalizer import add_localized_string
+
+from .helpers import BASE_STRINGS, LANGUAGES
+from .helpers import fake_translator, make_project, values
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_set_all_languages(project_dir, tmpdir, workers):
+    project = make_project(project_dir, tmpdir, workers=workers)
+
+    project.set('banana', 'Banana')
+
+    assert {
+        'Base': 'Banana',
+        'de': 'de:Banana',
+        'es': 'es:Banana',
+        'fr': 'fr:Banana',
+        'ja': 'ja:Banana',
+    } == values(project, 'banana')
+
+
+def test_set_escapes_values(project_dir, tmpdir):
+    project = make_project(project_dir, tmpdir)
+
+    assert project.set('quote', 'Quote "x"\n')
+
+    assert {
+        'Base': 'Quote \\"x\\"\\n',
+        'de': 'de:Quote \\"x\\"\\n',
+    } == {
+        language: value for language, value in values(project, 'quote').items()
+        if language in ('Base', 'de')
+    }
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_set_writes_nothing_if_a_language_fails(project_dir, tmpdir,
+                                                workers):
+    project = make_project(
+        project_dir, tmpdir, fake_translator(fail_language='fr'),
+        workers=workers
+    )
+
+    assert not project.set('banana', 'Banana')
+
+    assert set([None]) == set(values(project, 'banana').values())
+    assert [] == tmpdir.join('Resources', 'Base.lproj').listdir(
+        lambda path: path.basename != 'Localizable.strings'
+    )
+
+
+def test_set_rolls_back_if_a_file_cannot_be_replaced(project_dir, tmpdir):
+    project = make_project(project_dir, tmpdir)
+    real_replace = os.replace
+    replaced = []
+
+    def flaky_replace(src, dst):
+        if src.endswith('.tmp') and dst.endswith('Localizable.strings'):
+            if len(replaced) == 2:
+                raise OSError('Disk full')
+            replaced.append(dst)
+        real_replace(src, dst)
+
+    with mock.patch('os.replace', side_effect=flaky_replace):
+        assert not project.set('banana', 'Banana')
+
+    assert 2 == len(replaced)
+    for lproj in project.lprojs:
+        assert BASE_STRINGS == open(lproj.path).read()
+    assert [] == tmpdir.join('Resources', 'de.lproj').listdir(
+        lambda path: path.basename != 'Localizable.strings'
+    )
+
+
+def test_set_replaces_existing_key(project_dir, tmpdir):
+    project = make_project(project_dir, tmpdir)
+
+    project.set('apple', 'Green apple')
+
+    for result in project.get('apple'):
+        assert result['text'].endswith('Green apple')
+    lines = open(project.lprojs[0].path).read().splitlines()
+    assert 2 == len(lines)
+
+
+def test_construction_leaves_scratch_dir_alone(project_dir, tmpdir):
+    make_project(project_dir, tmpdir)
+
+    assert not tmpdir.join('scratch').check()
+
+
+@pytest.mark.parametrize('recursive', [False, True])
+def test_reads_with_an_unwritable_scratch_dir(project_dir, recursive):
+    project = add_localized_string.XcodeLocalizationProject(
+        project_dir, '/dev/null/scratch', fake_translator(),
+        recursive=recursive
+    )
+
+    assert len(LANGUAGES) == len(list(project.get('apple')))
+    assert [] == list(project.diff_keys())
+    assert len(LANGUAGES) - 1 == len(list(project.coverage()))
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_set_many(project_dir, tmpdir, workers):
+    translator = fake_translator()
+    project = make_project(project_dir, tmpdir, translator, workers=workers)
+
+    project.set_many({'date': 'Date', 'banana': 'Banana', 'apple': 'Red'})
+
+    assert len(LANGUAGES) - 1 == translator.translate_many.call_count
+    for lproj in project.lprojs:
+        prefix = '' if lproj.language_code == 'Base' else '{}:'.format(
+            lproj.language_code
+        )
+        assert [
+            ('apple', prefix + 'Red'),
+            ('banana', prefix + 'Banana'),
+            ('cherry', 'Cherry'),
+            ('date', prefix + 'Date'),
+        ] == list(lproj.get_keys())
+
+
+def test_read_key_values():
+    mapping = add_localized_string.read_key_values([
+        'greeting=Hello\n', '\n', '# comment\n', 'sum=1 + 1 = 2\n'
+    ])
+
+    assert [('greeting', 'Hello'), ('sum', '1 + 1 = 2')] == list(
+        mapping.items()
+    )
+    with pytest.raises(ValueError):
+        add_localized_string.read_key_values(['no pair'])
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_diff_keys_reparses_only_changed_files(project_dir, tmpdir, workers):
+    tmpdir.join('Resources', 'de.lproj', 'Localizable.strings').write(
+        '"apple" = "Apfel";\n'
+    )
+    project = make_project(project_dir, tmpdir)
+
+    first = list(project.diff_keys(workers))
+    assert [('cherry', 'Cherry', 'de')] == [
+        (diff['key'], diff['text'], diff['language']) for diff in first
+    ]
+
+    with mock.patch('key_snapshot.scan_strings_file') as scan:
+        assert first == list(project.diff_keys(workers))
+        scan.assert_not_called()
+
+    tmpdir.join('Resources', 'es.lproj', 'Localizable.strings').write(
+        '"cherry" = "Cereza";\n'
+    )
+    assert [('apple', 'es'), ('cherry', 'de')] == sorted(
+        (diff['key'], diff['language'])
+        for diff in project.diff_keys(workers)
+    )
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+import os
+import socket
+from unittest import mock
+
+import pytest
+
+from pylocalizer import discovery_cache
+
+
+DOCUMENT = '{"name": "translate", "version": "v2"}'
+
+
+@pytest.fixture
+def cache(tmpdir):
+    cache = discovery_cache.DiscoveryCache(str(tmpdir.join('discovery')))
+    with mock.patch.object(cache, 'fetch', return_value=DOCUMENT):
+        yield cache
+
+
+def test_fetches_once(cache):
+    assert DOCUMENT == cache.get('translate', 'v2')
+    assert DOCUMENT == cache.get('translate', 'v2')
+
+    cache.fetch.assert_called_once_with('translate', 'v2')
+    assert os.path.exists(cache.document_path('translate', 'v2'))
+
+
+def test_refreshes_stale_document(cache):
+    cache.get('translate', 'v2')
+    path = cache.document_path('translate', 'v2')
+    os.utime(path, (0, 0))
+
+    cache.get('translate', 'v2')
+
+    assert 2 == cache.fetch.call_count
+
+
+def test_falls_back_to_stale_document(cache):
+    cache.get('translate', 'v2')
+    os.utime(cache.document_path('translate', 'v2'), (0, 0))
+    cache.fetch.side_effect = IOError('offline')
+
+    assert DOCUMENT == cache.get('translate', 'v2')
+
+
+def test_falls_back_to_stale_document_on_timeout(tmpdir):
+    cache = discovery_cache.DiscoveryCache(
+        str(tmpdir.join('discovery')), timeout=5
+    )
+    cache._store(cache.document_path('translate', 'v2'), DOCUMENT)
+    os.utime(cache.document_path('translate', 'v2'), (0, 0))
+
+    with mock.patch('httplib2.Http') as http:
+        http.return_value.request.side_effect = socket.timeout('timed out')
+        assert DOCUMENT == cache.get('translate', 'v2')
+
+    http.assert_called_once_with(timeout=5)
+
+
+def test_raises_without_any_document(cache):
+    cache.fetch.side_effect = IOError('offline')
+
+    with pytest.raises(discovery_cache.DiscoveryDocumentError):
+        cache.get('translate', 'v2')
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+import io
+import sys
+from unittest import mock
+
+import pytest
+
+from pylocalizer import add_localized_string, exchange
+
+from .helpers import make_project, values
+
+
+DE_PATH = 'Resources/de.lproj/Localizable.strings'
+
+UNITS = [
+    ('apple', 'Apple & <Pear>', 'Apfel'),
+    ('cherry', 'Say "hi"\n', None),
+]
+
+
+def export_files():
+    return [exchange.ExportFile(DE_PATH, 'de', iter(UNITS))]
+
+
+@pytest.mark.parametrize('file_format', exchange.FORMATS)
+def test_round_trip(file_format):
+    output = io.StringIO()
+
+    assert 2 == exchange.write(output, export_files(), file_format)
+
+    assert [
+        (DE_PATH, 'apple', 'Apfel'),
+        (DE_PATH, 'cherry', None),
+    ] == list(exchange.read(io.StringIO(output.getvalue()), file_format))
+
+
+def test_read_xliff_groups_and_resnames():
+    document = """<?xml version="1.0" encoding="UTF-8"?>
+<xliff version="1.2">
+  <file original="a.strings" source-language="en" target-language="de">
+    <body>
+      <group>
+        <trans-unit id="1" resname="apple">
+          <source>Apple</source>
+          <target>Apfel <g id="b">rot</g></target>
+        </trans-unit>
+      </group>
+    </body>
+  </file>
+  <file original="b.strings" source-language="en" target-language="fr">
+    <body>
+      <trans-unit id="cherry"><source>Cherry</source></trans-unit>
+    </body>
+  </file>
+</xliff>
+"""
+
+    assert [
+        ('a.strings', 'apple', 'Apfel rot'),
+        ('b.strings', 'cherry', None),
+    ] == list(exchange.read_xliff(io.StringIO(document)))
+
+
+def test_read_csv_needs_columns():
+    with pytest.raises(ValueError):
+        list(exchange.read_csv(io.StringIO('path,key\na,b\n')))
+
+
+def test_format_for_path():
+    assert exchange.CSV == exchange.format_for_path('vendor/DE.CSV')
+    assert exchange.XLIFF == exchange.format_for_path('vendor/de.xliff')
+
+
+def test_export_translations(project_dir, tmpdir):
+    with open(project_dir + DE_PATH, 'a') as de_file:
+        de_file.write('"quote" = "Sag \\"hallo\\"";\n')
+    with open(project_dir + 'Resources/Base.lproj/Localizable.strings',
+              'a') as base_file:
+        base_file.write('"quote" = "Say \\"hi\\"";\n"kiwi" = "Kiwi";\n')
+    project = make_project(project_dir, tmpdir)
+    output = io.StringIO()
+
+    assert 16 == project.export_translations(output, exchange.CSV)
+
+    rows = [
+        row.split(',', 2) for row in output.getvalue().splitlines()[1:]
+        if row.startswith(DE_PATH)
+    ]
+    assert [
+        [DE_PATH, 'de', 'apple,Apple,Apple'],
+        [DE_PATH, 'de', 'cherry,Cherry,Cherry'],
+        [DE_PATH, 'de', 'quote,"Say ""hi""","Sag ""hallo"""'],
+        [DE_PATH, 'de', 'kiwi,Kiwi,'],
+    ] == rows
+
+
+@pytest.mark.parametrize('file_format', exchange.FORMATS)
+def test_import_translations(project_dir, tmpdir, file_format):
+    project = make_project(project_dir, tmpdir)
+    output = io.StringIO()
+    project.export_translations(output, file_format)
+    exported = output.getvalue()
+
+    # An unchanged export is a no-op.
+    assert {} == project.import_translations(
+        io.StringIO(exported), file_format
+    )
+
+    source = io.StringIO()
+    exchange.write(source, [
+        exchange.ExportFile(DE_PATH, 'de', [
+            ('apple', 'Apple', 'Apfel "rot"'),
+            ('cherry', 'Cherry', 'Cherry'),
+            ('banana', 'Banana', 'Banane'),
+        ]),
+        exchange.ExportFile('Resources/xx.lproj/Localizable.strings', 'xx', [
+            ('apple', 'Apple', 'Xapple'),
+        ]),
+    ], file_format)
+
+    changes = project.import_translations(
+        io.StringIO(source.getvalue()), file_format
+    )
+
+    assert {project_dir + DE_PATH: {'apple': 'Apfel "rot"'}} == changes
+    assert 'Apfel \\"rot\\"' == values(project, 'apple')['de']
+    assert 'Apple' == values(project, 'apple')['fr']
+    assert values(project, 'banana')['de'] is None
+
+
+def test_import_writes_nothing_if_commit_fails(project_dir, tmpdir):
+    project = make_project(project_dir, tmpdir)
+    source = io.StringIO()
+    exchange.write(source, [
+        exchange.ExportFile(DE_PATH, 'de', [('apple', 'Apple', 'Apfel')]),
+    ])
+
+    with mock.patch('add_localized_string.FileTransaction.commit',
+                    side_effect=OSError('Disk full')):
+        assert project.import_translations(
+            io.StringIO(source.getvalue())
+        ) is None
+
+    assert 'Apple' == values(project, 'apple')['de']
+
+
+def test_main_export_and_import(project_dir, tmpdir, capsys):
+    path = str(tmpdir.join('vendor.csv'))
+    scratch_dir = str(tmpdir.join('scratch'))
+
+    with mock.patch.object(sys, 'argv', [
+            'add_localized_string', project_dir, scratch_dir,
+            '--export', path]):
+        add_localized_string.main()
+
+    with open(path, encoding='utf-8') as export_file:
+        exported = export_file.read()
+    assert exported.startswith('path,language,key,source,target')
+    with open(path, 'w', encoding='utf-8') as export_file:
+        export_file.write(exported.replace(
+            'de,apple,Apple,Apple', 'de,apple,Apple,Apfel'
+        ))
+
+    with mock.patch.object(sys, 'argv', [
+            'add_localized_string', project_dir, scratch_dir,
+            '--import', path]):
+        add_localized_string.main()
+
+    assert 'Imported 1 translations into 1 files' in capsys.readouterr().out
+    assert 'Apfel' == values(make_project(project_dir, tmpdir), 'apple')['de']
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import pstats
+import sys
+from unittest import mock
+
+import pytest
+
+from pylocalizer import add_localized_string, lproj_inspect, translator
+
+from .helpers import LANGUAGES, fake_translate_service
+
+
+# The modules are imported from inside the package directory, so this is
+# the instrumentation module they record to.
+instrumentation = add_localized_string.instrumentation
+
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+    instrumentation.reset()
+    yield
+    instrumentation.reset()
+
+
+def test_summary_counts_and_hit_rates():
+    stats = instrumentation.Stats()
+    stats.increment('cache.hits', 3)
+    stats.increment('cache.misses')
+    stats.increment('requests')
+    stats.record_read('a.strings', 10)
+    stats.record_written('a.strings', 4)
+    stats.record_read('b.strings', 5)
+    with stats.timed('stage'):
+        pass
+    with stats.timed('stage'):
+        pass
+
+    summary = stats.summary()
+
+    assert {'cache.hits': 3, 'cache.misses': 1, 'requests': 1} == (
+        summary['counters']
+    )
+    assert {'cache': 0.75} == summary['hit_rates']
+    assert 2 == summary['stages']['stage']['calls']
+    assert 15 == summary['bytes_read']
+    assert 4 == summary['bytes_written']
+    assert {'read': 10, 'written': 4} == summary['files']['a.strings']
+
+
+def test_translator_counts_requests_and_characters():
+    t = translator.Translator(translate_service=fake_translate_service())
+
+    t.translate_many(['word'] * 200, 'de')
+
+    summary = instrumentation.summary()
+    assert 2 == summary['counters']['translate.requests']
+    assert 200 == summary['counters']['translate.texts']
+    assert 800 == summary['counters']['translate.characters']
+    assert 2 == summary['stages']['translate.request']['calls']
+
+
+def test_stats_file(project_dir, tmpdir):
+    stats_path = str(tmpdir.join('stats.json'))
+    argv = ['lproj_inspect', '-d', project_dir, '-k', 'apple',
+            '--scratch-dir', str(tmpdir.join('scratch')),
+            '--stats-file', stats_path]
+
+    with mock.patch.object(sys, 'argv', argv):
+        lproj_inspect.main()
+
+    with open(stats_path) as stats_file:
+        summary = json.load(stats_file)
+    assert 1 == summary['stages']['xcode_project.get']['calls']
+    assert summary['bytes_read'] > 0
+    assert 'key_snapshot' in summary['hit_rates']
+
+
+def test_set_records_writes(project_dir, tmpdir):
+    t = translator.Translator(translate_service=fake_translate_service())
+    project = add_localized_string.XcodeLocalizationProject(
+        project_dir, str(tmpdir.join('scratch')), t
+    )
+
+    assert project.set('banana', 'Banana')
+
+    summary = instrumentation.summary()
+    written = [
+        path for path, record in summary['files'].items()
+        if record['written']
+    ]
+    assert len(LANGUAGES) == len(written)
+    assert len(LANGUAGES) - 1 == summary['counters']['translate.requests']
+    assert 1 == summary['stages']['xcode_project.commit']['calls']
+
+
+def test_profile(project_dir, tmpdir, capsys):
+    prefix = str(tmpdir.join('run'))
+    argv = ['lproj_inspect', '-d', project_dir, '-k', 'apple',
+            '--scratch-dir', str(tmpdir.join('scratch')),
+            '--profile', prefix, '--stats']
+
+    with mock.patch.object(sys, 'argv', argv):
+        lproj_inspect.main()
+
+    pstats.Stats(prefix + '.prof')
+    assert os.path.getsize(prefix + '.tracemalloc.txt') > 0
+    assert 'wall_seconds' in json.loads(capsys.readouterr().err)
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import sys
+from unittest import mock
+
+import pytest
+
+from pylocalizer import key_index, lproj_inspect
+
+from .helpers import make_project
+
+
+def make_recursive_project(root, tmpdir):
+    return make_project(root, tmpdir, recursive=True, table=None)
+
+
+def summary(entries):
+    return [
+        (entry['key'], entry['target'], entry['table'], entry['language'],
+         entry['value'], entry['line'])
+        for entry in entries
+    ]
+
+
+@pytest.mark.parametrize('prefix,expected', [
+    ('a', 'b'),
+    ('menu.', 'menu/'),
+    ('é', 'ê'),
+])
+def test_prefix_upper_bound(prefix, expected):
+    assert expected == key_index.prefix_upper_bound(prefix)
+
+
+def test_lookup_and_prefix(root, tmpdir):
+    index = make_recursive_project(root, tmpdir).key_index()
+
+    assert [
+        ('cherry', 'App/Resources', 'Localizable', 'Base', 'Cherry', 2),
+    ] == summary(index.lookup('cherry'))
+    assert [
+        ('apple', 'App/Resources', 'Localizable', 'Base', 'Apple', 1),
+        ('apple', 'App/Resources', 'Localizable', 'de', 'Apfel', 1),
+    ] == summary(index.prefix('ap'))
+    assert ['apple', 'apple', 'banana'] == [
+        entry['key'] for entry in index.prefix('', limit=3)
+    ]
+    assert [] == index.prefix('zebra')
+    assert os.path.join(
+        root, 'App', 'Resources', 'de.lproj', 'Localizable.strings'
+    ) == index.prefix('ap')[1]['path']
+
+
+def test_duplicates(root, tmpdir):
+    project = make_recursive_project(root, tmpdir)
+    assert {} == project.key_index().duplicates()
+
+    widget = os.path.join(
+        root, 'Widget', 'Sources', 'UI', 'Base.lproj', 'Localizable.strings'
+    )
+    with open(widget, 'a') as strings_file:
+        strings_file.write('"name" = "Widget";\n')
+
+    duplicates = project.key_index().duplicates()
+    assert ['name'] == list(duplicates)
+    assert [
+        ('name', 'App/Resources', 'InfoPlist', 'Base', 'App', 1),
+        ('name', 'App/Resources', 'InfoPlist', 'de', 'App', 1),
+        ('name', 'Widget/Sources/UI', 'Localizable', 'Base', 'Widget', 2),
+    ] == summary(duplicates['name'])
+
+
+def test_refresh_only_reads_changed_files(root, tmpdir):
+    project = make_recursive_project(root, tmpdir)
+    index = project.key_index()
+    assert 6 == len(index.reindexed)
+    entries = len(index)
+
+    index.refresh(project.lprojs)
+    assert [] == index.reindexed
+
+    de = project.get_lproj('de')
+    with open(de.path, 'w') as strings_file:
+        strings_file.write('"apple" = "Apfel";\n"cherry" = "Kirsche";\n')
+    index.refresh(project.lprojs)
+    assert [de.path] == index.reindexed
+    assert entries + 1 == len(index)
+
+    index.refresh([lproj for lproj in project.lprojs if lproj is not de])
+    assert ['Base'] == [entry['language'] for entry in index.lookup('cherry')]
+
+
+def test_rebuilds_index_of_another_version(root, tmpdir):
+    project = make_recursive_project(root, tmpdir)
+    project.key_index().close()
+
+    with mock.patch('key_index.INDEX_VERSION', 3):
+        index = project.key_index()
+
+    assert 6 == len(index.reindexed)
+
+
+def test_inspect_prefix(root, tmpdir, capsys):
+    argv = [
+        'lproj_inspect', '-d', root,
+        '--scratch-dir', str(tmpdir.join('scratch')),
+        '--recursive', '--prefix', 'ban',
+    ]
+
+    with mock.patch.object(sys, 'argv', argv):
+        lproj_inspect.main()
+
+    output = json.loads(capsys.readouterr().out)
+    assert [('banana', 'Base')] == [
+        (entry['key'], entry['language']) for entry in output
+    ]
+
+
+def test_trigrams():
+    assert {' ok', 'ok '} == key_index.trigrams('OK')
+    assert key_index.trigrams('Sign  in') == key_index.trigrams('sign in')
+    assert set() == key_index.trigrams('   ')
+
+
+def test_search(root, tmpdir):
+    project = make_recursive_project(root, tmpdir)
+    index = project.key_index()
+
+    matches = index.search('apple', min_score=0.5)
+    assert [('apple', 1.0, True)] == [
+        (match['key'], match['score'], match['exact']) for match in matches
+    ]
+    assert {'Base': 'Apple', 'de': 'Apfel'} == matches[0]['translations']
+    assert ['apple'] == [match['key'] for match in index.search('Apples')]
+    assert [] == index.search('Kirsche')
+    assert [] == index.search('')
+
+
+def test_search_follows_changes(root, tmpdir):
+    project = make_recursive_project(root, tmpdir)
+    index = project.key_index()
+
+    base = os.path.join(
+        root, 'App', 'Resources', 'Base.lproj', 'Localizable.strings'
+    )
+    with open(base, 'w') as strings_file:
+        strings_file.write('"pear" = "Pear";\n"cherry" = "Cherry";\n')
+    index.refresh(project.lprojs)
+
+    assert [] == index.search('Apple', min_score=0.5)
+    assert [('pear', True)] == [
+        (match['key'], match['exact']) for match in index.search('pear')
+    ]
+
+
+def test_inspect_search(root, tmpdir, capsys):
+    argv = [
+        'lproj_inspect', '-d', root,
+        '--scratch-dir', str(tmpdir.join('scratch')),
+        '--recursive', '--search', 'Banan',
+        '--min-score', '0.5',
+    ]
+
+    with mock.patch.object(sys, 'argv', argv):
+        lproj_inspect.main()
+
+    output = json.loads(capsys.readouterr().out)
+    assert [('banana', 'Widget/Sources/UI', False)] == [
+        (match['key'], match['target'], match['exact']) for match in output
+    ]
+    assert {'Base': 'Banana'} == output[0]['translations']
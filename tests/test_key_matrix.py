@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+import concurrent.futures
+import json
+import os
+import sys
+from unittest import mock
+
+from pylocalizer import (
+    add_localized_string, key_matrix, key_snapshot, lproj_inspect,
+)
+
+from .helpers import make_project
+
+
+def make_matrix():
+    matrix = key_matrix.KeyMatrix()
+    matrix.set_column('Base', [
+        ('apple', 'Apple'), ('cherry', 'Cherry'), ('kiwi', 'Kiwi'),
+    ])
+    matrix.set_column('de', [
+        ('kiwi', 'Kiwi'), ('apple', 'Äpfel'), ('apple', 'Apfel'),
+    ])
+    return matrix
+
+
+def test_keys_are_kept_once():
+    matrix = make_matrix()
+
+    assert ['apple', 'cherry', 'kiwi'] == matrix.keys
+    assert [0, 1, 2] == list(matrix.columns['Base'].key_ids)
+    assert [0, 2] == list(matrix.columns['de'].key_ids)
+
+
+def test_get_missing_and_coverage():
+    matrix = make_matrix()
+
+    assert 'Äpfel' == matrix.get('de', 'apple')
+    assert matrix.get('de', 'cherry') is None
+    assert matrix.get('de', 'banana') is None
+    assert matrix.get('fr', 'apple') is None
+    assert ['cherry'] == matrix.missing_keys('Base', 'de')
+    assert (2, 3) == matrix.coverage('Base', 'de')
+    assert [('apple', 'Äpfel'), ('kiwi', 'Kiwi')] == list(matrix.items('de'))
+
+
+def test_compacts_replaced_columns():
+    matrix = make_matrix()
+    for idx in range(4):
+        matrix.set_column('de', [('key{}'.format(idx), 'Wert')])
+
+    assert ['apple', 'cherry', 'kiwi', 'key3'] == matrix.keys
+    assert 'Wert' == matrix.get('de', 'key3')
+    assert 'Kiwi' == matrix.get('Base', 'kiwi')
+
+
+def test_json_round_trip():
+    matrix = make_matrix()
+    matrix.drop_column('de')
+
+    loaded = key_matrix.KeyMatrix.from_json(
+        json.loads(json.dumps(matrix.to_json()))
+    )
+
+    assert ['apple', 'cherry', 'kiwi'] == loaded.keys
+    assert 'Cherry' == loaded.get('Base', 'cherry')
+    assert 'de' not in loaded
+
+
+def test_snapshot_rereads_written_files(project_dir, tmpdir):
+    project = make_project(project_dir, tmpdir)
+    assert 'Apple' == next(project.get('apple'))['text']
+
+    # Written within the same modification time and size as before.
+    assert project.set('apple', 'Apfel')
+
+    assert set(['Apfel']) == set(
+        result['text'].split(':')[-1] for result in project.get('apple')
+    )
+
+
+def test_snapshot_keeps_written_files(project_dir, tmpdir):
+    instrumentation = add_localized_string.instrumentation
+    project = make_project(project_dir, tmpdir)
+    list(project.get('apple'))
+    assert project.set('banana', 'Banana')
+    instrumentation.reset()
+
+    assert 'de:Banana' == {
+        result['language']: result['text']
+        for result in project.get('banana')
+    }['de']
+    assert [] == list(project.diff_keys())
+
+    counters = instrumentation.summary()['counters']
+    assert 0 == counters.get('key_snapshot.misses', 0)
+
+
+def test_inspect_coverage(project_dir, tmpdir, capsys):
+    tmpdir.join('Resources', 'de.lproj', 'Localizable.strings').write(
+        '"apple" = "Apfel";\n'
+    )
+    argv = [
+        'lproj_inspect', '-d', project_dir,
+        '--scratch-dir', str(tmpdir.join('scratch')), '--coverage',
+    ]
+
+    with mock.patch.object(sys, 'argv', argv):
+        lproj_inspect.main()
+
+    coverage = {
+        output['language']: (output['translated'], output['total'],
+                             output['coverage'])
+        for output in json.loads(capsys.readouterr().out)
+    }
+    assert (1, 2, 0.5) == coverage['de']
+    assert (2, 2, 1.0) == coverage['es']
+    assert 'Base' not in coverage
+
+
+def test_snapshots_of_projects_in_the_same_scratch_dir(tmpdir):
+    scratch_dir = str(tmpdir.join('scratch'))
+    for name, base in [('a', '"x" = "X";\n'), ('b', '"y" = "Y";\n')]:
+        for language, text in [('Base', base), ('de', '')]:
+            path = tmpdir.join(name, 'Resources', '{}.lproj'.format(language),
+                               'Localizable.strings')
+            path.write(text, ensure=True)
+            os.utime(str(path), (1000000000, 1000000000))
+
+    missing = {}
+    for name in ['a', 'b']:
+        with tmpdir.join(name).as_cwd():
+            project = add_localized_string.XcodeLocalizationProject(
+                './', scratch_dir
+            )
+            missing[name] = [entry['key'] for entry in project.diff_keys()]
+
+    assert {'a': ['x'], 'b': ['y']} == missing
+    assert 2 == len(tmpdir.join('scratch').listdir(
+        lambda path: path.basename.startswith('diff_keys_snapshot')
+    ))
+
+
+def save_snapshot(path):
+    for _ in range(200):
+        snapshot = key_snapshot.KeySnapshot(path)
+        snapshot.changed = True
+        snapshot.save()
+
+
+def test_concurrent_snapshot_saves(tmpdir):
+    path = str(tmpdir.join('snapshot.json'))
+
+    with concurrent.futures.ProcessPoolExecutor(4) as executor:
+        list(executor.map(save_snapshot, [path] * 4))
+
+    assert ['snapshot.json'] == [entry.basename for entry in tmpdir.listdir()]
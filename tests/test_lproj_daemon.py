@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import json
+import os
+import pstats
+import socket
+import sys
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from pylocalizer import lproj_client, lproj_daemon
+
+from .helpers import BASE_STRINGS, LANGUAGES
+from .helpers import fake_translator
+
+
+@pytest.fixture
+def service(project_dir, tmpdir):
+    return lproj_daemon.LocalizationService(
+        project_dir, str(tmpdir.join('scratch')), fake_translator()
+    )
+
+
+@pytest.fixture
+def socket_path(service, tmpdir):
+    path = str(tmpdir.join('daemon.sock'))
+    daemon = lproj_daemon.LocalizationDaemon(path, service)
+    thread = threading.Thread(target=daemon.serve_forever)
+    thread.start()
+
+    yield path
+
+    daemon.shutdown()
+    thread.join()
+    daemon.server_close()
+
+
+def texts(result):
+    return {entry['language']: entry['text'] for entry in result}
+
+
+def test_get_and_set(service):
+    response = service.handle({'command': 'set', 'key': 'banana',
+                               'value': 'Banana'})
+    assert {'ok': True, 'result': {'written': True}} == response
+
+    response = service.handle({'command': 'get', 'key': 'banana'})
+    assert response['ok']
+    assert 'de:Banana' == texts(response['result'])['de']
+
+
+def test_errors(service):
+    assert not service.handle({'command': 'explode'})['ok']
+    assert not service.handle({'command': 'get'})['ok']
+    assert not service.handle(['get'])['ok']
+
+
+def test_reloads_changed_files(service, project_dir):
+    assert 'Apple' == texts(service.get('apple'))['fr']
+    project = service.project
+
+    path = os.path.join(
+        project_dir, 'Resources', 'fr.lproj', 'Localizable.strings'
+    )
+    with open(path, 'w') as strings_file:
+        strings_file.write('"apple" = "Pomme";\n')
+
+    assert 'Pomme' == texts(service.get('apple'))['fr']
+    assert project is service.project
+
+
+def test_lists_new_languages(service, project_dir):
+    assert len(LANGUAGES) == len(service.get('apple'))
+
+    lproj = os.path.join(project_dir, 'Resources', 'it.lproj')
+    os.makedirs(lproj)
+    with open(os.path.join(lproj, 'Localizable.strings'), 'w') as f:
+        f.write(BASE_STRINGS)
+    os.utime(os.path.dirname(lproj), ns=(0, 0))
+
+    assert 'Apple' == texts(service.get('apple'))['it']
+
+
+def test_picks_up_new_targets_and_tables(project_dir, tmpdir):
+    service = lproj_daemon.LocalizationService(
+        project_dir, str(tmpdir.join('scratch')), fake_translator(),
+        recursive=True, table=None
+    )
+    assert len(LANGUAGES) == len(service.get('apple'))
+
+    target = tmpdir.join('Widget', 'Resources')
+    for language in ['Base', 'de']:
+        target.join('{}.lproj'.format(language), 'Localizable.strings').write(
+            BASE_STRINGS, ensure=True
+        )
+    tmpdir.join('Resources', 'de.lproj', 'InfoPlist.strings').write(
+        '"apple" = "Apfel";\n'
+    )
+
+    results = service.get('apple')
+
+    assert len(LANGUAGES) + 3 == len(results)
+    assert 'Apfel' in [result['text'] for result in results]
+
+
+def test_client_over_socket(socket_path):
+    with lproj_client.LocalizationClient(socket_path) as client:
+        assert os.getpid() == client.request('ping')['pid']
+        assert client.request('set_many', mapping={'banana': 'Banana'})
+        assert [] == client.request('diff_keys')
+        result = client.request('get', key='banana')
+
+        with pytest.raises(lproj_client.DaemonError):
+            client.request('set')
+
+    assert 'es:Banana' == texts(result)['es']
+
+
+def test_connections_do_not_wait_for_each_other(socket_path):
+    with lproj_client.LocalizationClient(socket_path) as editor:
+        assert editor.request('ping')
+
+        script = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        script.settimeout(3)
+        with contextlib.closing(script):
+            script.connect(socket_path)
+            script.sendall(b'{"command": "ping"}\n')
+            assert json.loads(script.makefile('rb').readline())['ok']
+
+
+def test_get_languages(service):
+    assert ['de', 'fr'] == sorted(
+        texts(service.get('apple', ['de', 'fr']))
+    )
+
+
+def test_refuses_to_replace_running_daemon(socket_path, service):
+    with pytest.raises(lproj_daemon.DaemonAlreadyRunning):
+        lproj_daemon.LocalizationDaemon(socket_path, service)
+
+
+def test_main_stats_and_profile(project_dir, tmpdir):
+    path = str(tmpdir.join('daemon.sock'))
+    stats_path = str(tmpdir.join('stats.json'))
+    prefix = str(tmpdir.join('daemon'))
+    argv = [
+        'lproj_daemon', project_dir, str(tmpdir.join('scratch')),
+        '--socket', path, '--no-cache', '--stats-file', stats_path,
+        '--profile', prefix,
+    ]
+
+    with mock.patch.object(sys, 'argv', argv):
+        thread = threading.Thread(target=lproj_daemon.main)
+        thread.start()
+        deadline = time.time() + 5
+        while not os.path.exists(path) and time.time() < deadline:
+            time.sleep(0.01)
+
+        with lproj_client.LocalizationClient(path) as client:
+            client.request('get', key='apple')
+        with lproj_client.LocalizationClient(path) as client:
+            client.request('shutdown')
+        thread.join(5)
+
+    with open(stats_path) as stats_file:
+        summary = json.load(stats_file)
+    assert 1 == summary['stages']['xcode_project.get']['calls']
+    # The requests are served by other threads than the one main runs in.
+    profile = pstats.Stats(prefix + '.prof')
+    daemon_functions = [
+        function for filename, _, function in profile.stats
+        if filename.endswith('lproj_daemon.py')
+    ]
+    assert 'get' in daemon_functions
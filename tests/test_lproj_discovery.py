@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+import concurrent.futures
+import os
+
+from pylocalizer import add_localized_string, lproj_discovery
+
+from .helpers import fake_translator
+
+
+def relative(root, strings_files):
+    return [
+        (os.path.relpath(found.path, root), found.language_code, found.table)
+        for found in strings_files
+    ]
+
+
+def test_discover_prunes_build_directories(root):
+    found = lproj_discovery.discover_strings_files(root)
+
+    assert [
+        ('App/Resources/Base.lproj/InfoPlist.strings', 'Base', 'InfoPlist'),
+        ('App/Resources/Base.lproj/Localizable.strings', 'Base',
+         'Localizable'),
+        ('App/Resources/de.lproj/InfoPlist.strings', 'de', 'InfoPlist'),
+        ('App/Resources/de.lproj/Localizable.strings', 'de', 'Localizable'),
+        ('Widget/Sources/UI/Base.lproj/Localizable.strings', 'Base',
+         'Localizable'),
+        ('Widget/Sources/UI/fr.lproj/Localizable.strings', 'fr',
+         'Localizable'),
+    ] == relative(root, found)
+
+
+def test_manifest_only_lists_changed_directories(root, tmpdir):
+    manifest_path = str(tmpdir.join('manifest.json'))
+    first = lproj_discovery.LprojManifest(root, manifest_path)
+    found = first.discover()
+    first.save()
+    assert first.rescanned == len(first.dirs)
+
+    second = lproj_discovery.LprojManifest(root, manifest_path)
+    assert found == second.discover()
+    assert 0 == second.rescanned
+
+    lproj = os.path.join(root, 'Widget/Sources/UI/es.lproj')
+    os.makedirs(lproj)
+    with open(os.path.join(lproj, 'Localizable.strings'), 'w'):
+        pass
+    third = lproj_discovery.LprojManifest(root, manifest_path)
+    found = third.discover()
+    # The new folder and the folder it was added to.
+    assert 2 == third.rescanned
+    assert ('Widget/Sources/UI/es.lproj/Localizable.strings', 'es',
+            'Localizable') in relative(root, found)
+
+
+def test_manifest_of_another_root_is_ignored(root, tmpdir):
+    manifest_path = str(tmpdir.join('manifest.json'))
+    lproj_discovery.discover_strings_files(
+        os.path.join(root, 'Widget'), manifest_path
+    )
+
+    manifest = lproj_discovery.LprojManifest(root, manifest_path)
+    assert {} == manifest.dirs
+
+
+def save_manifest(root, path):
+    for _ in range(200):
+        lproj_discovery.LprojManifest(root, path).save()
+
+
+def test_concurrent_manifest_saves(root, tmpdir):
+    scratch_dir = tmpdir.join('scratch')
+    path = str(scratch_dir.join('manifest.json'))
+
+    with concurrent.futures.ProcessPoolExecutor(4) as executor:
+        list(executor.map(save_manifest, [root] * 4, [path] * 4))
+
+    assert ['manifest.json'] == [
+        entry.basename for entry in scratch_dir.listdir()
+    ]
+
+
+def test_recursive_project(root, tmpdir):
+    project = add_localized_string.XcodeLocalizationProject(
+        root, str(tmpdir.join('scratch')), fake_translator(), recursive=True
+    )
+
+    assert ['Base', 'Base', 'de', 'fr'] == sorted(
+        lproj.language_code for lproj in project.lprojs
+    )
+    assert [
+        ('cherry', 'de', 'App/Resources/de.lproj/Localizable.strings'),
+        ('banana', 'fr', 'Widget/Sources/UI/fr.lproj/Localizable.strings'),
+    ] == [
+        (diff['key'], diff['language'], os.path.relpath(diff['path'], root))
+        for diff in project.diff_keys(1)
+    ]
+
+    assert project.set('grape', 'Grape')
+    assert 'fr:Grape' == project.get_lproj('fr').get('grape')
+
+
+def test_all_tables(root, tmpdir):
+    project = add_localized_string.XcodeLocalizationProject(
+        os.path.join(root, 'App'), str(tmpdir.join('scratch')),
+        fake_translator(), table=None
+    )
+
+    assert ['InfoPlist', 'InfoPlist', 'Localizable', 'Localizable'] == (
+        sorted(lproj.table for lproj in project.lprojs)
+    )
+    assert 'App' == next(
+        result['text'] for result in project.get('name')
+        if result['path'].endswith('de.lproj/InfoPlist.strings')
+    )
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+import json
+import sys
+from unittest import mock
+
+import pytest
+
+from pylocalizer import lproj_sync
+
+from .helpers import fake_translator, make_project, values
+
+
+def strings_path(root, language):
+    return '{}Resources/{}.lproj/Localizable.strings'.format(
+        root, language
+    )
+
+
+def add_base_keys(root, text):
+    with open(strings_path(root, 'Base'), 'a') as base_file:
+        base_file.write(text)
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_sync_fills_missing_keys(project_dir, tmpdir, workers):
+    add_base_keys(project_dir, '"banana" = "Banana";\n"kiwi" = "Kiwi";\n')
+    with open(strings_path(project_dir, 'fr'), 'a') as fr_file:
+        fr_file.write('"kiwi" = "Kiwi (fr)";\n')
+    translator = fake_translator()
+    project = make_project(project_dir, tmpdir, translator, workers=workers)
+
+    mappings = project.sync()
+
+    assert {'Banana', 'Kiwi'} == set(
+        text for mapping in mappings.values() for text in mapping.values()
+    )
+    assert {
+        'Base': 'Banana',
+        'de': 'de:Banana',
+        'es': 'es:Banana',
+        'fr': 'fr:Banana',
+        'ja': 'ja:Banana',
+    } == values(project, 'banana')
+    assert 'Kiwi (fr)' == values(project, 'kiwi')['fr']
+    # One batch per language, of only the texts that language is missing.
+    calls = sorted(
+        (call[0][1], call[0][0])
+        for call in translator.translate_many.call_args_list
+    )
+    assert [
+        ('de', ['Banana', 'Kiwi']),
+        ('es', ['Banana', 'Kiwi']),
+        ('fr', ['Banana']),
+        ('ja', ['Banana', 'Kiwi']),
+    ] == calls
+    assert not translator.translate.called
+    assert not list(project.diff_keys())
+
+
+def test_sync_merges_keys_in_sorted_order(project_dir, tmpdir):
+    add_base_keys(project_dir, '"banana" = "Banana";\n"aardvark" = "A";\n')
+    project = make_project(project_dir, tmpdir)
+
+    project.sync()
+
+    with open(strings_path(project_dir, 'de')) as de_file:
+        assert [
+            '"aardvark" = "de:A";',
+            '"apple" = "Apple";',
+            '"banana" = "de:Banana";',
+            '"cherry" = "Cherry";',
+        ] == de_file.read().splitlines()
+
+
+def test_sync_translates_unescaped_text(project_dir, tmpdir):
+    add_base_keys(project_dir, '"quote" = "Say \\"hi\\"";\n')
+    translator = fake_translator()
+    project = make_project(project_dir, tmpdir, translator)
+
+    project.sync()
+
+    assert ['Say "hi"'] == translator.translate_many.call_args[0][0]
+    assert 'de:Say \\"hi\\"' == values(project, 'quote')['de']
+    assert not list(project.diff_keys())
+    assert {} == project.sync()
+
+
+def test_sync_with_nothing_missing(project_dir, tmpdir):
+    translator = fake_translator()
+    project = make_project(project_dir, tmpdir, translator)
+
+    assert {} == project.sync()
+    assert not translator.translate_many.called
+
+
+def test_sync_writes_nothing_if_a_language_fails(project_dir, tmpdir):
+    add_base_keys(project_dir, '"banana" = "Banana";\n')
+    project = make_project(
+        project_dir, tmpdir, fake_translator(fail_language='es')
+    )
+
+    assert project.sync() is None
+    assert 4 == len(list(project.diff_keys()))
+
+
+def test_main(project_dir, tmpdir, capsys):
+    add_base_keys(project_dir, '"banana" = "Banana";\n')
+    argv = ['lproj_sync', project_dir, str(tmpdir.join('scratch')),
+            '--no-cache']
+
+    with mock.patch.object(sys, 'argv', argv), \
+            mock.patch('add_localized_string.Translator',
+                       return_value=fake_translator()):
+        lproj_sync.main()
+
+    summary = json.loads(capsys.readouterr().out)
+    assert [('de', 1), ('es', 1), ('fr', 1), ('ja', 1)] == sorted(
+        (output['language'], output['filled']) for output in summary
+    )
+
+
+def test_main_dry_run(project_dir, tmpdir, capsys):
+    add_base_keys(project_dir, '"banana" = "Banana";\n')
+    argv = ['lproj_sync', project_dir, str(tmpdir.join('scratch')),
+            '--no-cache', '--dry-run']
+    translator = fake_translator()
+
+    with mock.patch.object(sys, 'argv', argv), \
+            mock.patch('add_localized_string.Translator',
+                       return_value=translator):
+        lproj_sync.main()
+
+    assert 4 == len(json.loads(capsys.readouterr().out))
+    assert not translator.translate_many.called
+    assert values(make_project(project_dir, tmpdir), 'banana')['de'] is None
+
+
+def test_main_fails_if_nothing_was_written(project_dir, tmpdir):
+    add_base_keys(project_dir, '"banana" = "Banana";\n')
+    argv = ['lproj_sync', project_dir, str(tmpdir.join('scratch')),
+            '--no-cache']
+
+    with mock.patch.object(sys, 'argv', argv), \
+            mock.patch('add_localized_string.Translator',
+                       return_value=fake_translator(fail_language='de')), \
+            pytest.raises(SystemExit) as exit_info:
+        lproj_sync.main()
+
+    assert 1 == exit_info.value.code
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 import json
+import time
 from unittest import mock
 
 import pytest
@@ -177,3 +178,115 @@ def test_get_final_output_multiple():
     lproj_translate.get_final_output(commands, translator_func)
 
     assert translator_func.call_count == 2
+
+
+def test_get_final_output_batched():
+    commands = [
+        lproj_translate.TranslateCommand(**output_dict),
+        lproj_translate.TranslateCommand(**output_dict2),
+        lproj_translate.TranslateCommand(
+            key='farewell', text='bye', language='es'
+        ),
+    ]
+    translator_func = mock.MagicMock()
+    translate_many_func = mock.MagicMock(
+        side_effect=lambda texts, language: [
+            '{}-{}'.format(language, text) for text in texts
+        ]
+    )
+
+    output = lproj_translate.get_final_output(
+        commands, translator_func, translate_many_func
+    )
+
+    translator_func.assert_not_called()
+    assert translate_many_func.call_count == 2
+    assert [out[constants.TEXT] for out in output] == [
+        'es-hello', 'jp-bye', 'es-bye'
+    ]
+
+
+@pytest.mark.parametrize('batched', [False, True])
+def test_get_final_output_concurrent(batched):
+    commands = [
+        lproj_translate.TranslateCommand(
+            key='key{}'.format(idx), text='text{}'.format(idx),
+            language=['es', 'de', 'jp'][idx % 3]
+        )
+        for idx in range(30)
+    ]
+
+    def translate_func(text, language):
+        time.sleep(0.01)
+        return '{}-{}'.format(language, text)
+
+    def translate_many_func(texts, language):
+        return [translate_func(text, language) for text in texts]
+
+    output = lproj_translate.get_final_output(
+        commands, translate_func,
+        translate_many_func if batched else None,
+        max_in_flight=8
+    )
+
+    assert [
+        '{}-{}'.format(command.language, command.text)
+        for command in commands
+    ] == [out[constants.TEXT] for out in output]
+    assert [command.key for command in commands] == [
+        out[constants.KEY] for out in output
+    ]
+
+
+@pytest.mark.parametrize('lines,input_format', [
+    ([json.dumps(output_dict) + '\n', '\n', json.dumps(output_dict2) + '\n'],
+     'JSON'),
+    (yaml.safe_dump(output_dict, explicit_start=True).splitlines(True) +
+     yaml.safe_dump(output_dict2, explicit_start=True).splitlines(True),
+     'YAML'),
+    (['--- {key: greeting, text: hi, language: es}\n',
+      '--- {key: farewell, text: bye, language: es}\n'],
+     'YAML'),
+    (['---\n', 'key: greeting\n', 'text: hi\n', 'language: es\n',
+      '---\t# second\n', 'key: farewell\n', 'text: bye\n', 'language: es\n',
+      '...\n'],
+     'YAML'),
+])
+def test_iter_input_commands(lines, input_format):
+    commands = lproj_translate.iter_input_commands(iter(lines), input_format)
+
+    assert ['greeting', 'farewell'] == [command.key for command in commands]
+
+
+@pytest.mark.parametrize('max_in_flight', [1, 4])
+def test_stream_output(max_in_flight):
+    consumed = []
+
+    def commands():
+        for idx in range(10):
+            consumed.append(idx)
+            yield lproj_translate.TranslateCommand(
+                key=str(idx), text='text', language='es'
+            )
+
+    outputs = lproj_translate.stream_output(
+        commands(), lambda text, language: text.upper(), max_in_flight
+    )
+
+    first = next(outputs)
+    assert '0' == first[constants.KEY]
+    assert len(consumed) <= max_in_flight
+    assert [str(idx) for idx in range(1, 10)] == [
+        output[constants.KEY] for output in outputs
+    ]
+
+
+@pytest.mark.parametrize('output_format,parse', [
+    ('JSON', json.loads),
+    ('YAML', yaml.safe_load),
+])
+def test_format_record(output_format, parse):
+    record = lproj_translate.format_record(output_dict, output_format)
+
+    assert record.endswith('\n')
+    assert output_dict == parse(record)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import subprocess
+import sys
+
+
+PYLOCALIZER_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'pylocalizer'
+)
+
+# Generous enough for a slow CI machine, but well under the cost of
+# importing googleapiclient and building the translate service.
+MAX_STARTUP_SECONDS = 1.0
+
+STARTUP_SCRIPT = """
+import json
+import sys
+import time
+
+start = time.time()
+import add_localized_string
+project = add_localized_string.XcodeLocalizationProject(
+    sys.argv[1], sys.argv[2]
+)
+list(project.get('greeting'))
+print(json.dumps({
+    'seconds': time.time() - start,
+    'googleapiclient': 'googleapiclient' in sys.modules,
+}))
+"""
+
+
+def test_read_only_startup(tmpdir):
+    lproj = tmpdir.join('Resources', 'Base.lproj')
+    lproj.ensure(dir=True)
+    lproj.join('Localizable.strings').write('"greeting" = "Hello";\n')
+    env = dict(os.environ, PYTHONPATH=PYLOCALIZER_DIR, HOME=str(tmpdir))
+
+    output = subprocess.check_output(
+        [sys.executable, '-c', STARTUP_SCRIPT, str(tmpdir) + '/',
+         str(tmpdir.join('scratch'))],
+        env=env
+    )
+    startup = json.loads(output.decode('utf-8').splitlines()[-1])
+
+    assert not startup['googleapiclient']
+    assert startup['seconds'] < MAX_STARTUP_SECONDS
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+from pylocalizer import strings_file
+
+
+STRINGS = """/* Fruit */
+"apple" = "Apple";
+"cherry" = "Say \\"cherry\\"";
+
+"eggplant" = "a=b";
+"""
+
+
+@pytest.mark.parametrize('line,expected', [
+    ('"greeting" = "Hello";', ('greeting', 'Hello')),
+    ('  "a"="b" ;  ', ('a', 'b')),
+    ('"q" = "Say \\"hi\\"";', ('q', 'Say \\"hi\\"')),
+    ('"eq" = "1 + 1 = 2";', ('eq', '1 + 1 = 2')),
+    ('/* "a" = "b"; */', None),
+    ('', None),
+])
+def test_parse_line(line, expected):
+    assert expected == strings_file.parse_line(line)
+
+
+def test_document_round_trip():
+    document = strings_file.StringsDocument.parse(STRINGS)
+
+    assert STRINGS == document.render()
+    assert 3 == len(document)
+    assert 'a=b' == document.get('eggplant')
+    assert document.get('banana') is None
+    assert ['apple', 'cherry', 'eggplant'] == [
+        key for key, _ in document.items()
+    ]
+
+
+@pytest.mark.parametrize('key,expected_keys', [
+    ('banana', ['apple', 'banana', 'cherry', 'eggplant']),
+    ('zucchini', ['apple', 'cherry', 'eggplant', 'zucchini']),
+    ('cherry', ['apple', 'cherry', 'eggplant']),
+])
+def test_document_set(key, expected_keys):
+    document = strings_file.StringsDocument.parse(STRINGS)
+
+    document.set(key, strings_file.format_line(key, 'New'))
+
+    assert expected_keys == [key for key, _ in document.items()]
+    assert 'New' == document.get(key)
+    assert '/* Fruit */' == document.render().splitlines()[0]
+
+
+def test_load_document_is_cached_until_the_file_changes(tmpdir):
+    path = tmpdir.join('Localizable.strings')
+    path.write(STRINGS)
+
+    document = strings_file.load_document(str(path))
+    assert document is strings_file.load_document(str(path))
+
+    path.write(STRINGS + '"fig" = "Fig";\n')
+    os.utime(str(path), ns=(0, 0))
+
+    reloaded = strings_file.load_document(str(path))
+    assert reloaded is not document
+    assert 'Fig' == reloaded.get('fig')
+
+
+def test_document_merge():
+    document = strings_file.StringsDocument.parse(STRINGS)
+
+    document.merge([
+        (key, strings_file.format_line(key, key.upper()))
+        for key in ['aardvark', 'banana', 'cherry', 'date', 'zucchini']
+    ])
+
+    assert [
+        '/* Fruit */',
+        '"aardvark" = "AARDVARK";',
+        '"apple" = "Apple";',
+        '"banana" = "BANANA";',
+        '"cherry" = "CHERRY";',
+        '"date" = "DATE";',
+        '',
+        '"eggplant" = "a=b";',
+        '"zucchini" = "ZUCCHINI";',
+    ] == document.render().splitlines()
+    assert 'DATE' == document.get('date')
+
+
+TRICKY_STRINGS = """// Line comment with "a" = "b";
+/* Block comment
+   "c" = "d"; */
+"multi" = "first line
+second line";
+bare_key = "Bare";
+"escaped" = "Say \\"hi\\"";"""
+
+
+def test_tokenize_spans():
+    tokens = list(strings_file.tokenize(TRICKY_STRINGS))
+
+    assert [
+        ('multi', 'first line\nsecond line'),
+        ('bare_key', 'Bare'),
+        ('escaped', 'Say \\"hi\\"'),
+    ] == [(key, value) for key, value, _ in tokens]
+    for key, _, (start, end) in tokens:
+        assert TRICKY_STRINGS[start:end].lstrip('"').startswith(key)
+        assert TRICKY_STRINGS[start:end].endswith(';')
+
+
+def test_tokenize_bytes_matches_text():
+    text_tokens = list(strings_file.tokenize('"ü" = "ö";\n"a" = "b";'))
+    byte_tokens = list(strings_file.tokenize(
+        '"ü" = "ö";\n"a" = "b";'.encode('utf-8')
+    ))
+
+    assert [token[:2] for token in text_tokens] == [
+        token[:2] for token in byte_tokens
+    ]
+    assert (11, 21) == text_tokens[1][2]
+    assert (13, 23) == byte_tokens[1][2]
+
+
+@pytest.mark.parametrize('encoding', ['utf-8', 'utf-8-sig', 'utf-16'])
+def test_document_keeps_encoding(tmpdir, encoding):
+    path = tmpdir.join('Localizable.strings')
+    path.write_binary(TRICKY_STRINGS.encode(encoding))
+
+    document = strings_file.StringsDocument.read(str(path))
+    document.set('new', strings_file.format_line('new', 'Neu'))
+    document.write(str(path))
+
+    assert (TRICKY_STRINGS + '\n"new" = "Neu";\n').encode(encoding) == (
+        path.read_binary()
+    )
+
+
+def test_sorted_document_set_uses_binary_search():
+    document = strings_file.StringsDocument.parse(
+        '"b" = "B";\n"ca" = "CA";\n"cc" = "CC";\n"d" = "D";\n'
+    )
+
+    document.set('cb', strings_file.format_line('cb', 'CB'))
+    document.set('a', strings_file.format_line('a', 'A'))
+    document.set('e', strings_file.format_line('e', 'E'))
+
+    assert ['a', 'b', 'ca', 'cb', 'cc', 'd', 'e'] == document.sorted_keys()
+    assert [
+        '"a" = "A";', '"b" = "B";', '"ca" = "CA";', '"cb" = "CB";',
+        '"cc" = "CC";', '"d" = "D";', '"e" = "E";',
+    ] == document.render().splitlines()
+    for key, value, (start, end) in strings_file.tokenize(document.data):
+        assert document.index[key].start == start
+        assert document.index[key].end == end
+
+
+@pytest.mark.parametrize('text', [
+    '"a" = "1"; "c" = "3";',
+    '"a" = "1"; "c" = "3";\n',
+])
+def test_set_between_entries_on_one_line(text):
+    document = strings_file.StringsDocument.parse(text)
+
+    document.set('b', strings_file.format_line('b', '2'))
+    document.set('bb', strings_file.format_line('bb', '22'))
+
+    assert ['a', 'b', 'bb', 'c'] == [
+        key for key, _, _ in strings_file.tokenize(document.data)
+    ]
+    assert ['a', 'b', 'bb', 'c'] == document.sorted_keys()
+
+
+def test_unsorted_document_is_not_bisected():
+    document = strings_file.StringsDocument.parse('"b" = "B";\n"a" = "A";\n')
+
+    assert document.sorted_keys() is None
+    assert document.sorted_position('c') is None
+
+
+@pytest.mark.parametrize('value, text', [
+    ('Apple', 'Apple'),
+    ('Say \\"hi\\"', 'Say "hi"'),
+    ('One\\nTwo\\\\Three', 'One\nTwo\\Three'),
+])
+def test_escape_round_trip(value, text):
+    assert text == strings_file.unescape(value)
+    assert value == strings_file.escape(text)
+
+
+def test_unescape_keeps_unknown_escapes():
+    assert '\\U00e9' == strings_file.unescape('\\U00e9')
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from pylocalizer import translate_scheduler, translator
+
+from .helpers import fake_translate_service
+
+
+class FakeClock(object):
+    """A clock which only moves when something sleeps."""
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeResponse(dict):
+    def __init__(self, status, headers=None):
+        super(FakeResponse, self).__init__(headers or {})
+        self.status = status
+
+
+class FakeHttpError(Exception):
+    """Looks like googleapiclient.errors.HttpError."""
+    def __init__(self, status, reason=None, headers=None):
+        super(FakeHttpError, self).__init__(status)
+        self.resp = FakeResponse(status, headers)
+        self.content = json.dumps({
+            'error': {'code': status, 'errors': [{'reason': reason}]},
+        }).encode('utf-8')
+
+
+def make_scheduler(clock, **kwargs):
+    kwargs.setdefault('characters_per_second', None)
+    return translate_scheduler.TranslateScheduler(
+        clock=clock, sleep=clock.sleep, rng=mock.Mock(uniform=max),
+        **kwargs
+    )
+
+
+def failing(errors, result='done'):
+    """A request which raises each of errors in turn, then succeeds."""
+    errors = list(errors)
+
+    def request():
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    return mock.Mock(side_effect=request)
+
+
+@pytest.mark.parametrize('error,expected', [
+    (FakeHttpError(429), (True, True)),
+    (FakeHttpError(503), (True, True)),
+    (FakeHttpError(500), (True, False)),
+    (FakeHttpError(403, 'userRateLimitExceeded'), (True, True)),
+    (FakeHttpError(403, 'dailyLimitExceeded'), (False, False)),
+    (FakeHttpError(400, 'invalid'), (False, False)),
+    (ConnectionResetError(), (True, False)),
+    (ValueError(), (False, False)),
+])
+def test_classify(error, expected):
+    assert expected == translate_scheduler.classify(error)
+
+
+def test_token_bucket_waits_out_its_debt():
+    clock = FakeClock()
+    bucket = translate_scheduler.TokenBucket(
+        10, clock=clock, sleep=clock.sleep
+    )
+
+    assert 0 == bucket.acquire(10)
+    assert 0.5 == bucket.acquire(5)
+    clock.now += 1
+    # Larger than the capacity, so it waits for a full bucket and more.
+    assert 1.5 == bucket.acquire(25)
+    assert 0 == translate_scheduler.TokenBucket(None).acquire(1000)
+
+
+def test_retries_with_backoff():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, base_delay=1, max_delay=3)
+    request = failing([
+        FakeHttpError(500), FakeHttpError(502), FakeHttpError(503),
+        FakeHttpError(429, headers={'retry-after': '2'}),
+    ])
+
+    assert 'done' == scheduler.call(request)
+    assert 5 == request.call_count
+    assert [1, 2, 3, 2.0] == clock.sleeps
+
+
+def test_gives_up_after_max_retries():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, max_retries=2)
+    request = failing([FakeHttpError(503)] * 3)
+
+    with pytest.raises(FakeHttpError):
+        scheduler.call(request)
+    assert 3 == request.call_count
+
+
+def test_does_not_retry_other_errors():
+    clock = FakeClock()
+    request = failing([FakeHttpError(403, 'dailyLimitExceeded')])
+
+    with pytest.raises(FakeHttpError):
+        make_scheduler(clock).call(request)
+    assert 1 == request.call_count
+    assert [] == clock.sleeps
+
+
+def test_rate_limits_characters():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, characters_per_second=100)
+
+    for _ in range(3):
+        scheduler.call(lambda: None, characters=100)
+
+    assert [1.0, 1.0] == clock.sleeps
+
+
+def test_adaptive_limit():
+    limit = translate_scheduler.AdaptiveLimit(8)
+
+    limit.throttled()
+    limit.throttled()
+    assert 2 == limit.limit
+    for _ in range(3):
+        limit.succeeded()
+    assert 3 == int(limit.limit)
+    for _ in range(10):
+        limit.throttled()
+    assert 1 == limit.limit
+
+
+def test_adaptive_limit_caps_requests_in_flight():
+    limit = translate_scheduler.AdaptiveLimit(2)
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    def request():
+        with limit.slot():
+            with lock:
+                in_flight.append(1)
+                peak.append(len(in_flight))
+            time.sleep(0.01)
+            with lock:
+                in_flight.pop()
+
+    threads = [threading.Thread(target=request) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert 2 == max(peak)
+
+
+def test_translator_retries_throttled_requests():
+    service = fake_translate_service()
+    list_translations = service.translations.return_value.list.side_effect
+    requests = []
+
+    def flaky_list(q, target, source):
+        request = list_translations(q, target, source)
+        request.execute.side_effect = [
+            FakeHttpError(429), request.execute.return_value
+        ]
+        requests.append(request)
+        return request
+
+    service.translations.return_value.list.side_effect = flaky_list
+    clock = FakeClock()
+    t = translator.Translator(
+        translate_service=service, scheduler=make_scheduler(clock)
+    )
+
+    assert ['de:HELLO'] == t.translate_many(['hello'], 'de')
+    assert 2 == requests[0].execute.call_count
+    assert 1 == len(clock.sleeps)
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+import time
+from unittest import mock
+
+import pytest
+
+from pylocalizer import translation_cache
+
+from .helpers import fake_translator
+
+
+@pytest.fixture
+def cache(tmpdir):
+    cache = translation_cache.TranslationCache(
+        str(tmpdir.join('cache.sqlite3'))
+    )
+    yield cache
+    cache.close()
+
+
+def test_get_many_miss_then_hit(cache):
+    assert [None, None] == cache.get_many('en', 'es', ['hello', 'bye'])
+
+    cache.put_many('en', 'es', ['hello'], ['hola'])
+
+    assert ['hola', None] == cache.get_many('en', 'es', ['hello', 'bye'])
+    assert [None] == cache.get_many('en', 'de', ['hello'])
+    assert {'hits': 1, 'misses': 4, 'entries': 1} == cache.stats()
+
+
+def test_normalized_text_shares_entry(cache):
+    cache.put_many('en', 'de', ['café'], ['Café'])
+
+    assert ['Café'] == cache.get_many('en', 'de', ['café'])
+
+
+def test_evicts_least_recently_used(tmpdir):
+    cache = translation_cache.TranslationCache(
+        str(tmpdir.join('cache.sqlite3')), max_entries=2
+    )
+    cache.put_many('en', 'es', ['one'], ['uno'])
+    cache.put_many('en', 'es', ['two'], ['dos'])
+    cache.get_many('en', 'es', ['one'])
+    cache.put_many('en', 'es', ['three'], ['tres'])
+
+    assert 2 == len(cache)
+    assert ['uno', None, 'tres'] == cache.get_many(
+        'en', 'es', ['one', 'two', 'three']
+    )
+
+
+def test_evicts_expired_entries(tmpdir):
+    path = str(tmpdir.join('cache.sqlite3'))
+    cache = translation_cache.TranslationCache(path)
+    cache.put_many('en', 'es', ['one'], ['uno'])
+    cache.close()
+
+    with mock.patch('time.time', return_value=time.time() + 10):
+        cache = translation_cache.TranslationCache(path, max_age=5)
+        assert 0 == len(cache)
+
+
+def test_cache_is_opened_lazily(tmpdir):
+    path = tmpdir.join('cache', 'cache.sqlite3')
+    cache = translation_cache.TranslationCache(str(path))
+
+    assert not path.check()
+    assert [None] == cache.get_many('en', 'es', ['one'])
+    assert path.check()
+
+
+def test_caching_translator_only_translates_misses(cache):
+    translator = fake_translator()
+    caching_translator = translation_cache.CachingTranslator(
+        translator, cache
+    )
+
+    assert ['es:a', 'es:b', 'es:a'] == caching_translator.translate_many(
+        ['a', 'b', 'a'], 'es'
+    )
+    translator.translate_many.assert_called_once_with(['a', 'b'], 'es')
+
+    assert 'es:b' == caching_translator.translate('b', 'es')
+    assert 1 == translator.translate_many.call_count
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+
+from pylocalizer import add_localized_string, lproj_translate
+from pylocalizer import constants, translation_plan
+
+from .helpers import fake_translator
+
+
+LANGUAGE_MAP = {'pt-BR': 'pt', 'pt-PT': 'pt'}
+
+
+def test_plan_collapses_duplicates():
+    plan = translation_plan.TranslationPlan([
+        ('Hello', 'pt-BR'),
+        ('Bye', 'de'),
+        ('Hello', 'pt-PT'),
+        ('Hello', 'de'),
+        ('Bye', 'de'),
+    ], LANGUAGE_MAP)
+
+    assert {'pt': ['Hello'], 'de': ['Bye', 'Hello']} == dict(
+        plan.texts_by_target
+    )
+    assert 3 == len(plan)
+    assert ['pt:Hello', 'de:Bye', 'pt:Hello', 'de:Hello', 'de:Bye'] == (
+        plan.fan_out({
+            'pt': ['pt:Hello'],
+            'de': ['de:Bye', 'de:Hello'],
+        })
+    )
+
+
+def test_shared_translator():
+    translator = fake_translator()
+    shared = translation_plan.SharedTranslator(translator, LANGUAGE_MAP)
+
+    assert ['pt:Hello', 'pt:Hello'] == shared.translate_many(
+        ['Hello', 'Hello'], 'pt-BR'
+    )
+    assert 'pt:Hello' == shared.translate('Hello', 'pt-PT')
+    assert 'de:Hello' == shared.translate('Hello', 'de')
+    translator.translate_many.assert_any_call(['Hello'], 'pt')
+    assert 2 == translator.translate_many.call_count
+
+    shared.clear()
+    shared.translate('Hello', 'pt-PT')
+    assert 3 == translator.translate_many.call_count
+
+
+def test_load_language_map(tmpdir):
+    path = tmpdir.join('languages.json')
+    path.write(json.dumps(LANGUAGE_MAP))
+
+    assert LANGUAGE_MAP == translation_plan.load_language_map(str(path))
+    assert {} == translation_plan.load_language_map(None)
+
+    path.write('["pt"]')
+    with pytest.raises(ValueError):
+        translation_plan.load_language_map(str(path))
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_set_shares_regional_variants(tmpdir, workers):
+    for language in ['Base', 'de', 'pt-BR', 'pt-PT']:
+        lproj = tmpdir.join('Resources', '{}.lproj'.format(language))
+        lproj.ensure(dir=True)
+        lproj.join('Localizable.strings').write('"apple" = "Apple";\n')
+    translator = fake_translator()
+    project = add_localized_string.XcodeLocalizationProject(
+        str(tmpdir) + '/', str(tmpdir.join('scratch')), translator,
+        workers=workers, language_map=LANGUAGE_MAP
+    )
+
+    assert project.set('banana', 'Banana')
+
+    assert {
+        'Base': 'Banana',
+        'de': 'de:Banana',
+        'pt-BR': 'pt:Banana',
+        'pt-PT': 'pt:Banana',
+    } == {
+        lproj.language_code: lproj.get('banana') for lproj in project.lprojs
+    }
+    assert 2 == translator.translate_many.call_count
+
+
+@pytest.mark.parametrize('max_in_flight,batched', [
+    (1, False), (1, True), (4, False), (4, True),
+])
+def test_get_final_output_deduplicates(max_in_flight, batched):
+    commands = [
+        lproj_translate.TranslateCommand(
+            key='key{}'.format(idx), text=text, language=language
+        )
+        for idx, (text, language) in enumerate([
+            ('Hello', 'pt-BR'), ('Hello', 'pt-PT'), ('Hello', 'pt-BR'),
+            ('Bye', 'de'), ('Bye', 'de'),
+        ])
+    ]
+    calls = []
+
+    def translate_many_func(texts, language):
+        calls.append((list(texts), language))
+        return ['{}:{}'.format(language, text) for text in texts]
+
+    def translate_func(text, language):
+        return translate_many_func([text], language)[0]
+
+    output = lproj_translate.get_final_output(
+        commands, translate_func,
+        translate_many_func if batched else None,
+        max_in_flight, LANGUAGE_MAP
+    )
+
+    assert sorted(calls) == [(['Bye'], 'de'), (['Hello'], 'pt')]
+    assert [
+        'pt:Hello', 'pt:Hello', 'pt:Hello', 'de:Bye', 'de:Bye'
+    ] == [out[constants.TEXT] for out in output]
+    assert ['pt-BR', 'pt-PT', 'pt-BR', 'de', 'de'] == [
+        out[constants.LANGUAGE] for out in output
+    ]
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+from pylocalizer import strings_file, translation_reuse
+
+from .helpers import fake_translator, make_project, values
+
+
+def test_value_index():
+    document = strings_file.StringsDocument.parse(
+        '"a" = "Hi";\n"b" = "Bye";\n"c" = "Hi";\n'
+    )
+
+    assert {'Hi': ['a', 'c'], 'Bye': ['b']} == dict(
+        translation_reuse.value_index(document)
+    )
+
+
+def test_set_copies_translations_of_the_same_text(project_dir, tmpdir):
+    for language in ['de', 'fr']:
+        lproj = tmpdir.join('Resources', '{}.lproj'.format(language))
+        lproj.join('Localizable.strings').write(
+            '"apple" = "{}:Apfel";\n'.format(language)
+        )
+    translator = fake_translator()
+    project = make_project(project_dir, tmpdir, translator)
+
+    assert project.set('fruit', 'Apple')
+
+    assert {
+        'Base': 'Apple',
+        'de': 'de:Apfel',
+        'es': 'Apple',
+        'fr': 'fr:Apfel',
+        'ja': 'Apple',
+    } == values(project, 'fruit')
+    assert not translator.translate_many.called
+    assert 4 == project.reused
+
+
+def test_set_many_only_translates_new_text(project_dir, tmpdir):
+    tmpdir.join('Resources', 'de.lproj', 'Localizable.strings').write(
+        '"cherry" = "Kirsche";\n'
+    )
+    translator = fake_translator()
+    project = make_project(project_dir, tmpdir, translator)
+
+    assert project.set_many({
+        'berry': 'Cherry', 'kiwi': 'Kiwi', 'red_apple': 'Apple',
+    })
+
+    assert 'Kirsche' == project.get_lproj('de').get('berry')
+    assert 'de:Apple' == project.get_lproj('de').get('red_apple')
+    assert 'es:Kiwi' == project.get_lproj('es').get('kiwi')
+    translator.translate_many.assert_any_call(['Kiwi', 'Apple'], 'de')
+    translator.translate_many.assert_any_call(['Kiwi'], 'es')
+    assert 4 == translator.translate_many.call_count
+    assert 7 == project.reused
+
+
+def test_set_does_not_reuse_the_key_being_set(project_dir, tmpdir):
+    translator = fake_translator()
+    project = make_project(project_dir, tmpdir, translator)
+
+    assert project.set('apple', 'Apple')
+
+    assert 'de:Apple' == project.get_lproj('de').get('apple')
+    assert 0 == project.reused
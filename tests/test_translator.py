@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from pylocalizer import translator
+
+from .helpers import fake_translate_service
+
+
+@pytest.mark.parametrize('texts,max_items,max_chars,expected', [
+    ([], 2, 10, []),
+    (['a', 'b', 'c'], 2, 10, [['a', 'b'], ['c']]),
+    (['aaaa', 'bbbb', 'cc'], 5, 8, [['aaaa', 'bbbb'], ['cc']]),
+    (['a' * 20, 'b'], 5, 8, [['a' * 20], ['b']]),
+])
+def test_batch_texts(texts, max_items, max_chars, expected):
+    batches = translator.batch_texts(texts, max_items, max_chars)
+    assert expected == list(batches)
+
+
+def test_translate():
+    service = fake_translate_service()
+    t = translator.Translator(translate_service=service)
+
+    assert 'es:HELLO' == t.translate('hello', 'es')
+
+
+def test_translate_many_keeps_order_across_batches():
+    service = fake_translate_service()
+    t = translator.Translator(translate_service=service)
+    texts = ['word{}'.format(idx) for idx in range(300)]
+
+    translated = t.translate_many(texts, 'de')
+
+    assert ['de:' + text.upper() for text in texts] == translated
+    assert 3 == service.translations.return_value.list.call_count